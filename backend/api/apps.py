@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def repair_job_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .models import Job
+    from .search import JOB_SEARCH_FIELDS, repair_search_index
+    repair_search_index(Job, JOB_SEARCH_FIELDS, connections[using])
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(repair_job_search_index, sender=self)
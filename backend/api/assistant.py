@@ -0,0 +1,175 @@
+import asyncio
+import os
+from functools import cached_property, lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from dotenv import load_dotenv
+
+from .conversation import extractive_summary
+
+load_dotenv()
+
+
+DEFAULT_ASSISTANT_BACKEND = 'api.assistant.VertexAssistant'
+DEFAULT_ASSISTANT_MODEL = 'gemini-2.5-flash'
+
+SYSTEM_INSTRUCTION = """\
+You are "ARA", ARA stands for Appliance Repair Assistant, a helpful AI assistant for 4kara.com, specializing in appliance repair and maintenance advice. Be friendly, empathetic, and knowledgeable.
+
+Help the user understand their appliance issue. Provide potential causes, simple DIY steps (if safe and appropriate), or suggest the type of professional they should hire through 4kara.com.
+
+- DO NOT engage in conversations outside of Appliance Repair scope
+- DO NOT provide price estimates or quotes.
+- DO NOT recommend specific brands or companies.
+- DO NOT give advice that requires specialized tools or licenses (e.g., major electrical work, gas line repairs). Emphasize safety.
+- If asked for quotes or specific pros, politely explain you cannot provide that and suggest they "post a job on 4kara.com to get bids from qualified local professionals."
+- KEEP RESPONSES LESS THAN 30 WORDS
+"""
+
+SUMMARY_INSTRUCTION = """\
+You maintain a running summary of a conversation between a homeowner and ARA, an appliance repair assistant. \
+Given the previous summary and the next turns, write an updated summary in under 80 words. \
+Keep the appliance, symptoms, anything already tried and the advice given. Reply with the summary only.
+"""
+
+
+@lru_cache(maxsize=None)
+def init_vertex():
+    """
+    Imports and initializes the Vertex AI SDK on first use and returns its
+    `generative_models` module. The import alone takes seconds, so
+    processes that never serve chat (management commands, tests, socket
+    workers) skip it entirely.
+    """
+    import vertexai
+    from vertexai import generative_models
+
+    try:
+        vertexai.init(project=os.environ.get('PROJECT_ID'), location=os.environ.get('LOCATION'))
+    except Exception as e:
+        print(f'Error initializing Vertex AI: {e}')
+    return generative_models
+
+
+class VertexAssistant:
+    """
+    ARA backed by Gemini on Vertex AI. One instance (and one
+    GenerativeModel carrying the system instruction) is shared by the
+    whole process; each request only opens a lightweight chat session.
+    The SDK is loaded when the first instance is created.
+
+    `history` is the client's list of {"sender": "user" | "ai", "text": ...}.
+    """
+    def __init__(self, model_name=None):
+        self.sdk = init_vertex()
+        self.model_name = model_name or getattr(settings, 'ASSISTANT_MODEL', DEFAULT_ASSISTANT_MODEL)
+        self.model = self.sdk.GenerativeModel(self.model_name, system_instruction=SYSTEM_INSTRUCTION)
+
+    @cached_property
+    def summary_model(self):
+        return self.sdk.GenerativeModel(self.model_name, system_instruction=SUMMARY_INSTRUCTION)
+
+    def to_contents(self, history):
+        return [
+            self.sdk.Content(
+                parts=[self.sdk.Part.from_text(msg.get("text", ""))],
+                role="user" if msg.get("sender") == "user" else "model",
+            )
+            for msg in history
+        ]
+
+    async def reply(self, history, message):
+        chat = self.model.start_chat(history=self.to_contents(history))
+        response = await chat.send_message_async(message)
+        return response.text
+
+    async def stream(self, history, message):
+        """
+        Yields the reply in chunks as Gemini produces them. Closing the
+        generator (e.g. on client disconnect) closes the upstream stream.
+        """
+        chat = self.model.start_chat(history=self.to_contents(history))
+        responses = await chat.send_message_async(message, stream=True)
+        try:
+            async for response in responses:
+                try:
+                    text = response.text
+                except ValueError:
+                    # Chunks without text (e.g. only safety ratings).
+                    continue
+                if text:
+                    yield text
+        finally:
+            await responses.aclose()
+
+    async def summarize(self, previous, turns):
+        """
+        Folds `turns` into the rolling summary `previous`.
+        """
+        lines = [f"Previous summary: {previous or '(none)'}", 'Next turns:']
+        lines += [f"{'User' if turn['sender'] == 'user' else 'ARA'}: {turn['text']}" for turn in turns]
+        response = await self.summary_model.generate_content_async('\n'.join(lines))
+        return response.text.strip()
+
+
+class StubAssistant:
+    """
+    Offline stand-in for VertexAssistant that answers after
+    ASSISTANT_STUB_LATENCY seconds, for benchmarks and local development.
+    """
+    reply_text = "Stub reply from ARA. Post a job on 4kara.com to get bids from qualified local professionals."
+
+    def __init__(self, latency=None):
+        self._latency = latency
+
+    @property
+    def latency(self):
+        return self._latency if self._latency is not None else getattr(settings, 'ASSISTANT_STUB_LATENCY', 0)
+
+    async def reply(self, history, message):
+        await asyncio.sleep(self.latency)
+        return self.reply_text
+
+    async def stream(self, history, message):
+        """
+        Yields `reply_text` word by word, spreading the latency over them.
+        """
+        words = self.reply_text.split(' ')
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            yield word if i == 0 else ' ' + word
+
+    async def summarize(self, previous, turns):
+        return extractive_summary(previous, turns)
+
+
+@lru_cache(maxsize=None)
+def load_assistant(path):
+    return import_string(path)()
+
+
+async def get_assistant():
+    """
+    Returns the process-wide assistant selected by ASSISTANT_BACKEND. It is
+    built in a worker thread, because the first build imports and
+    initializes the Vertex AI SDK, which would otherwise stall every
+    request and socket on the event loop for seconds.
+    """
+    path = getattr(settings, 'ASSISTANT_BACKEND', DEFAULT_ASSISTANT_BACKEND)
+    return await sync_to_async(load_assistant, thread_sensitive=False)(path)
+
+
+async def roll_summary(previous, turns):
+    """
+    Returns the rolling summary with `turns` folded in, falling back to a
+    local extractive summary if the assistant cannot summarize.
+    """
+    try:
+        assistant = await get_assistant()
+        summary = await assistant.summarize(previous, turns)
+    except Exception as e:
+        print(f"Error summarizing chat history: {e}")
+        summary = ''
+    return summary or extractive_summary(previous, turns)
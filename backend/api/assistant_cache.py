@@ -0,0 +1,178 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+DEFAULT_CACHE_TTL = 60 * 60
+DEFAULT_CACHE_SIZE = 1000
+DEFAULT_SIMILARITY = 0.9
+DEFAULT_EMBEDDER = 'api.assistant_cache.trigram_embedding'
+
+WORD_RE = re.compile(r"\w+(?:'\w+)?")
+# Filler words dropped before matching; negations are deliberately kept.
+FILLER_WORDS = frozenset({
+    'a', 'an', 'the', 'my', 'our', 'i', 'me', 'we', 'is', 'are', 'am', 'it', 'its',
+    'please', 'hi', 'hello', 'hey', 'thanks', 'just', 'so',
+})
+
+
+def normalize_message(message):
+    """
+    Lowercases, strips punctuation and filler words and collapses
+    whitespace, so trivially different phrasings share a cache key.
+    """
+    words = WORD_RE.findall(message.lower())
+    return ' '.join(word for word in words if word not in FILLER_WORDS)
+
+
+def trigram_embedding(text):
+    """
+    Sparse character-trigram count vector of normalized text. Cheap and
+    local; good at catching rewordings and typos, not synonyms.
+    """
+    vector = Counter()
+    for word in text.split():
+        padded = f' {word} '
+        for i in range(len(padded) - 2):
+            vector[padded[i:i + 3]] += 1
+    return vector
+
+
+def cosine_similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    if not dot:
+        return 0.0
+    return dot / math.sqrt(sum(v * v for v in a.values()) * sum(v * v for v in b.values()))
+
+
+class ResponseCache:
+    """
+    Per-process cache of first-turn assistant replies, with a TTL and LRU
+    eviction.
+
+    Lookups try the exact hash of the normalized message first. When
+    ASSISTANT_CACHE_SEMANTIC is on, they fall back to the nearest cached
+    message by cosine similarity of their embeddings (ASSISTANT_CACHE_EMBEDDER),
+    accepted above ASSISTANT_CACHE_SIMILARITY. The scan is linear over at
+    most ASSISTANT_CACHE_SIZE entries.
+    """
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ASSISTANT_CACHE_TTL', DEFAULT_CACHE_TTL)
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'ASSISTANT_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    @property
+    def semantic(self):
+        return getattr(settings, 'ASSISTANT_CACHE_SEMANTIC', False)
+
+    @property
+    def similarity(self):
+        return getattr(settings, 'ASSISTANT_CACHE_SIMILARITY', DEFAULT_SIMILARITY)
+
+    def embed(self, text):
+        return import_string(getattr(settings, 'ASSISTANT_CACHE_EMBEDDER', DEFAULT_EMBEDDER))(text)
+
+    def key(self, normalized):
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def get(self, message):
+        """
+        Returns (reply, 'exact' | 'semantic') or (None, 'miss').
+        """
+        normalized = normalize_message(message)
+        key = self.key(normalized)
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.stats['exact_hits'] += 1
+                return entry[1], 'exact'
+            if entry is not None:
+                del self.entries[key]
+            if not self.semantic:
+                self.stats['misses'] += 1
+                return None, 'miss'
+            candidates = list(self.entries.items())
+
+        vector = self.embed(normalized)
+        best_key, best_score = None, self.similarity
+        for candidate_key, (expires, _, candidate_vector) in candidates:
+            if expires <= now or candidate_vector is None:
+                continue
+            score = cosine_similarity(vector, candidate_vector)
+            if score >= best_score:
+                best_key, best_score = candidate_key, score
+
+        with self.lock:
+            entry = self.entries.get(best_key) if best_key else None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, 'miss'
+            self.entries.move_to_end(best_key)
+            self.stats['semantic_hits'] += 1
+            return entry[1], 'semantic'
+
+    def set(self, message, reply):
+        if not reply or self.ttl <= 0:
+            return
+        normalized = normalize_message(message)
+        vector = self.embed(normalized) if self.semantic else None
+        with self.lock:
+            self.entries[self.key(normalized)] = (self.clock() + self.ttl, reply, vector)
+            self.entries.move_to_end(self.key(normalized))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def record_bypass(self):
+        with self.lock:
+            self.stats['bypassed'] += 1
+
+    def reset_stats(self):
+        self.stats = Counter(exact_hits=0, semantic_hits=0, misses=0, bypassed=0, evictions=0)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.reset_stats()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self.entries)
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['exact_hits'] + stats['semantic_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+response_cache = ResponseCache()
+
+
+def is_cacheable(history):
+    return not history
+
+
+def wants_bypass(request):
+    """
+    Clients skip the cache with `Cache-Control: no-cache` (or no-store).
+    """
+    directives = request.headers.get('Cache-Control', '').lower()
+    return 'no-cache' in directives or 'no-store' in directives
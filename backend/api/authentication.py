@@ -0,0 +1,141 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+DEFAULT_TOKEN_CACHE_TTL = 60
+DEFAULT_TOKEN_CACHE_SIZE = 10_000
+
+
+class TokenUserCache:
+    """
+    Thread-safe, per-process LRU of token key -> (token, user) with a TTL.
+
+    Entries are dropped explicitly when their token is deleted or their
+    user is saved (see signals.py), and the TTL bounds how long another
+    worker process can keep serving a revoked token.
+    """
+    def __init__(self, maxsize=None, ttl=None, clock=time.monotonic):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.keys_by_user = {}
+        self.lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize or getattr(settings, 'TOKEN_CACHE_SIZE', DEFAULT_TOKEN_CACHE_SIZE)
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else getattr(settings, 'TOKEN_CACHE_TTL', DEFAULT_TOKEN_CACHE_TTL)
+
+    def get(self, key):
+        """
+        Returns a private copy of (token, user) for `key`, or None.
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        _, token, user = entry
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return token, user
+
+    def get_user(self, key):
+        """
+        Returns the cached user for `key` itself, or None. It is shared by
+        every caller, so it must be treated as read-only; WebSocket scopes
+        use it to avoid holding a copy per open connection.
+        """
+        entry = self._lookup(key)
+        return entry[2] if entry is not None else None
+
+    def _lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, token, user):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self._remove(token.key)
+            self.entries[token.key] = (self.clock() + self.ttl, copy.copy(token), copy.copy(user))
+            self.keys_by_user.setdefault(user.pk, set()).add(token.key)
+            while len(self.entries) > self.maxsize:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate_key(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            for key in list(self.keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[2].pk
+        keys = self.keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_user[user_id]
+
+
+token_cache = TokenUserCache()
+
+
+def get_token_and_user(key):
+    """
+    Resolves a token key to (token, user), from the cache when possible.
+    Raises Token.DoesNotExist for unknown keys, which are not cached.
+    """
+    cached = token_cache.get(key)
+    if cached is not None:
+        return cached
+    token = Token.objects.select_related('user').get(key=key)
+    token_cache.set(token, token.user)
+    return token, token.user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for DRF's TokenAuthentication that serves known
+    tokens from `token_cache`, so steady-state requests make no
+    authentication queries.
+    """
+    def authenticate_credentials(self, key):
+        try:
+            token, user = get_token_and_user(key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (user, token)
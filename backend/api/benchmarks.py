@@ -0,0 +1,41 @@
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+
+from .models import User, Job, Bid, Message
+
+
+def seed_chat(prefix, index, history=0):
+    """
+    Returns (job, customer_token, pro_token) for a hired job between the
+    benchmark users `{prefix}customer_{index}` and `{prefix}pro_{index}`,
+    creating whatever is missing, with at least `history` messages.
+    """
+    customer, _ = User.objects.get_or_create(
+        username=f'{prefix}customer_{index}', defaults={'email': f'{prefix}c{index}@example.com'}
+    )
+    pro, _ = User.objects.get_or_create(
+        username=f'{prefix}pro_{index}', defaults={'email': f'{prefix}p{index}@example.com', 'is_pro': True}
+    )
+    job = Job.objects.filter(customer=customer, accepted_bid__pro=pro).first()
+    if job is None:
+        job = Job.objects.create(customer=customer, title='Benchmark chat', description='Seeded by a benchmark.')
+        job.accepted_bid = Bid.objects.create(job=job, pro=pro, amount=100)
+        job.save()
+    missing = history - Message.objects.filter(job=job).count()
+    Message.objects.bulk_create([
+        Message(job=job, sender=customer, receiver=pro, body=f'Benchmark message {i}')
+        for i in range(max(0, missing))
+    ])
+    customer_token, _ = Token.objects.get_or_create(user=customer)
+    pro_token, _ = Token.objects.get_or_create(user=pro)
+    return job, customer_token, pro_token
+
+
+def delete_benchmark_users(prefix):
+    """
+    Deletes the users seed_chat created under `prefix` and, with them,
+    their auth tokens, jobs and messages.
+    """
+    User.objects.filter(
+        Q(username__startswith=f'{prefix}customer_') | Q(username__startswith=f'{prefix}pro_')
+    ).delete()
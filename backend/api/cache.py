@@ -0,0 +1,73 @@
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+PRO_PROFILE_CACHE_TIMEOUT = 60 * 15
+
+
+def _profile_version_key(user_id):
+    return f'pro_profile:{user_id}:version'
+
+
+def get_profile_version(user_id):
+    """
+    Returns the current cache version token for a pro's public profile.
+
+    Tokens are random rather than counters, so a version key evicted or
+    lost on restart can never resurrect an older cached response.
+    """
+    key = _profile_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_profile_version(user_id):
+    """
+    Invalidates every cached response for a pro's public profile.
+    """
+    cache.set(_profile_version_key(user_id), uuid4().hex, None)
+
+
+def profile_cache_key(user_id):
+    return f'pro_profile:{user_id}:{get_profile_version(user_id)}'
+
+
+def compute_etag(data):
+    """
+    Strong ETag for a response body, hashed from its JSON rendering.
+    """
+    return '"%s"' % hashlib.md5(JSONRenderer().render(data)).hexdigest()
+
+
+def etag_matches(request, etag):
+    """
+    True if the request's If-None-Match header lists `etag` (weak
+    comparison, as RFC 9110 requires for If-None-Match) or is `*`.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    bare = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == bare for candidate in candidates)
+
+
+def conditional_response(request, etag, data):
+    """
+    Returns a 304 Not Modified if the client already has `etag`,
+    otherwise a 200 with `data`; both carry the ETag header.
+    """
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag})
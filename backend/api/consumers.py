@@ -1,65 +1,202 @@
 import json
+import uuid
+from collections import deque
+from functools import partial
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async 
-from .models import Job, Message, User # Import your models
-from django.shortcuts import get_object_or_404
+from .models import Job, Message, ReadReceipt, ServiceArea, User # Import your models
+from .feeds import (
+    bid_notifications, customer_group, event_matches, group_token, job_feed, state_group, zip_group,
+)
+from .presence import add_connection, is_online, mark_offline, mark_online
+from .receipts import get_receipt_buffer
+from .writebehind import get_write_queue, write_behind_enabled
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+HISTORY_PAGE_SIZE = 50
+DEFAULT_HISTORY_CHUNK_SIZE = 10
+MESSAGE_HISTORY_FIELDS = (
+    'id', 'sender_id', 'sender__first_name', 'sender__last_name', 'sender__username',
+    'receiver_id', 'body', 'timestamp',
+)
+
+
+def display_name(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def message_history(job_id, limit=HISTORY_PAGE_SIZE, before=None):
+    """
+    Returns up to `limit` messages for a job, oldest first, in a single
+    query joined to the sender's name. With `before` (a message id), only
+    messages older than that message are returned, for scroll-back.
+    """
+    messages = Message.objects.filter(job_id=job_id)
+    if before is not None:
+        anchor = Message.objects.filter(id=before, job_id=job_id).values('timestamp')[:1]
+        messages = messages.filter(
+            Q(timestamp__lt=anchor) | Q(timestamp=anchor, id__lt=before)
+        )
+    rows = messages.order_by('-timestamp', '-id').values_list(*MESSAGE_HISTORY_FIELDS)[:limit]
+    return [
+        {
+            'id': id,
+            'sender': sender_id,
+            'sender_name': display_name(first_name, last_name, username),
+            'receiver': receiver_id,
+            'body': body,
+            'timestamp': timestamp.isoformat(),
+        }
+        for id, sender_id, first_name, last_name, username, receiver_id, body, timestamp in reversed(rows)
+    ]
+
+
+def chat_group(job_id):
+    return f'chat_{job_id}'
+
+
+class ChatContext:
+    """
+    What a chat connection keeps between frames: ids, the sender's
+    display name, read position and the newest message id the socket has
+    been sent. Slotted, as there is one per open socket.
+    """
+    __slots__ = ('job_id', 'user_id', 'receiver_id', 'sender_name', 'last_read', 'latest_id')
+
+    def __init__(self, job_id, user_id, receiver_id, sender_name, last_read):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.receiver_id = receiver_id
+        self.sender_name = sender_name
+        self.last_read = last_read
+        self.latest_id = 0
+
+    def saw(self, message_id):
+        if message_id is not None and message_id > self.latest_id:
+            self.latest_id = message_id
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    Job chat between the customer and the hired pro.
+
+    Besides messages, clients may send:
+    - {"type": "heartbeat"} every ~CHAT_PRESENCE_TTL / 2 seconds; the
+      reply is the other participant's {"type": "presence", "online"}.
+    - {"type": "typing", "typing": true | false}, relayed to the other
+      participant and never stored.
+    - {"type": "read", "message_id": <id>} when messages have been shown;
+      relayed as a `read_receipt` and stored in coalesced batches.
+    Presence changes are pushed as they happen, and the first history
+    page carries the other participant's presence and read position.
+
+    Connections hold a ChatContext rather than the user and group name,
+    and history goes out in chunks, to keep idle sockets small.
+    """
+    chat = None
+
     async def connect(self):
         """
         Called when a WebSocket connection is established.
         Checks permissions and adds the user to a group for the job chat.
+        The other participant and the sender's display name are resolved
+        once here so each inbound message costs a single insert.
         """
-        self.job_id = self.scope['url_route']['kwargs']['job_id']
-        self.job_group_name = f'chat_{self.job_id}'
-        self.user = self.scope['user']
+        job_id = int(self.scope['url_route']['kwargs']['job_id'])
+        user = self.scope['user']
 
-        if not self.user.is_authenticated:
+        if not user.is_authenticated:
             await self.close()
             return
-        allowed_to_join = await self.check_user_permission(self.job_id, self.user)
-        if not allowed_to_join:
+        participants = await self.get_participants(job_id, user.id)
+        if participants is None:
             await self.close()
             return
-        
-        await self.channel_layer.group_add(self.job_group_name, self.channel_name)
+        receiver_id, last_read, peer_last_read = participants
+        self.chat = ChatContext(
+            job_id, user.id, receiver_id, display_name(user.first_name, user.last_name, user.username), last_read
+        )
+
+        await self.channel_layer.group_add(chat_group(job_id), self.channel_name)
         await self.accept()
-        print(f"WebSocket connected: user {self.user.id} to job {self.job_id}")
+        await sync_to_async(add_connection)(job_id, user.id)
+        print(f"WebSocket connected: user {user.id} to job {job_id}")
 
-        history = await self.get_message_history(self.job_id)
-        await self.send(text_data=json.dumps({
-            'type': 'message_history',
-            'messages': history
-        }))
+        buffered = get_receipt_buffer().get(job_id, receiver_id)
+        await self.send_history(peer={
+            'user': receiver_id,
+            'online': await sync_to_async(is_online)(job_id, receiver_id),
+            'last_read_message_id': max(peer_last_read, buffered or 0),
+        })
+        await self.handle_heartbeat(reply=False)
+
+    async def send_history(self, before=None, peer=None):
+        """
+        Sends a page of history as `message_history` frames of up to
+        CHAT_HISTORY_CHUNK_SIZE messages, newest chunk first: each frame's
+        messages go before those already shown, except the first frame of
+        the page on connect (`chunk` 0, no `before`), which replaces them.
+        The final frame has `last` set. Clients scroll back by sending
+        {"type": "load_history", "before": <oldest message id they have>}.
+        """
+        if before is not None:
+            try:
+                before = int(before)
+            except (TypeError, ValueError):
+                return
+        history = await self.get_message_history(self.chat.job_id, HISTORY_PAGE_SIZE + 1, before)
+        has_more = len(history) > HISTORY_PAGE_SIZE
+        page = history[-HISTORY_PAGE_SIZE:]
+        del history
+        if page:
+            self.chat.saw(page[-1]['id'])
+        chunk_size = getattr(settings, 'CHAT_HISTORY_CHUNK_SIZE', DEFAULT_HISTORY_CHUNK_SIZE)
+        chunk = 0
+        while True:
+            messages, page = page[-chunk_size:], page[:-chunk_size]
+            frame = {
+                'type': 'message_history',
+                'messages': messages,
+                'before': before,
+                'has_more': has_more,
+                'chunk': chunk,
+                'last': not page,
+            }
+            if peer is not None and chunk == 0:
+                frame['peer'] = peer
+            await self.send(text_data=json.dumps(frame))
+            if not page:
+                return
+            chunk += 1
 
     @database_sync_to_async
-    def get_message_history(self, job_id, limit=50):
+    def get_message_history(self, job_id, limit=HISTORY_PAGE_SIZE, before=None):
         """Fetches the most recent messages for a job."""
-        try:
-            job = Job.objects.get(id=job_id)
-            messages = Message.objects.filter(job=job).order_by('-timestamp')[:limit][::-1]
-            serialized_history = []
-            for msg in messages:
-                 serialized_history.append({
-                     'id': msg.id,
-                     'sender': msg.sender.id,
-                     'sender_name': f"{msg.sender.first_name} {msg.sender.last_name}".strip() or msg.sender.username,
-                     'receiver': msg.receiver.id,
-                     'body': msg.body,
-                     'timestamp': msg.timestamp.isoformat(),
-                 })
-            return serialized_history
-        except Job.DoesNotExist:
-            return []
+        return message_history(job_id, limit, before)
 
     async def disconnect(self, close_code):
         """
         Called when the WebSocket connection is closed.
-        Removes the user from the channel group.
+        Removes the user from the channel group, announces them offline if
+        this was their last socket on the job, and persists any of the
+        user's messages still queued for write-behind and their pending
+        read receipts.
         """
-        print(f"WebSocket disconnected: user {self.user.id} from job {self.job_id}")
+        chat = self.chat
+        if chat is None:
+            return
+        print(f"WebSocket disconnected: user {chat.user_id} from job {chat.job_id}")
+        if await sync_to_async(mark_offline)(chat.job_id, chat.user_id):
+            await self.broadcast_presence(False)
+        await get_receipt_buffer().flush()
+        if write_behind_enabled():
+            await get_write_queue().flush()
         await self.channel_layer.group_discard(
-            self.job_group_name,
+            chat_group(chat.job_id),
             self.channel_name
         )
 
@@ -70,24 +207,40 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         try:
             text_data_json = json.loads(text_data)
+            message_type = text_data_json.get('type')
+            if message_type == 'load_history':
+                await self.send_history(text_data_json.get('before'))
+                return
+            if message_type == 'heartbeat':
+                await self.handle_heartbeat()
+                return
+            if message_type == 'typing':
+                await self.handle_typing(text_data_json.get('typing'))
+                return
+            if message_type == 'read':
+                await self.handle_read(text_data_json.get('message_id'))
+                return
             message_body = text_data_json['message']
 
             if not message_body:
                 return
+            if write_behind_enabled():
+                await self.queue_message(message_body, text_data_json.get('client_id'))
+                return
             new_message = await self.save_message(message_body)
             if not new_message:
                 print("Error saving message")
                 return
             message_data = {
                 'id': new_message.id,
-                'sender': new_message.sender.id,
-                'sender_name': await self.get_user_display_name(new_message.sender),
-                'receiver': new_message.receiver.id,
+                'sender': new_message.sender_id,
+                'sender_name': self.chat.sender_name,
+                'receiver': new_message.receiver_id,
                 'body': new_message.body,
                 'timestamp': new_message.timestamp.isoformat(),
             }
             await self.channel_layer.group_send(
-                self.job_group_name,
+                chat_group(self.chat.job_id),
                 {
                     'type': 'chat_message',
                     'message': message_data
@@ -101,58 +254,285 @@ class ChatConsumer(AsyncWebsocketConsumer):
             print(f"Error in receive: {e}")
 
 
+    async def queue_message(self, message_body, client_id=None):
+        """
+        Write-behind mode: broadcasts the message straight away under a
+        provisional client id and queues the insert. Once it is stored, a
+        `message_saved` event maps the client id to the real id.
+        """
+        if not isinstance(client_id, str) or not 0 < len(client_id) <= 64:
+            client_id = uuid.uuid4().hex
+        chat = self.chat
+        message = Message(
+            job_id=chat.job_id,
+            sender_id=chat.user_id,
+            receiver_id=chat.receiver_id,
+            body=message_body,
+            timestamp=timezone.now(),
+        )
+        get_write_queue().put(message, partial(self.broadcast_saved, chat_group(chat.job_id), client_id))
+        await self.channel_layer.group_send(
+            chat_group(chat.job_id),
+            {
+                'type': 'chat_message',
+                'message': {
+                    'id': None,
+                    'client_id': client_id,
+                    'sender': chat.user_id,
+                    'sender_name': chat.sender_name,
+                    'receiver': chat.receiver_id,
+                    'body': message_body,
+                    'timestamp': message.timestamp.isoformat(),
+                }
+            }
+        )
+
+    async def broadcast_saved(self, group_name, client_id, message):
+        await self.channel_layer.group_send(
+            group_name,
+            {
+                'type': 'message_saved',
+                'client_id': client_id,
+                'id': message.id,
+            }
+        )
+
+    async def message_saved(self, event):
+        """
+        Tells the client the database id of a write-behind message.
+        """
+        self.chat.saw(event['id'])
+        await self.send(text_data=json.dumps({
+            'type': 'message_saved',
+            'client_id': event['client_id'],
+            'id': event['id'],
+        }))
+
     async def chat_message(self, event):
         """
         Called when a message needs to be sent *to* the WebSocket (frontend).
         Receives messages broadcast from the group send.
         """
         message = event['message']
+        self.chat.saw(message['id'])
         await self.send(text_data=json.dumps({
             'message': message
         }))
 
+    async def handle_heartbeat(self, reply=True):
+        chat = self.chat
+        if await sync_to_async(mark_online)(chat.job_id, chat.user_id):
+            await self.broadcast_presence(True)
+        if reply:
+            await self.send(text_data=json.dumps({
+                'type': 'presence',
+                'user': chat.receiver_id,
+                'online': await sync_to_async(is_online)(chat.job_id, chat.receiver_id),
+            }))
+
+    async def broadcast_presence(self, online):
+        await self.channel_layer.group_send(
+            chat_group(self.chat.job_id),
+            {'type': 'presence_event', 'user': self.chat.user_id, 'online': online}
+        )
+
+    async def handle_typing(self, typing):
+        await self.channel_layer.group_send(
+            chat_group(self.chat.job_id),
+            {'type': 'typing_event', 'user': self.chat.user_id, 'typing': bool(typing)}
+        )
+
+    async def handle_read(self, message_id):
+        """
+        Relays a read receipt straight away and buffers the database
+        write. Receipts only move forwards, and never past the newest
+        message this socket has been sent, so they always name a message
+        in the job.
+        """
+        chat = self.chat
+        if not isinstance(message_id, int) or isinstance(message_id, bool):
+            return
+        message_id = min(message_id, chat.latest_id)
+        if message_id <= chat.last_read:
+            return
+        chat.last_read = message_id
+        get_receipt_buffer().put(chat.job_id, chat.user_id, message_id)
+        await self.channel_layer.group_send(
+            chat_group(chat.job_id),
+            {'type': 'read_receipt_event', 'user': chat.user_id, 'message_id': message_id}
+        )
+
+    async def presence_event(self, event):
+        if event['user'] != self.chat.user_id:
+            await self.send(text_data=json.dumps({'type': 'presence', 'user': event['user'], 'online': event['online']}))
+
+    async def typing_event(self, event):
+        if event['user'] != self.chat.user_id:
+            await self.send(text_data=json.dumps({'type': 'typing', 'user': event['user'], 'typing': event['typing']}))
+
+    async def read_receipt_event(self, event):
+        if event['user'] != self.chat.user_id:
+            await self.send(text_data=json.dumps({
+                'type': 'read_receipt', 'user': event['user'], 'message_id': event['message_id'],
+            }))
+
     @database_sync_to_async
-    def check_user_permission(self, job_id, user):
+    def get_participants(self, job_id, user_id):
         """
-        Checks if the user is the customer or the hired pro for the job.
-        Runs database queries in a synchronous thread.
+        Returns (other participant's id, the user's last read message id,
+        the other participant's last read message id) if the user is the
+        customer or the hired pro for the job, otherwise None.
+        One query, with the read receipts as subqueries.
         """
-        try:
-            job = Job.objects.select_related('accepted_bid__pro', 'customer').get(id=job_id)
-            if job.accepted_bid and (user == job.customer or user == job.accepted_bid.pro):
-                return True
-        except Job.DoesNotExist:
-            return False
-        return False
+        receipts = ReadReceipt.objects.filter(job=OuterRef('pk'))
+        participants = Job.objects.filter(id=job_id, accepted_bid__isnull=False).annotate(
+            customer_last_read=Subquery(
+                receipts.filter(user=OuterRef('customer_id')).values('last_read_message_id')[:1]
+            ),
+            pro_last_read=Subquery(
+                receipts.filter(user=OuterRef('accepted_bid__pro_id')).values('last_read_message_id')[:1]
+            ),
+        ).values_list('customer_id', 'accepted_bid__pro_id', 'customer_last_read', 'pro_last_read').first()
+        if participants is None:
+            return None
+        customer_id, pro_id, customer_last_read, pro_last_read = participants
+        if user_id == customer_id:
+            return pro_id, customer_last_read or 0, pro_last_read or 0
+        if user_id == pro_id:
+            return customer_id, pro_last_read or 0, customer_last_read or 0
+        return None
 
     @database_sync_to_async
     def save_message(self, message_body):
         """
-        Saves a message to the database. Determines the receiver.
+        Saves a message to the database for the participants resolved at
+        connect.
         """
         try:
-            job = Job.objects.select_related('accepted_bid__pro', 'customer').get(id=self.job_id)
-            sender = self.user
-            if sender == job.customer:
-                receiver = job.accepted_bid.pro
-            elif job.accepted_bid and sender == job.accepted_bid.pro:
-                receiver = job.customer
-            else:
-                return None
-            message = Message.objects.create(
-                job=job,
-                sender=sender,
-                receiver=receiver,
+            return Message.objects.create(
+                job_id=self.chat.job_id,
+                sender_id=self.chat.user_id,
+                receiver_id=self.chat.receiver_id,
                 body=message_body
             )
-            return message
-        except Job.DoesNotExist:
-            return None
         except Exception as e:
             print(f"Error saving message to DB: {e}")
             return None
 
+
+class ReplayingFeedConsumer(AsyncWebsocketConsumer):
+    """
+    Base for feeds backed by a ReplayBuffer (see api/feeds.py).
+
+    Every event carries a `seq`. A reconnecting client passes the last one
+    it saw as `?since=<seq>` and missed events are replayed before a
+    {"type": <feed_type>, "seq", "resync"} frame; `resync` is true when the
+    client must reload from the REST API instead (a fresh connection, or
+    one that has fallen behind the buffer).
+
+    Subclasses set `feed_groups`, `params` and `buffer` in connect() and
+    then call start().
+    """
+    feed_type = None
+    event_type = None
+    recent_size = 64
+
+    async def start(self):
+        # An event sent to several of the connection's groups is delivered
+        # once per group; recently sent sequence numbers drop the repeats.
+        self.recent_seqs = deque(maxlen=self.recent_size)
+        for group in self.feed_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+        try:
+            since = int(self.params['since'][0])
+        except (KeyError, ValueError):
+            since = None
+        if since is None:
+            events, latest = None, await sync_to_async(self.buffer.latest)()
+        else:
+            events, latest = await sync_to_async(self.buffer.since)(since)
+        for seq, event in events or ():
+            if self.event_visible(event):
+                await self.send_event(seq, event)
+        await self.send(text_data=json.dumps({
+            'type': self.feed_type,
+            'seq': latest,
+            'resync': events is None,
+        }))
+
+    def event_visible(self, event):
+        return True
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, 'feed_groups', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def send_event(self, seq, event):
+        if seq in self.recent_seqs:
+            return
+        self.recent_seqs.append(seq)
+        await self.send(text_data=json.dumps({'type': self.event_type, 'seq': seq, **event}))
+
+    async def relay_event(self, message):
+        event = {key: value for key, value in message.items() if key not in ('type', 'seq')}
+        await self.send_event(message['seq'], event)
+
+
+class JobFeedConsumer(ReplayingFeedConsumer):
+    """
+    Pushes job `created` / `closed` events to a pro, replacing polling of
+    JobListView. The pro is subscribed to the zip codes they serve, plus
+    any states listed in `?states=TX,OK`.
+    """
+    feed_type = 'job_feed'
+    event_type = 'job_event'
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if not self.user.is_authenticated or not self.user.is_pro:
+            await self.close()
+            return
+        self.params = parse_qs(self.scope.get('query_string', b'').decode('utf-8'))
+        self.zip_codes = {group_token(zip_code) for zip_code in await self.get_service_zip_codes(self.user.id)}
+        self.states = {
+            group_token(state) for state in self.params.get('states', [''])[0].split(',') if group_token(state)
+        }
+        self.feed_groups = [zip_group(z) for z in self.zip_codes] + [state_group(s) for s in self.states]
+        self.buffer = job_feed
+        await self.start()
+
+    def event_visible(self, event):
+        return event_matches(event, self.zip_codes, self.states)
+
+    async def job_event(self, message):
+        await self.relay_event(message)
+
     @database_sync_to_async
-    def get_user_display_name(self, user):
-        """Gets the user's display name."""
-        return f"{user.first_name} {user.last_name}".strip() or user.username
\ No newline at end of file
+    def get_service_zip_codes(self, user_id):
+        return list(ServiceArea.objects.filter(pro_id=user_id).values_list('zip_code', flat=True))
+
+
+class BidNotificationConsumer(ReplayingFeedConsumer):
+    """
+    Pushes `new_bid` / `bid_accepted` events for the user's own jobs, so
+    customers no longer re-fetch JobDetailView or MyJobsListView to see
+    bids. Users offline when a bid arrives get it replayed on their next
+    connection with `?since=`.
+    """
+    feed_type = 'bid_feed'
+    event_type = 'bid_event'
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+        self.params = parse_qs(self.scope.get('query_string', b'').decode('utf-8'))
+        self.feed_groups = [customer_group(self.user.id)]
+        self.buffer = bid_notifications(self.user.id)
+        await self.start()
+
+    async def bid_event(self, message):
+        await self.relay_event(message)
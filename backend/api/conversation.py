@@ -0,0 +1,93 @@
+import math
+
+from django.conf import settings
+
+
+DEFAULT_HISTORY_TOKEN_BUDGET = 2000
+DEFAULT_HISTORY_MAX_TURNS = 20
+DEFAULT_TURN_MAX_CHARS = 2000
+DEFAULT_SUMMARY_MAX_CHARS = 1200
+DEFAULT_MAX_BODY_BYTES = 64 * 1024
+CHARS_PER_TOKEN = 4
+TOKENS_PER_TURN = 4
+
+SUMMARY_PREFIX = 'Summary of our conversation so far: '
+SUMMARY_ACK = 'Thanks, I have that context.'
+
+
+def estimate_tokens(text):
+    """
+    Rough token count (about four characters per token for English),
+    good enough to keep prompts inside a budget without a tokenizer.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def turn_tokens(turn):
+    return estimate_tokens(turn['text']) + TOKENS_PER_TURN
+
+
+def clean_history(history):
+    """
+    Keeps well-formed {"sender", "text"} turns, with each text capped at
+    ASSISTANT_TURN_MAX_CHARS.
+    """
+    max_chars = getattr(settings, 'ASSISTANT_TURN_MAX_CHARS', DEFAULT_TURN_MAX_CHARS)
+    if not isinstance(history, list):
+        return []
+    cleaned = []
+    for turn in history:
+        if not isinstance(turn, dict) or not isinstance(turn.get('text'), str) or not turn['text']:
+            continue
+        sender = 'user' if turn.get('sender') == 'user' else 'ai'
+        cleaned.append({'sender': sender, 'text': turn['text'][:max_chars]})
+    return cleaned
+
+
+def window_history(history, reserved_tokens=0):
+    """
+    Splits history into (older, recent): `recent` is the longest suffix
+    that fits ASSISTANT_HISTORY_TOKEN_BUDGET (less `reserved_tokens`) and
+    ASSISTANT_HISTORY_MAX_TURNS, starting on a user turn.
+    """
+    budget = getattr(settings, 'ASSISTANT_HISTORY_TOKEN_BUDGET', DEFAULT_HISTORY_TOKEN_BUDGET) - reserved_tokens
+    max_turns = getattr(settings, 'ASSISTANT_HISTORY_MAX_TURNS', DEFAULT_HISTORY_MAX_TURNS)
+    start = len(history)
+    used = 0
+    while start > 0 and len(history) - start < max_turns:
+        cost = turn_tokens(history[start - 1])
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    while start < len(history) and history[start]['sender'] != 'user':
+        start += 1
+    return history[:start], history[start:]
+
+
+def extractive_summary(previous, turns):
+    """
+    Local rolling summary: the previous summary followed by the dropped
+    turns, keeping the most recent ASSISTANT_SUMMARY_MAX_CHARS characters.
+    Used by the stub assistant and whenever model summarization fails.
+    """
+    max_chars = getattr(settings, 'ASSISTANT_SUMMARY_MAX_CHARS', DEFAULT_SUMMARY_MAX_CHARS)
+    lines = [previous] if previous else []
+    lines += [f"{'User' if turn['sender'] == 'user' else 'ARA'}: {turn['text']}" for turn in turns]
+    summary = ' '.join(' '.join(lines).split())
+    if len(summary) > max_chars:
+        summary = '...' + summary[-(max_chars - 3):]
+    return summary
+
+
+def with_summary(summary, recent):
+    """
+    Prepends the rolling summary to the prompt history as a user/model
+    exchange, so roles keep alternating.
+    """
+    if not summary:
+        return recent
+    return [
+        {'sender': 'user', 'text': SUMMARY_PREFIX + summary},
+        {'sender': 'ai', 'text': SUMMARY_ACK},
+    ] + recent
@@ -0,0 +1,199 @@
+import re
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+
+DEFAULT_JOB_FEED_REPLAY_SIZE = 1000
+DEFAULT_BID_NOTIFICATION_REPLAY_SIZE = 50
+DEFAULT_BID_NOTIFICATION_REPLAY_TTL = 60 * 60 * 24 * 7
+GROUP_NAME_RE = re.compile(r'[^A-Za-z0-9]')
+# Sequence numbers this close to the head may be missing from the ring
+# because append() has taken them but not yet written their slot; that
+# only happens within IN_FLIGHT_SECONDS of an append.
+IN_FLIGHT_WINDOW = 16
+IN_FLIGHT_SECONDS = 1
+
+
+class ReplayBuffer:
+    """
+    Bounded, sequenced event log kept in the default cache (Redis in
+    production), so whichever worker a client reconnects to can replay
+    what it missed.
+
+    Sequence numbers come from an atomic counter; events live in a ring
+    of `size` slots, optionally expiring after `ttl` seconds. A client that
+    has fallen further behind than the ring (or whose sequence the cache
+    no longer knows, or whose missed events the cache has dropped) is
+    told to resync. The cache must be able to hold the whole ring, or
+    evictions turn into needless resyncs.
+    """
+    def __init__(self, name, size_setting, default_size, ttl_setting=None, default_ttl=None):
+        self.name = name
+        self.size_setting = size_setting
+        self.default_size = default_size
+        self.ttl_setting = ttl_setting
+        self.default_ttl = default_ttl
+
+    @property
+    def size(self):
+        return getattr(settings, self.size_setting, self.default_size)
+
+    @property
+    def ttl(self):
+        return getattr(settings, self.ttl_setting, self.default_ttl) if self.ttl_setting else self.default_ttl
+
+    @property
+    def seq_key(self):
+        return f'{self.name}:seq'
+
+    @property
+    def appending_key(self):
+        return f'{self.name}:appending'
+
+    def slot_key(self, seq):
+        return f'{self.name}:slot:{seq % self.size}'
+
+    def append(self, event):
+        """
+        Stores `event` and returns its sequence number.
+        """
+        cache.set(self.appending_key, 1, IN_FLIGHT_SECONDS)
+        cache.add(self.seq_key, 0, None)
+        try:
+            seq = cache.incr(self.seq_key)
+        except ValueError:
+            # The counter was evicted between add() and incr().
+            cache.add(self.seq_key, 0, None)
+            seq = cache.incr(self.seq_key)
+        cache.set(self.slot_key(seq), (seq, event), self.ttl)
+        return seq
+
+    def latest(self):
+        return cache.get(self.seq_key, 0)
+
+    def since(self, seq):
+        """
+        Returns (events, latest): the [(seq, event), ...] after `seq`, or
+        None for events if the client must resync. A trailing run of
+        missing slots within IN_FLIGHT_WINDOW of the head, just after an
+        append, is skipped, as those events are still being published and
+        arrive live; any other gap (one followed by a stored event) means
+        the cache lost (or expired) events and the client must resync.
+        """
+        latest = self.latest()
+        if seq > latest or latest - seq > self.size:
+            return None, latest
+        wanted = range(seq + 1, latest + 1)
+        slots = cache.get_many([self.slot_key(s) for s in wanted])
+        events = []
+        missing = False
+        for s in wanted:
+            entry = slots.get(self.slot_key(s))
+            if entry is None or entry[0] < s:
+                if latest - s >= IN_FLIGHT_WINDOW:
+                    return None, latest
+                missing = True
+                continue
+            if missing or entry[0] > s:
+                return None, latest
+            events.append(entry)
+        if missing and cache.get(self.appending_key) is None:
+            return None, latest
+        return events, latest
+
+
+job_feed = ReplayBuffer('job_feed', 'JOB_FEED_REPLAY_SIZE', DEFAULT_JOB_FEED_REPLAY_SIZE)
+
+
+def bid_notifications(customer_id):
+    """
+    A customer's bid notifications, kept for offline users up to
+    BID_NOTIFICATION_REPLAY_SIZE events and BID_NOTIFICATION_REPLAY_TTL seconds.
+    """
+    return ReplayBuffer(
+        f'bid_notifications:{customer_id}',
+        'BID_NOTIFICATION_REPLAY_SIZE', DEFAULT_BID_NOTIFICATION_REPLAY_SIZE,
+        'BID_NOTIFICATION_REPLAY_TTL', DEFAULT_BID_NOTIFICATION_REPLAY_TTL,
+    )
+
+
+def group_token(value):
+    # Channel layer group names only allow ASCII letters, digits, -, _ and .
+    return GROUP_NAME_RE.sub('', str(value)).upper()[:40]
+
+
+def zip_group(zip_code):
+    return f'jobs_zip_{group_token(zip_code)}'
+
+
+def state_group(state):
+    return f'jobs_state_{group_token(state)}'
+
+
+def customer_group(customer_id):
+    return f'bids_customer_{customer_id}'
+
+
+def job_event(kind, job):
+    """
+    Compact job feed payload: enough to render a job card for `created`,
+    only the id and location for `closed`.
+    """
+    summary = {'id': job.id, 'zip_code': job.zip_code, 'state': job.state}
+    if kind == 'created':
+        summary.update(title=job.title, city=job.city, created_at=job.created_at.isoformat())
+    return {'event': kind, 'job': summary}
+
+
+def event_matches(event, zip_codes, states):
+    job = event['job']
+    return group_token(job['zip_code']) in zip_codes or group_token(job['state']) in states
+
+
+def bid_event(kind, bid):
+    """
+    Delta payload for the job owner: the new bid as BidSerializer renders
+    it for `new_bid`, only the ids for `bid_accepted`.
+    """
+    if kind == 'new_bid':
+        return {'event': kind, 'job_id': bid.job_id, 'bid': {
+            'id': bid.id, 'job': bid.job_id, 'pro': bid.pro_id, 'amount': str(bid.amount),
+            'details': bid.details, 'created_at': bid.created_at.isoformat(),
+        }}
+    return {'event': kind, 'job_id': bid.job_id, 'bid_id': bid.id, 'pro': bid.pro_id}
+
+
+def publish(buffer, groups, message_type, event):
+    """
+    Records `event` in `buffer` and pushes it to `groups` as `message_type`.
+    Call after commit. Delivery failures are logged; reconnecting clients
+    catch up by seq.
+    """
+    seq = buffer.append(event)
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return seq
+    message = {'type': message_type, 'seq': seq, **event}
+    for group in groups:
+        try:
+            async_to_sync(channel_layer.group_send)(group, message)
+        except Exception as e:
+            print(f"Error publishing {message_type} to {group}: {e}")
+    return seq
+
+
+def publish_job_event(kind, job):
+    """
+    Publishes a job `created` / `closed` event to the job's zip and state groups.
+    """
+    return publish(job_feed, (zip_group(job.zip_code), state_group(job.state)), 'job_event', job_event(kind, job))
+
+
+def publish_bid_event(kind, bid, customer_id):
+    """
+    Publishes a `new_bid` / `bid_accepted` event to the job owner's group.
+    """
+    return publish(bid_notifications(customer_id), (customer_group(customer_id),), 'bid_event', bid_event(kind, bid))
@@ -0,0 +1,149 @@
+import csv
+import gzip
+import math
+from pathlib import Path
+
+from django.db.models import Case, FloatField, Q, Value, When
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+ZIP_CENTROIDS_PATH = Path(__file__).resolve().parent / 'data' / 'zip_centroids.csv.gz'
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+MAX_WITHIN_MILES = 100
+
+
+def read_zip_centroids(path=ZIP_CENTROIDS_PATH):
+    """
+    Yields (zip_code, latitude, longitude) rows from the bundled dataset.
+    """
+    with gzip.open(path, 'rt', newline='') as f:
+        for row in csv.DictReader(f):
+            yield row['zip_code'], float(row['latitude']), float(row['longitude'])
+
+
+def load_zip_centroids(model, batch_size=5000, path=ZIP_CENTROIDS_PATH):
+    """
+    Replaces the contents of the ZipCentroid table (or its historical
+    migration model) with the bundled dataset. Returns the row count.
+    """
+    rows = [
+        model(zip_code=zip_code, latitude=latitude, longitude=longitude)
+        for zip_code, latitude, longitude in read_zip_centroids(path)
+    ]
+    model.objects.all().delete()
+    model.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude, longitude, miles):
+    """
+    Returns (min_lat, max_lat, min_lon, max_lon) enclosing a circle of
+    `miles` around the point. Slightly generous so it never cuts off a
+    point that the haversine check would accept.
+    """
+    lat_delta = miles / MILES_PER_DEGREE_LATITUDE
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    lon_delta = miles / (MILES_PER_DEGREE_LATITUDE * cos_lat)
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+
+
+def zip_distances(origins, miles):
+    """
+    Maps every ZIP code within `miles` of any origin centroid to its
+    distance in miles from the nearest origin.
+
+    The ZipCentroid table is prefiltered with one bounding-box query per
+    origin (served by the latitude/longitude index), then refined with
+    the exact haversine distance in Python on the small candidate set.
+    """
+    from .models import ZipCentroid
+
+    origins = list(origins)
+    if not origins:
+        return {}
+
+    boxes = Q()
+    for origin in origins:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(origin.latitude, origin.longitude, miles)
+        boxes |= Q(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+
+    distances = {}
+    for zip_code, latitude, longitude in ZipCentroid.objects.filter(boxes).values_list(
+        'zip_code', 'latitude', 'longitude'
+    ):
+        distance = min(
+            haversine_miles(origin.latitude, origin.longitude, latitude, longitude) for origin in origins
+        )
+        if distance <= miles:
+            distances[zip_code] = round(distance, 2)
+    return distances
+
+
+class ProximityFilter(BaseFilterBackend):
+    """
+    Filters jobs to those within `?within_miles=` of the requesting pro's
+    service-area ZIP codes and annotates each with `distance` in miles.
+    Matching is done at ZIP-centroid granularity, so the job query is a
+    plain `zip_code IN (...)` lookup on the open-job index.
+    """
+    within_param = 'within_miles'
+    distance_annotation = 'distance'
+
+    def get_within_miles(self, request):
+        raw = request.query_params.get(self.within_param)
+        if raw in (None, ''):
+            return None
+        try:
+            miles = float(raw)
+        except ValueError:
+            raise ValidationError({self.within_param: 'A number of miles is required.'})
+        if not 0 < miles <= MAX_WITHIN_MILES:
+            raise ValidationError({self.within_param: f'Must be between 0 and {MAX_WITHIN_MILES}.'})
+        return miles
+
+    def filter_queryset(self, request, queryset, view):
+        from .models import ZipCentroid
+
+        miles = self.get_within_miles(request)
+        if miles is None:
+            return queryset
+
+        origins = ZipCentroid.objects.filter(zip_code__in=request.user.service_areas.values('zip_code'))
+        distances = zip_distances(origins, miles)
+        if not distances:
+            return queryset.none().annotate(**{self.distance_annotation: Value(None, output_field=FloatField())})
+
+        distance = Case(
+            *[When(zip_code=zip_code, then=Value(value)) for zip_code, value in distances.items()],
+            output_field=FloatField(),
+        )
+        return queryset.filter(zip_code__in=list(distances)).annotate(**{self.distance_annotation: distance})
+
+
+class ProximityOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that defaults to nearest-first when the request is a
+    proximity search, and only accepts `distance` as an ordering field
+    when it has been annotated by ProximityFilter.
+    """
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and request.query_params.get(ProximityFilter.within_param):
+            return [ProximityFilter.distance_annotation]
+        return super().get_ordering(request, queryset, view)
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        if not request.query_params.get(ProximityFilter.within_param):
+            valid = [term for term in valid if term.lstrip('-') != ProximityFilter.distance_annotation]
+        return valid
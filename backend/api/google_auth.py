@@ -0,0 +1,68 @@
+import re
+import threading
+import time
+
+import requests
+from google.auth import transport
+from google.auth.transport import requests as google_requests
+
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+# google-auth's own transport default; its cert fetches never pass one.
+DEFAULT_TIMEOUT = 120
+
+
+def cache_lifetime(headers):
+    """
+    Seconds a response may be reused for, from `Cache-Control: max-age`
+    less its `Age`. Responses marked no-store/no-cache or without a
+    max-age are not cached.
+    """
+    cache_control = headers.get('Cache-Control', '').lower()
+    match = MAX_AGE_RE.search(cache_control)
+    if not match or 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    try:
+        age = int(headers.get('Age', 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class CachedCertsRequest(transport.Request):
+    """
+    google-auth transport that reuses one HTTP session and keeps successful
+    GET responses (Google's signing certificates) for as long as their
+    Cache-Control allows, so ID tokens are verified without a network call
+    until Google says the keys may have rotated.
+    """
+    def __init__(self, session=None, clock=time.monotonic):
+        self.request = google_requests.Request(session=session or requests.Session())
+        self.clock = clock
+        self.responses = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        if method != 'GET' or body is not None:
+            return self.request(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+        with self.lock:
+            entry = self.responses.get(url)
+            if entry is not None and entry[0] > self.clock():
+                return entry[1]
+
+        response = self.request(url, method=method, headers=headers, timeout=timeout, **kwargs)
+        lifetime = cache_lifetime(response.headers)
+        with self.lock:
+            if response.status == 200 and lifetime:
+                self.responses[url] = (self.clock() + lifetime, response)
+            else:
+                self.responses.pop(url, None)
+        return response
+
+    def clear(self):
+        with self.lock:
+            self.responses.clear()
+
+
+google_request = CachedCertsRequest()
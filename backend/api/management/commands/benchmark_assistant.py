@@ -0,0 +1,64 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import async_to_sync
+from channels.testing import HttpCommunicator
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent requests at the ARA chat endpoint through the ASGI "
+        "application in-process and reports latency percentiles and "
+        "throughput. Uses the offline stub assistant unless --backend is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--latency', type=float, default=0.5, help='Stub reply latency in seconds.')
+        parser.add_argument('--backend', default='api.assistant.StubAssistant', help='ASSISTANT_BACKEND to benchmark.')
+        parser.add_argument('--message', default='My dishwasher is not draining.')
+
+    def handle(self, *args, **options):
+        settings.ASSISTANT_BACKEND = options['backend']
+        settings.ASSISTANT_STUB_LATENCY = options['latency']
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+        timings, elapsed = async_to_sync(self.run)(options)
+        timings.sort()
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(timings)} requests at concurrency {options['concurrency']} in {elapsed:.2f} s "
+            f"({len(timings) / elapsed:.1f} req/s); "
+            f"p50 {percentile(0.5):.0f} ms, p95 {percentile(0.95):.0f} ms, max {timings[-1] * 1000:.0f} ms"
+        ))
+
+    async def run(self, options):
+        application = get_asgi_application()
+        body = json.dumps({'message': options['message'], 'history': []}).encode()
+        headers = [(b'content-type', b'application/json'), (b'host', b'testserver')]
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        timings = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                communicator = HttpCommunicator(application, 'POST', reverse('chat'), body=body, headers=headers)
+                response = await communicator.get_response(timeout=60)
+                if response['status'] != 200:
+                    raise RuntimeError(f"Chat request failed: {response['status']} {response['body']!r}")
+                timings.append(time.perf_counter() - start)
+
+        # The first request loads the URLconf and views; keep it out of the numbers.
+        await one()
+        timings.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(options['requests'])))
+        return timings, time.perf_counter() - start
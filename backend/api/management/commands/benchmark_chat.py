@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import delete_benchmark_users, seed_chat
+from api.middleware import TokenAuthMiddleware
+from api.routing import websocket_urlpatterns
+
+
+BENCH_PREFIX = 'bench_chat_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives ChatConsumer in-process through the WebSocket interface and "
+        "reports chat messages per second for a single worker. Every sent "
+        "frame is broadcast back before it is counted, and the run ends "
+        "once all messages are persisted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chats', type=int, default=10, help='Concurrent chat connections.')
+        parser.add_argument('--messages', type=int, default=200, help='Messages sent per chat.')
+        parser.add_argument('--redis', action='store_true', help='Use the configured channel layer instead of an in-memory one.')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users, chats and messages afterwards.')
+        parser.add_argument('--write-behind', action='store_true', help='Enable CHAT_WRITE_BEHIND for the run.')
+
+    def handle(self, *args, **options):
+        if not options['redis']:
+            channel_layers.set('default', InMemoryChannelLayer())
+        if options['write_behind']:
+            settings.CHAT_WRITE_BEHIND = True
+        chats = [seed_chat(BENCH_PREFIX, i)[:2] for i in range(options['chats'])]
+        try:
+            elapsed = async_to_sync(self.run_chats)(chats, options['messages'])
+        finally:
+            if not options['keep']:
+                delete_benchmark_users(BENCH_PREFIX)
+        total = options['chats'] * options['messages']
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} messages over {options["chats"]} chats in {elapsed:.2f} s: {total / elapsed:.0f} messages/s'
+        ))
+
+    async def run_chats(self, chats, messages):
+        application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+        communicators = []
+        for job, token in chats:
+            communicator = WebsocketCommunicator(application, f'/ws/chat/{job.id}/?token={token.key}')
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError(f'Could not connect to chat for job {job.id}')
+            await communicator.receive_from()
+            communicators.append(communicator)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.chat(communicator, messages) for communicator in communicators))
+        # Disconnecting flushes anything still queued in write-behind mode.
+        for communicator in communicators:
+            await communicator.disconnect()
+        return time.perf_counter() - start
+
+    async def chat(self, communicator, messages):
+        for i in range(messages):
+            await communicator.send_json_to({'message': f'Benchmark message {i}'})
+            while 'message' not in await communicator.receive_json_from(timeout=10):
+                pass
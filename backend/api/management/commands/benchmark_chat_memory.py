@@ -0,0 +1,94 @@
+import gc
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, channel_layers
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import delete_benchmark_users, seed_chat
+from api.middleware import TokenAuthMiddleware
+from api.routing import websocket_urlpatterns
+
+
+BENCH_PREFIX = 'bench_memory_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Opens idle ChatConsumer connections in-process and reports the "
+        "memory each one keeps, as measured by tracemalloc, with the "
+        "source files holding the most."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--chats', type=int, default=10, help='Chats the connections are spread over.')
+        parser.add_argument('--history', type=int, default=50, help='Messages seeded per chat.')
+        parser.add_argument('--top', type=int, default=10, help='Number of source files to list.')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users, chats and messages afterwards.')
+
+    def handle(self, *args, **options):
+        channel_layers.set('default', InMemoryChannelLayer())
+        paths = []
+        try:
+            for i in range(options['chats']):
+                job, *tokens = seed_chat(BENCH_PREFIX, i, options['history'])
+                paths.extend(f'/ws/chat/{job.id}/?token={token.key}' for token in tokens)
+            paths = [paths[i % len(paths)] for i in range(options['connections'])]
+
+            per_connection, by_file = async_to_sync(measure_connection_memory)(paths)
+        finally:
+            if not options['keep']:
+                delete_benchmark_users(BENCH_PREFIX)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(paths)} idle connections: {per_connection / 1024:.2f} KiB per connection"
+        ))
+        for size, filename in by_file[:options['top']]:
+            self.stdout.write(f"  {size / len(paths):10.0f} B  {filename}")
+
+
+async def measure_connection_memory(paths):
+    """
+    Connects a WebsocketCommunicator to each path, drains the history
+    frames and returns (bytes retained per connection, [(bytes, filename),
+    ...] largest first), from tracemalloc snapshots taken before and after.
+    One connection per distinct path is opened and closed beforehand, so
+    lazily built module state and token lookups are not counted.
+    """
+    application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+    for path in set(paths):
+        communicator = await connect(application, path)
+        await communicator.disconnect()
+
+    tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        communicators = [await connect(application, path) for path in paths]
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    for communicator in communicators:
+        await communicator.disconnect()
+
+    stats = after.compare_to(before, 'filename')
+    total = sum(stat.size_diff for stat in stats)
+    by_file = sorted(
+        ((stat.size_diff, stat.traceback[0].filename) for stat in stats if stat.size_diff > 0), reverse=True
+    )
+    return total / len(paths), by_file
+
+
+async def connect(application, path):
+    communicator = WebsocketCommunicator(application, path)
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError(f'Could not connect to {path}')
+    # Drain the history; the last frame of the page says so.
+    while True:
+        frame = await communicator.receive_json_from()
+        if frame.get('type') == 'message_history' and frame.get('last', True):
+            return communicator
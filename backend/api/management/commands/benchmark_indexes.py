@@ -0,0 +1,213 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from api.models import User, Job, Bid, Message
+
+
+BENCH_PREFIX = 'bench_'
+STATES = ['TX', 'OK', 'LA', 'AR', 'NM']
+BENCHMARKED_INDEXES = {
+    Job: [
+        'job_open_zip_state_idx',
+        'job_open_created_idx',
+        'job_customer_created_idx',
+        'job_accepted_bid_idx',
+    ],
+    Message: ['message_job_timestamp_idx'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds the configured database with a large synthetic marketplace and "
+        "prints the query plan and timing of the hot Job/Message lookups with "
+        "the composite indexes dropped (before) and restored (after). "
+        "Only for scratch databases: it needs --scratch, and deletes what it "
+        "seeded afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=1_000_000, help='Number of jobs to seed.')
+        parser.add_argument('--customers', type=int, default=20_000)
+        parser.add_argument('--pros', type=int, default=2_000)
+        parser.add_argument('--zip-codes', type=int, default=500)
+        parser.add_argument('--open-ratio', type=float, default=0.1, help='Fraction of jobs left open.')
+        parser.add_argument('--messages-per-job', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed executions per query.')
+        parser.add_argument('--no-seed', action='store_true', help='Reuse benchmark data kept with --keep.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data for later --no-seed runs.')
+        parser.add_argument(
+            '--scratch', action='store_true',
+            help='Confirm the configured database is a scratch copy the benchmark may fill and drop indexes on.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['scratch']:
+            raise CommandError(
+                f"benchmark_indexes seeds about {options['jobs']} jobs into {connection.settings_dict['NAME']} "
+                "and drops and recreates its indexes; rerun with --scratch against a scratch database."
+            )
+        random.seed(42)
+        try:
+            if not options['no_seed']:
+                self.seed(options)
+            self.analyze()
+
+            queries = self.get_queries(options)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Before (benchmark indexes dropped)'))
+            self.toggle_indexes(enabled=False)
+            try:
+                self.report(queries, options['repeat'])
+            finally:
+                self.toggle_indexes(enabled=True)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('After (benchmark indexes present)'))
+            self.report(queries, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.clean_up(options['batch_size'])
+
+    def seed(self, options):
+        batch_size = options['batch_size']
+        self.stdout.write(f"Seeding {options['jobs']} jobs...")
+
+        customers = self.seed_users('customer', options['customers'], is_pro=False)
+        pros = self.seed_users('pro', options['pros'], is_pro=True)
+        zip_codes = [f'{75000 + i:05d}' for i in range(options['zip_codes'])]
+
+        remaining = options['jobs']
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            with transaction.atomic():
+                jobs = Job.objects.bulk_create([
+                    Job(
+                        customer_id=random.choice(customers),
+                        title='Benchmark job',
+                        description='Seeded by benchmark_indexes.',
+                        street_address='1 Main St',
+                        city='Dallas',
+                        state=random.choice(STATES),
+                        zip_code=random.choice(zip_codes),
+                        is_completed=random.random() >= options['open_ratio'],
+                    )
+                    for _ in range(size)
+                ], batch_size=batch_size)
+                self.seed_accepted_bids(
+                    [job for job in jobs if job.is_completed], pros, options['messages_per_job']
+                )
+            remaining -= size
+            self.stdout.write(f"  {options['jobs'] - remaining} jobs")
+
+    def seed_users(self, role, count, is_pro):
+        existing = list(
+            User.objects.filter(username__startswith=f'{BENCH_PREFIX}{role}_').values_list('id', flat=True)
+        )
+        if len(existing) >= count:
+            return existing
+        User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}{role}_{i}', email=f'{BENCH_PREFIX}{role}_{i}@example.com', is_pro=is_pro)
+            for i in range(len(existing), count)
+        ], batch_size=5_000)
+        return list(User.objects.filter(username__startswith=f'{BENCH_PREFIX}{role}_').values_list('id', flat=True))
+
+    def seed_accepted_bids(self, jobs, pros, messages_per_job):
+        if not jobs:
+            return
+        bids = Bid.objects.bulk_create([
+            Bid(job_id=job.id, pro_id=random.choice(pros), amount=100, details='Seeded bid.')
+            for job in jobs
+        ])
+        job_ids = [job.id for job in jobs]
+        Job.objects.filter(id__in=job_ids).update(
+            accepted_bid=Subquery(Bid.objects.filter(job=OuterRef('pk')).values('id')[:1])
+        )
+        if messages_per_job:
+            # Only about 50 hired jobs per batch get a conversation, which
+            # with the defaults keeps the message table around a tenth of
+            # the size of the job table.
+            chatty = bids[::max(1, len(bids) // 50)]
+            Message.objects.bulk_create([
+                Message(job_id=bid.job_id, sender_id=bid.pro_id, receiver_id=bid.pro_id, body='Seeded message.')
+                for bid in chatty
+                for _ in range(messages_per_job)
+            ])
+
+    def clean_up(self, batch_size):
+        """
+        Deletes the benchmark users and, through them, everything seeded.
+        Jobs go first, in batches, so no single delete has to collect the
+        whole table.
+        """
+        self.stdout.write('Deleting benchmark data...')
+        users = User.objects.filter(
+            Q(username__startswith=f'{BENCH_PREFIX}customer_') | Q(username__startswith=f'{BENCH_PREFIX}pro_')
+        )
+        jobs = Job.objects.filter(customer__in=users)
+        while True:
+            ids = list(jobs.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            Job.objects.filter(id__in=ids).delete()
+        users.delete()
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE api_job, api_bid, api_message')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def get_queries(self, options):
+        sample_job = Job.objects.filter(is_completed=False).order_by('id').first()
+        sample_accepted = Job.objects.filter(accepted_bid__isnull=False, messages__isnull=False).first()
+        if sample_job is None or sample_accepted is None:
+            self.stderr.write('Not enough benchmark data; run without --no-seed first.')
+            return []
+        pro = sample_accepted.accepted_bid.pro_id
+        return [
+            ('JobListView (open jobs)',
+             Job.objects.filter(is_completed=False).order_by('-created_at', '-id')[:20]),
+            ('JobListView ?zip_code=&state=',
+             Job.objects.filter(is_completed=False, zip_code=sample_job.zip_code, state=sample_job.state)
+             .order_by('-created_at', '-id')[:20]),
+            ('MyJobsListView',
+             Job.objects.filter(customer_id=sample_job.customer_id).order_by('-created_at', '-id')[:20]),
+            ('MyAcceptedJobsListView',
+             Job.objects.filter(accepted_bid__pro_id=pro).order_by('-created_at', '-id')[:20]),
+            ('MessageListView',
+             Message.objects.filter(job=sample_accepted).order_by('timestamp', 'id')[:50]),
+            ('ChatConsumer.get_message_history',
+             Message.objects.filter(job=sample_accepted).order_by('-timestamp', '-id')[:50]),
+        ]
+
+    def report(self, queries, repeat):
+        for label, queryset in queries:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset._chain())
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: median {timings[len(timings) // 2]:.2f} ms, best {timings[0]:.2f} ms'
+            ))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
+
+    def toggle_indexes(self, enabled):
+        with connection.schema_editor() as schema_editor:
+            for model, names in BENCHMARKED_INDEXES.items():
+                for index in model._meta.indexes:
+                    if index.name not in names:
+                        continue
+                    if enabled:
+                        schema_editor.add_index(model, index)
+                    else:
+                        schema_editor.remove_index(model, index)
+        self.analyze()
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import websockets
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.benchmarks import delete_benchmark_users, seed_chat
+from api.miniredis import MiniRedis
+
+
+BENCH_PREFIX = 'bench_scale_'
+LAYERS = {
+    'pubsub': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+    'core': 'channels_redis.core.RedisChannelLayer',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs N daphne workers of fourkara.asgi.application sharing one Redis "
+        "(an in-process MiniRedis stand-in unless --redis-url is given), "
+        "opens a customer and a pro socket per chat on different workers, "
+        "replays paced chat traffic and reports cross-worker delivery "
+        "latency and worker memory per connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--chats', type=int, default=500, help='Chats to open; each holds two sockets.')
+        parser.add_argument('--messages', type=int, default=10, help='Messages sent per chat.')
+        parser.add_argument('--rate', type=float, default=1.0, help='Messages per second per chat.')
+        parser.add_argument('--layer', choices=sorted(LAYERS), default='pubsub')
+        parser.add_argument('--redis-url', help='Use this Redis instead of the in-process stand-in.')
+        parser.add_argument('--write-behind', action='store_true', help='Enable CHAT_WRITE_BEHIND in the workers.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for stragglers.')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark users, chats and messages afterwards.')
+
+    def handle(self, *args, **options):
+        if options['layer'] == 'core' and not options['redis_url']:
+            raise CommandError('The core layer runs Lua scripts, which MiniRedis lacks; pass --redis-url.')
+        self.verbosity = options['verbosity']
+        try:
+            with transaction.atomic():
+                chats = [
+                    (job.id, customer_token.key, pro_token.key)
+                    for job, customer_token, pro_token in (seed_chat(BENCH_PREFIX, i) for i in range(options['chats']))
+                ]
+            report = async_to_sync(self.run)(chats, options)
+        finally:
+            if not options['keep']:
+                delete_benchmark_users(BENCH_PREFIX)
+        self.print_report(report, options)
+
+    async def run(self, chats, options):
+        broker = None
+        redis_url = options['redis_url']
+        if not redis_url:
+            broker = await MiniRedis().start()
+            redis_url = broker.url
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            'REDIS_URL': redis_url,
+            'CACHE_REDIS_URL': redis_url,
+            'CHANNEL_LAYER_BACKEND': LAYERS[options['layer']],
+            'CHAT_WRITE_BEHIND': str(options['write_behind']),
+        }
+        workers = []
+        sockets = []
+        try:
+            for _ in range(options['workers']):
+                workers.append(await self.start_worker(env))
+            # Let each worker load what the first connection pulls in, so
+            # the memory baseline only leaves per-connection state out.
+            for i, (_, port) in enumerate(workers):
+                job_id, customer_token, _ = chats[i % len(chats)]
+                socket_ = await open_chat(port, job_id, customer_token)
+                await socket_.close()
+            await asyncio.sleep(0.5)
+            baseline = [rss(process.pid) for process, _ in workers]
+
+            start = time.perf_counter()
+            sockets = await self.connect_all(chats, [port for _, port in workers])
+            connect_time = time.perf_counter() - start
+            await asyncio.sleep(1)
+            loaded = [rss(process.pid) for process, _ in workers]
+
+            latencies, elapsed = await self.replay(sockets, options)
+        finally:
+            await asyncio.gather(*(socket_.close() for pair in sockets for socket_ in pair), return_exceptions=True)
+            for process, _ in workers:
+                process.terminate()
+            for process, _ in workers:
+                await process.wait()
+            if broker is not None:
+                await broker.close()
+
+        return {
+            'redis_url': redis_url if broker is None else f'MiniRedis at {redis_url}',
+            'sockets': 2 * len(sockets),
+            'connect_time': connect_time,
+            'latencies': latencies,
+            'elapsed': elapsed,
+            'memory': [
+                (after - before) / per_worker if None not in (before, after) and per_worker else None
+                for before, after, per_worker in zip(baseline, loaded, sockets_per_worker(len(sockets), len(workers)))
+            ],
+        }
+
+    async def start_worker(self, env):
+        port = free_port()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'fourkara.asgi:application',
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=None if self.verbosity > 1 else subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            if process.returncode is not None:
+                raise CommandError(f'Worker on port {port} exited with {process.returncode}; rerun with -v 2.')
+            try:
+                _, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.close()
+                return process, port
+            except OSError:
+                if time.monotonic() > deadline:
+                    process.terminate()
+                    raise CommandError(f'Worker on port {port} did not start listening.')
+                await asyncio.sleep(0.2)
+
+    async def connect_all(self, chats, ports):
+        """
+        Opens the customer's socket on one worker and the pro's on the
+        next, so every delivery crosses the channel layer when there is
+        more than one worker.
+        """
+        limit = asyncio.Semaphore(100)
+
+        async def connect(port, job_id, token):
+            async with limit:
+                return await open_chat(port, job_id, token)
+
+        sockets = await asyncio.gather(*(
+            asyncio.gather(
+                connect(ports[i % len(ports)], job_id, customer_token),
+                connect(ports[(i + 1) % len(ports)], job_id, pro_token),
+            )
+            for i, (job_id, customer_token, pro_token) in enumerate(chats)
+        ))
+        return [tuple(pair) for pair in sockets]
+
+    async def replay(self, sockets, options):
+        """
+        Each customer sends `messages` messages at `rate` per second from a
+        random offset; latency is measured from send until the pro's
+        socket receives the broadcast.
+        """
+        sent = {}
+        latencies = []
+        expected = len(sockets) * options['messages']
+        done = asyncio.Event()
+
+        async def receive(socket_):
+            async for frame in socket_:
+                body = json.loads(frame).get('message', {}).get('body', '')
+                sent_at = sent.pop(body, None)
+                if sent_at is not None:
+                    latencies.append(time.perf_counter() - sent_at)
+                    if len(latencies) == expected:
+                        done.set()
+
+        async def send(index, socket_):
+            interval = 1 / options['rate']
+            start = time.perf_counter() + random.uniform(0, interval)
+            for i in range(options['messages']):
+                await asyncio.sleep(max(0, start + i * interval - time.perf_counter()))
+                body = f'bench {index}:{i}'
+                sent[body] = time.perf_counter()
+                await socket_.send(json.dumps({'message': body}))
+
+        receivers = [asyncio.ensure_future(receive(pro)) for _, pro in sockets]
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(send(i, customer) for i, (customer, _) in enumerate(sockets)))
+            try:
+                await asyncio.wait_for(done.wait(), options['timeout'])
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            for receiver in receivers:
+                receiver.cancel()
+        return latencies, time.perf_counter() - start
+
+    def print_report(self, report, options):
+        latencies = sorted(report['latencies'])
+        expected = options['chats'] * options['messages']
+        self.stdout.write(
+            f"{options['workers']} workers, {options['layer']} layer via {report['redis_url']}"
+            f"{', write-behind' if options['write_behind'] else ''}"
+        )
+        self.stdout.write(f"{report['sockets']} sockets connected in {report['connect_time']:.2f} s")
+        self.stdout.write(
+            f"Delivered {len(latencies)}/{expected} messages in {report['elapsed']:.2f} s "
+            f"({len(latencies) / report['elapsed']:.0f} messages/s)"
+        )
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            self.stdout.write(self.style.SUCCESS(
+                f"Latency: p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms, "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            ))
+        memory = [m for m in report['memory'] if m is not None]
+        if memory:
+            per_worker = ', '.join(f'{m / 1024:.1f}' if m is not None else 'n/a' for m in report['memory'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Worker memory: {statistics.mean(memory) / 1024:.1f} KiB per connection (per worker: {per_worker})"
+            ))
+        else:
+            self.stdout.write('Worker memory: unavailable (needs /proc).')
+
+
+async def open_chat(port, job_id, token):
+    socket_ = await websockets.connect(
+        f'ws://127.0.0.1:{port}/ws/chat/{job_id}/?token={token}',
+        open_timeout=60, ping_interval=None, max_size=None,
+    )
+    # Drain the history; the last frame of the page says so.
+    while not json.loads(await socket_.recv()).get('last', True):
+        pass
+    return socket_
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def sockets_per_worker(chats, workers):
+    # Chat i puts its customer on worker i and its pro on worker i + 1.
+    counts = [0] * workers
+    for i in range(chats):
+        counts[i % workers] += 1
+        counts[(i + 1) % workers] += 1
+    return counts
+
+
+def rss(pid):
+    """
+    Resident set size of `pid` in bytes, or None where /proc is unavailable.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
@@ -0,0 +1,69 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+STARTUP_SCRIPT = """\
+import django
+django.setup()
+if {load_urls}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures process startup: runs `django.setup()` (and loads the "
+        "URLconf, as the first request and system checks do) in fresh "
+        "interpreters under `python -X importtime`, and reports wall time, "
+        "total import time and the slowest top-level imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list.')
+        parser.add_argument('--no-urls', action='store_true', help='Only run django.setup().')
+
+    def handle(self, *args, **options):
+        script = STARTUP_SCRIPT.format(load_urls=not options['no_urls'])
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        walls, totals = [], []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', script],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            walls.append(time.perf_counter() - start)
+            imports = parse_importtime(result.stderr)
+            totals.append(sum(self_us for self_us, _, _, _ in imports) / 1e6)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['runs']} runs: wall median {statistics.median(walls) * 1000:.0f} ms, "
+            f"imports median {statistics.median(totals) * 1000:.0f} ms, {len(imports)} modules"
+        ))
+        self.stdout.write(f"vertexai imported: {any(name == 'vertexai' for _, _, _, name in imports)}")
+        self.stdout.write("Slowest top-level imports (last run, cumulative):")
+        top_level = sorted((i for i in imports if i[2] == 0), key=lambda i: i[1], reverse=True)
+        for _, cumulative, _, name in top_level[:options['top']]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` lines into (self_us, cumulative_us, depth, module).
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return imports
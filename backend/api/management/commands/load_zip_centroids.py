@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.geo import ZIP_CENTROIDS_PATH, load_zip_centroids
+from api.models import ZipCentroid
+
+
+class Command(BaseCommand):
+    help = "Reloads the ZipCentroid table from the bundled ZIP code centroid dataset (or --path)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=ZIP_CENTROIDS_PATH, help='gzipped CSV with zip_code,latitude,longitude.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = load_zip_centroids(ZipCentroid, path=options['path'])
+        self.stdout.write(self.style.SUCCESS(f'Loaded {count} ZIP code centroids.'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_profile_version
+from api.models import ProProfile, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculates the denormalized rating_count, rating_sum and average_rating "
+        "on every ProProfile from the Review table, creating missing profiles for "
+        "reviewed pros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many profiles have drifted.')
+
+    def handle(self, *args, **options):
+        reviewed_pros = Review.objects.values_list('pro_id', flat=True).distinct()
+        missing = set(reviewed_pros) - set(ProProfile.objects.values_list('user_id', flat=True))
+
+        with transaction.atomic():
+            before = {
+                profile['id']: profile
+                for profile in ProProfile.objects.values('id', 'user_id', 'rating_count', 'rating_sum')
+            }
+            if not options['dry_run']:
+                ProProfile.objects.bulk_create([ProProfile(user_id=user_id) for user_id in missing])
+            ProProfile.objects.recompute_ratings()
+            drifted = [
+                profile for profile in ProProfile.objects.values('id', 'user_id', 'rating_count', 'rating_sum')
+                if profile['id'] in before and before[profile['id']] != profile
+            ]
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        if not options['dry_run']:
+            # The bulk writes above send no signals, so cached public
+            # profiles of repaired pros are invalidated here.
+            for user_id in {profile['user_id'] for profile in drifted} | missing:
+                bump_profile_version(user_id)
+
+        verb = 'would be' if options['dry_run'] else 'were'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(drifted)} drifted profiles {verb} repaired; '
+            f'{len(missing)} missing profiles {verb} created.'
+        ))
@@ -2,16 +2,24 @@ from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from rest_framework.authtoken.models import Token
 from urllib.parse import parse_qs
+from .authentication import get_token_and_user, token_cache
 
-@database_sync_to_async
-def get_user_from_token(token_key):
+async def get_user_from_token(token_key):
     """
     Authenticates a user based on a DRF token key.
     Returns the user object or AnonymousUser.
+    Cached tokens are resolved without leaving the event loop, to the
+    cache's shared (read-only) user rather than a copy per connection.
     """
+    cached = token_cache.get_user(token_key)
+    if cached is not None:
+        return cached
+    return await load_user_from_token(token_key)
+
+@database_sync_to_async
+def load_user_from_token(token_key):
     try:
-        token = Token.objects.select_related('user').get(key=token_key)
-        return token.user
+        return get_token_and_user(token_key)[1]
     except Token.DoesNotExist:
         return AnonymousUser()
 
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_rename_availability_notes_proprofile_availability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['zip_code', 'state', '-created_at', '-id'], name='job_open_zip_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['-created_at', '-id'], name='job_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='job_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('accepted_bid__isnull', False)), fields=['accepted_bid', '-created_at'], name='job_accepted_bid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['job', 'timestamp', 'id'], name='message_job_timestamp_idx'),
+        ),
+    ]
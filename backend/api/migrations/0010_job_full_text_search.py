@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+# Frozen copies of what api.search.install_sql / uninstall_sql produced for
+# Job's title and description when this migration was written.
+INSTALL_SQL = {
+    'postgresql': [
+        "ALTER TABLE api_job ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+        'CREATE INDEX IF NOT EXISTS api_job_search_vector_idx ON api_job USING GIN (search_vector)',
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS api_job_fts USING fts5(title, description, "
+        "content='api_job', content_rowid='id', tokenize='porter unicode61')",
+        'CREATE TRIGGER IF NOT EXISTS api_job_fts_ai AFTER INSERT ON api_job BEGIN '
+        'INSERT INTO api_job_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END',
+        'CREATE TRIGGER IF NOT EXISTS api_job_fts_ad AFTER DELETE ON api_job BEGIN '
+        "INSERT INTO api_job_fts(api_job_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END",
+        'CREATE TRIGGER IF NOT EXISTS api_job_fts_au AFTER UPDATE OF title, description ON api_job BEGIN '
+        "INSERT INTO api_job_fts(api_job_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        'INSERT INTO api_job_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END',
+    ],
+}
+
+UNINSTALL_SQL = {
+    'postgresql': [
+        'DROP INDEX IF EXISTS api_job_search_vector_idx',
+        'ALTER TABLE api_job DROP COLUMN IF EXISTS search_vector',
+    ],
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS api_job_fts_ai',
+        'DROP TRIGGER IF EXISTS api_job_fts_ad',
+        'DROP TRIGGER IF EXISTS api_job_fts_au',
+        'DROP TABLE IF EXISTS api_job_fts',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in INSTALL_SQL.get(vendor, []):
+        schema_editor.execute(statement)
+    if vendor == 'sqlite':
+        schema_editor.execute("INSERT INTO api_job_fts(api_job_fts) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in UNINSTALL_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_job_message_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:01
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    ProProfile = apps.get_model('api', 'ProProfile')
+    Review = apps.get_model('api', 'Review')
+    reviews = Review.objects.filter(pro=OuterRef('user')).order_by().values('pro')
+    ProProfile.objects.update(
+        rating_count=Coalesce(Subquery(reviews.annotate(value=Count('id')).values('value')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0),
+        average_rating=Subquery(reviews.annotate(value=Avg('rating')).values('value')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_job_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proprofile',
+            name='average_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='proprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
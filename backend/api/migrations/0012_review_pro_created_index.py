@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_proprofile_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pro', '-created_at', '-id'], name='review_pro_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def split_service_areas(apps, schema_editor):
+    ProProfile = apps.get_model('api', 'ProProfile')
+    ServiceArea = apps.get_model('api', 'ServiceArea')
+    areas = []
+    profiles = ProProfile.objects.exclude(service_area_zip_codes='').values_list('user_id', 'service_area_zip_codes')
+    for user_id, zip_codes in profiles.iterator():
+        for zip_code in set(zip_codes.replace(',', ' ').split()):
+            areas.append(ServiceArea(pro_id=user_id, zip_code=zip_code[:10]))
+    ServiceArea.objects.bulk_create(areas, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_review_pro_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zip_code', models.CharField(max_length=10)),
+                ('pro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_areas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['zip_code', 'pro'], name='servicearea_zip_pro_idx')],
+                'constraints': [models.UniqueConstraint(fields=('pro', 'zip_code'), name='servicearea_pro_zip_unique')],
+            },
+        ),
+        migrations.RunPython(split_service_areas, migrations.RunPython.noop),
+    ]
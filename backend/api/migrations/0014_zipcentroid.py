@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:07
+
+import csv
+import gzip
+from pathlib import Path
+
+from django.db import migrations, models
+
+
+# The dataset bundled with the app; the loader below is a frozen copy of
+# api.geo.load_zip_centroids as it was when this migration was written.
+ZIP_CENTROIDS_PATH = Path(__file__).resolve().parent.parent / 'data' / 'zip_centroids.csv.gz'
+
+
+def load_centroids(apps, schema_editor):
+    ZipCentroid = apps.get_model('api', 'ZipCentroid')
+    with gzip.open(ZIP_CENTROIDS_PATH, 'rt', newline='') as f:
+        rows = [
+            ZipCentroid(zip_code=row['zip_code'], latitude=float(row['latitude']), longitude=float(row['longitude']))
+            for row in csv.DictReader(f)
+        ]
+    ZipCentroid.objects.all().delete()
+    ZipCentroid.objects.bulk_create(rows, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_servicearea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZipCentroid',
+            fields=[
+                ('zip_code', models.CharField(max_length=5, primary_key=True, serialize=False)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['latitude', 'longitude'], name='zipcentroid_lat_lon_idx')],
+            },
+        ),
+        migrations.RunPython(load_centroids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_zipcentroid'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_open_zip_state_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_open_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_customer_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_job_timestamp_idx',
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['zip_code', 'state', '-created_at', '-id'], include=('updated_at',), name='job_open_zip_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['-created_at', '-id'], include=('updated_at',), name='job_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['customer', '-created_at', '-id'], include=('updated_at',), name='job_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['job', 'timestamp', 'id'], include=('updated_at',), name='message_job_timestamp_idx'),
+        ),
+    ]
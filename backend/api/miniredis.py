@@ -0,0 +1,324 @@
+import asyncio
+import fnmatch
+import time
+from collections import defaultdict
+
+
+class Status(str):
+    """
+    A simple-string reply (`+OK`), as opposed to a bulk string.
+    """
+
+
+class ReplyError(Exception):
+    pass
+
+
+OK = Status('OK')
+
+
+class MiniRedis:
+    """
+    In-process stand-in for a Redis server, speaking enough of the RESP2
+    protocol for redis-py to back the Django cache and
+    channels_redis.pubsub.RedisPubSubChannelLayer: strings with expiry,
+    counters, MULTI/EXEC pipelines and PUBLISH/SUBSCRIBE.
+
+    It exists so benchmarks can run several ASGI workers against a shared
+    broker where no Redis is installed. It has no persistence and no Lua,
+    so channels_redis.core.RedisChannelLayer (which runs EVAL) still needs
+    a real server.
+    """
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.data = {}
+        self.expires = {}
+        self.subscribers = defaultdict(set)
+        self.server = None
+
+    @property
+    def url(self):
+        return f'redis://{self.host}:{self.port}/0'
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def handle_client(self, reader, writer):
+        client = Client(writer)
+        try:
+            while True:
+                command = await read_command(reader)
+                if command is None:
+                    break
+                writer.write(encode(self.execute(client, command)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in client.channels:
+                self.subscribers[channel].discard(client)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+            writer.close()
+
+    def execute(self, client, command):
+        name, args = command[0].decode().upper(), command[1:]
+        if client.queued is not None and name not in ('EXEC', 'DISCARD', 'MULTI'):
+            client.queued.append(command)
+            return Status('QUEUED')
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return ReplyError(f"ERR unknown command '{name}'")
+        try:
+            return handler(client, *args)
+        except TypeError:
+            return ReplyError(f"ERR wrong number of arguments for '{name.lower()}' command")
+        except ReplyError as e:
+            return e
+
+    # Keyspace.
+
+    def alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            del self.expires[key]
+        return key in self.data
+
+    def expire_in(self, key, seconds):
+        if seconds <= 0:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.monotonic() + seconds
+
+    def cmd_get(self, client, key):
+        return self.data[key] if self.alive(key) else None
+
+    def cmd_mget(self, client, *keys):
+        return [self.cmd_get(client, key) for key in keys]
+
+    def cmd_set(self, client, key, value, *options):
+        options = [option.decode().upper() for option in options]
+        exists = self.alive(key)
+        if ('NX' in options and exists) or ('XX' in options and not exists):
+            return None
+        ttl = None
+        for unit, scale in (('EX', 1), ('PX', 1000)):
+            if unit in options:
+                ttl = int(options[options.index(unit) + 1]) / scale
+        self.data[key] = value
+        if ttl is not None:
+            self.expire_in(key, ttl)
+        elif 'KEEPTTL' not in options:
+            self.expires.pop(key, None)
+        return OK
+
+    def cmd_setex(self, client, key, seconds, value):
+        return self.cmd_set(client, key, value, b'EX', seconds)
+
+    def cmd_mset(self, client, *pairs):
+        for key, value in zip(pairs[::2], pairs[1::2]):
+            self.cmd_set(client, key, value)
+        return OK
+
+    def cmd_del(self, client, *keys):
+        deleted = 0
+        for key in keys:
+            if self.alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    cmd_unlink = cmd_del
+
+    def cmd_exists(self, client, *keys):
+        return sum(self.alive(key) for key in keys)
+
+    def cmd_expire(self, client, key, seconds):
+        if not self.alive(key):
+            return 0
+        self.expire_in(key, int(seconds))
+        return 1
+
+    def cmd_pexpire(self, client, key, milliseconds):
+        if not self.alive(key):
+            return 0
+        self.expire_in(key, int(milliseconds) / 1000)
+        return 1
+
+    def cmd_persist(self, client, key):
+        return int(self.alive(key) and self.expires.pop(key, None) is not None)
+
+    def cmd_pttl(self, client, key):
+        if not self.alive(key):
+            return -2
+        if key not in self.expires:
+            return -1
+        return int((self.expires[key] - time.monotonic()) * 1000)
+
+    def cmd_ttl(self, client, key):
+        ttl = self.cmd_pttl(client, key)
+        return ttl if ttl < 0 else round(ttl / 1000)
+
+    def cmd_incrby(self, client, key, amount):
+        try:
+            value = int(self.data[key]) if self.alive(key) else 0
+            value += int(amount)
+        except ValueError:
+            raise ReplyError('ERR value is not an integer or out of range')
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_incr(self, client, key):
+        return self.cmd_incrby(client, key, b'1')
+
+    def cmd_decrby(self, client, key, amount):
+        return self.cmd_incrby(client, key, str(-int(amount)).encode())
+
+    def cmd_decr(self, client, key):
+        return self.cmd_incrby(client, key, b'-1')
+
+    def cmd_keys(self, client, pattern):
+        pattern = pattern.decode()
+        return [key for key in list(self.data) if self.alive(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+
+    def cmd_dbsize(self, client):
+        return sum(self.alive(key) for key in list(self.data))
+
+    def cmd_flushdb(self, client, *options):
+        self.data.clear()
+        self.expires.clear()
+        return OK
+
+    cmd_flushall = cmd_flushdb
+
+    # Connection.
+
+    def cmd_ping(self, client, message=None):
+        if client.channels:
+            return [b'pong', message or b'']
+        return Status('PONG') if message is None else message
+
+    def cmd_echo(self, client, message):
+        return message
+
+    def cmd_select(self, client, index):
+        return OK
+
+    def cmd_client(self, client, subcommand, *args):
+        # SETINFO / SETNAME sent by redis-py on connect.
+        return OK
+
+    def cmd_multi(self, client):
+        if client.queued is not None:
+            raise ReplyError('ERR MULTI calls can not be nested')
+        client.queued = []
+        return OK
+
+    def cmd_exec(self, client):
+        if client.queued is None:
+            raise ReplyError('ERR EXEC without MULTI')
+        queued, client.queued = client.queued, None
+        return [self.execute(client, command) for command in queued]
+
+    def cmd_discard(self, client):
+        if client.queued is None:
+            raise ReplyError('ERR DISCARD without MULTI')
+        client.queued = None
+        return OK
+
+    # Pub/sub.
+
+    def cmd_publish(self, client, channel, message):
+        subscribers = self.subscribers.get(channel, ())
+        frame = encode([b'message', channel, message])
+        for subscriber in subscribers:
+            subscriber.writer.write(frame)
+        return len(subscribers)
+
+    def cmd_subscribe(self, client, *channels):
+        replies = []
+        for channel in channels:
+            client.channels.add(channel)
+            self.subscribers[channel].add(client)
+            replies.append([b'subscribe', channel, len(client.channels)])
+        return Multi(replies)
+
+    def cmd_unsubscribe(self, client, *channels):
+        replies = []
+        for channel in channels or sorted(client.channels):
+            client.channels.discard(channel)
+            self.subscribers[channel].discard(client)
+            if not self.subscribers[channel]:
+                del self.subscribers[channel]
+            replies.append([b'unsubscribe', channel, len(client.channels)])
+        if not replies:
+            replies.append([b'unsubscribe', None, 0])
+        return Multi(replies)
+
+
+class Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.channels = set()
+        self.queued = None
+
+
+class Multi(list):
+    """
+    Several replies to one command, as SUBSCRIBE sends one per channel.
+    """
+
+
+async def read_command(reader):
+    """
+    Reads one RESP array of bulk strings, or returns None at EOF.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()
+    command = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        length = int(header[1:])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+def encode(reply):
+    if isinstance(reply, Multi):
+        return b''.join(encode(item) for item in reply)
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Status):
+        return b'+' + reply.encode() + b'\r\n'
+    if isinstance(reply, ReplyError):
+        return b'-' + str(reply).encode() + b'\r\n'
+    if isinstance(reply, bool):
+        return b':%d\r\n' % int(reply)
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, str):
+        reply = reply.encode()
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(encode(item) for item in reply)
@@ -0,0 +1,89 @@
+import hashlib
+
+from django.db.models import prefetch_related_objects
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import etag_matches
+from .queries import plan_queryset
+
+
+class QueryPlanMixin:
+    """
+    Generic view mixin that eager-loads every relation the view's
+    serializer reads. Applied in filter_queryset so it covers both list
+    and retrieve, and views can keep overriding get_queryset as usual.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return plan_queryset(queryset, self.get_serializer_class())
+
+
+class ConditionalGetMixin:
+    """
+    Generic view mixin that answers GETs with an ETag and returns
+    304 Not Modified before any serialization when the client's
+    If-None-Match still matches.
+
+    Lists are validated by the (pk, updated_at) of the rows on the page
+    plus its next/previous links, so revalidating costs the same bounded
+    page query as serving it, and single objects by their updated_at.
+    The ETag also covers the full request path and the user, since
+    pages, filters and per-user querysets all share the same validator.
+    """
+    validator_field = 'updated_at'
+
+    def get_etag_extra(self):
+        """
+        Hook for views whose output depends on state outside the queryset.
+        """
+        return ''
+
+    def build_etag(self, *parts):
+        raw = '|'.join(str(part) for part in (
+            self.request.get_full_path(), self.request.user.pk, self.get_etag_extra(), *parts
+        ))
+        return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Prefetches only feed the serializer, so they wait until the
+        # page is known to be stale.
+        prefetches = queryset._prefetch_related_lookups
+        queryset = queryset.prefetch_related(None)
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+
+        validator = [(row.pk, getattr(row, self.validator_field)) for row in rows]
+        if page is not None:
+            validator += [self.paginator.get_next_link(), self.paginator.get_previous_link()]
+        etag = self.build_etag(*validator)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        prefetch_related_objects(rows, *prefetches)
+        serializer = self.get_serializer(rows, many=True)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = (
+            self.get_queryset()
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list(self.validator_field, flat=True)
+            .first()
+        )
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = self.build_etag(last_modified)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -13,9 +16,35 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=20, blank=True)
     
 
+class ProProfileQuerySet(models.QuerySet):
+    def record_rating(self, rating):
+        """
+        Folds one new review rating into the stored aggregates with a
+        single atomic UPDATE.
+        """
+        return self.update(
+            rating_count=F('rating_count') + 1,
+            rating_sum=F('rating_sum') + rating,
+            average_rating=Cast(F('rating_sum') + rating, FloatField()) / (F('rating_count') + 1),
+        )
+
+    def recompute_ratings(self):
+        """
+        Recalculates the stored aggregates from the Review table.
+        """
+        reviews = Review.objects.filter(pro=OuterRef('user')).order_by().values('pro')
+        return self.update(
+            rating_count=Coalesce(Subquery(reviews.annotate(value=Count('id')).values('value')), 0),
+            rating_sum=Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0),
+            average_rating=Subquery(reviews.annotate(value=Avg('rating')).values('value')),
+        )
+
+
 class ProProfile(models.Model):
     """
     Stores additional information for a professional user.
+    Review ratings are denormalized into rating_count/rating_sum/average_rating
+    so profile reads don't aggregate the Review table.
     """
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -39,9 +68,83 @@ class ProProfile(models.Model):
     availability = models.CharField(max_length=255, blank=True, help_text="e.g., Weekdays 9am-5pm, Emergency calls available")
     faq = models.TextField(blank=True, help_text="Optional FAQ section (e.g., Q: What's your hourly rate? A: ...)")
 
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(null=True, blank=True)
+
+    objects = ProProfileQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username}'s Pro Profile" 
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'service_area_zip_codes' in update_fields:
+            self.sync_service_areas()
+
+    def sync_service_areas(self):
+        """
+        Mirrors service_area_zip_codes into the indexed ServiceArea table.
+        """
+        zip_codes = set(parse_zip_codes(self.service_area_zip_codes))
+        ServiceArea.objects.filter(pro_id=self.user_id).exclude(zip_code__in=zip_codes).delete()
+        ServiceArea.objects.bulk_create(
+            [ServiceArea(pro_id=self.user_id, zip_code=zip_code) for zip_code in zip_codes],
+            ignore_conflicts=True,
+        )
+
+
+def parse_zip_codes(value):
+    """
+    Splits a comma/whitespace separated zip code string into a list of
+    unique codes, preserving order.
+    """
+    zip_codes = []
+    for zip_code in value.replace(',', ' ').split():
+        zip_code = zip_code[:10]
+        if zip_code not in zip_codes:
+            zip_codes.append(zip_code)
+    return zip_codes
+
+
+class ServiceArea(models.Model):
+    """
+    One zip code served by a professional. Kept in sync with
+    ProProfile.service_area_zip_codes so pro/job matching is an indexed join.
+    """
+    pro = models.ForeignKey(User, on_delete=models.CASCADE, related_name='service_areas')
+    zip_code = models.CharField(max_length=10)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pro', 'zip_code'], name='servicearea_pro_zip_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['zip_code', 'pro'], name='servicearea_zip_pro_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.pro.username} serves {self.zip_code}"
+
+
+class ZipCentroid(models.Model):
+    """
+    Geographic centre of a US ZIP code, loaded from the bundled
+    api/data/zip_centroids.csv.gz for offline distance matching.
+    """
+    zip_code = models.CharField(max_length=5, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='zipcentroid_lat_lon_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.zip_code} ({self.latitude}, {self.longitude})"
+
 
 class Job(models.Model):
     """
@@ -52,6 +155,7 @@ class Job(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_completed = models.BooleanField(default=False)
 
     street_address = models.CharField(max_length=255)
@@ -67,6 +171,32 @@ class Job(models.Model):
         related_name='accepted_for_job'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['zip_code', 'state', '-created_at', '-id'],
+                condition=models.Q(is_completed=False),
+                include=['updated_at'],
+                name='job_open_zip_state_idx',
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_completed=False),
+                include=['updated_at'],
+                name='job_open_created_idx',
+            ),
+            models.Index(
+                fields=['customer', '-created_at', '-id'],
+                include=['updated_at'],
+                name='job_customer_created_idx',
+            ),
+            models.Index(
+                fields=['accepted_bid', '-created_at'],
+                condition=models.Q(accepted_bid__isnull=False),
+                name='job_accepted_bid_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -81,6 +211,7 @@ class Bid(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     details = models.TextField(help_text="Details about the bid, like scope of work.")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Bid of ${self.amount} by {self.pro.username} on '{self.job.title}'"
@@ -94,10 +225,41 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
     body = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['job', 'timestamp', 'id'],
+                include=['updated_at'],
+                name='message_job_timestamp_idx',
+            ),
+            models.Index(fields=['receiver', 'job', 'id'], name='message_receiver_job_idx'),
+        ]
 
     def __str__(self):
         return f'From {self.sender.username} to {self.receiver.username} re: "{self.job.title}"'
+
+
+class ReadReceipt(models.Model):
+    """
+    How far one participant has read a job's conversation. Written in
+    coalesced batches from the chat socket (see api/receipts.py); unread
+    counts are messages to the user with a higher id.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='read_receipts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_receipts')
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'user'], name='readreceipt_job_user_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} read job {self.job_id} up to message {self.last_read_message_id}"
     
 
 class Review(models.Model):
@@ -110,6 +272,9 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('job', 'pro', 'customer')
+        indexes = [
+            models.Index(fields=['pro', '-created_at', '-id'], name='review_pro_created_idx'),
+        ]
 
     def __str__(self):
         return f'Review by {self.customer.username} for {self.pro.username} on job {self.job.id} ({self.rating} stars)'
\ No newline at end of file
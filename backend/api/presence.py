@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+DEFAULT_PRESENCE_TTL = 60
+
+
+def presence_ttl():
+    return getattr(settings, 'CHAT_PRESENCE_TTL', DEFAULT_PRESENCE_TTL)
+
+
+def presence_key(job_id, user_id):
+    return f'presence:{job_id}:{user_id}'
+
+
+def connections_key(job_id, user_id):
+    return f'presence:{job_id}:{user_id}:connections'
+
+
+def add_connection(job_id, user_id):
+    """
+    Counts another open socket for the user in the job's chat, so closing
+    one of several tabs does not take them offline. The count expires with
+    their presence, which keeps sockets that died without closing from
+    pinning it.
+    """
+    key = connections_key(job_id, user_id)
+    cache.add(key, 0, presence_ttl())
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.add(key, 1, presence_ttl())
+
+
+def mark_online(job_id, user_id):
+    """
+    Records that the user has the job's chat open for another
+    CHAT_PRESENCE_TTL seconds. Returns True if they were not online
+    before, i.e. when the change should be announced.
+
+    Presence lives in the default cache (Redis in production), shared by
+    every worker. Clients heartbeat well inside the TTL; a connection that
+    dies without closing simply expires.
+    """
+    cache.touch(connections_key(job_id, user_id), presence_ttl())
+    key = presence_key(job_id, user_id)
+    if cache.add(key, 1, presence_ttl()):
+        return True
+    if not cache.touch(key, presence_ttl()):
+        # Expired between add() and touch().
+        return cache.add(key, 1, presence_ttl())
+    return False
+
+
+def mark_offline(job_id, user_id):
+    """
+    Closes one of the user's sockets. Returns True, and clears their
+    presence, only when it was the last one, i.e. when the change should
+    be announced.
+    """
+    try:
+        if cache.decr(connections_key(job_id, user_id)) > 0:
+            return False
+    except ValueError:
+        # The count expired; this socket was not heartbeating either.
+        pass
+    cache.delete_many([presence_key(job_id, user_id), connections_key(job_id, user_id)])
+    return True
+
+
+def is_online(job_id, user_id):
+    return cache.get(presence_key(job_id, user_id)) is not None
@@ -0,0 +1,133 @@
+import asyncio
+import atexit
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from .models import ReadReceipt
+
+
+DEFAULT_FLUSH_INTERVAL = 2.0
+# Errors a retry cannot fix: the row is dropped rather than requeued.
+PERMANENT_ERRORS = (IntegrityError, DataError, OverflowError, ValueError)
+
+_buffers = {}
+
+
+class ReadReceiptBuffer:
+    """
+    Coalesces read receipts for one event loop. Each (job, user) keeps
+    only the highest message id reported, and everything buffered is
+    written READ_RECEIPT_FLUSH_INTERVAL seconds after the first receipt,
+    so a client marking messages read as they scroll by costs at most one
+    write per conversation per interval.
+    """
+    def __init__(self, flush_interval=None):
+        self._flush_interval = flush_interval
+        self.pending = {}
+        self.lock = asyncio.Lock()
+        self.timer = None
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, 'READ_RECEIPT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    def put(self, job_id, user_id, message_id):
+        key = (job_id, user_id)
+        if message_id <= self.pending.get(key, 0):
+            return
+        self.pending[key] = message_id
+        if self.timer is None:
+            self.timer = asyncio.ensure_future(self.flush_later())
+
+    def get(self, job_id, user_id):
+        return self.pending.get((job_id, user_id))
+
+    async def flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.timer = None
+        await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            batch, self.pending = self.pending, {}
+            if not batch:
+                return
+            try:
+                await database_sync_to_async(write_receipts)(batch)
+            except Exception as e:
+                print(f"Error writing read receipts, will retry: {e}")
+                for key, message_id in batch.items():
+                    self.pending[key] = max(message_id, self.pending.get(key, 0))
+                if self.timer is None:
+                    self.timer = asyncio.ensure_future(self.flush_later())
+
+    def flush_sync(self):
+        batch, self.pending = self.pending, {}
+        if batch:
+            write_receipts(batch)
+
+
+def write_receipts(batch):
+    """
+    Upserts {(job_id, user_id): message_id}, never moving a receipt
+    backwards: missing rows are inserted, then rows behind are advanced.
+    Receipts that fail for a permanent reason (a job deleted meanwhile, an
+    id out of range) are logged and dropped without holding up the rest;
+    other database errors propagate so the caller can retry.
+    """
+    now = timezone.now()
+    rows = [
+        ReadReceipt(job_id=job_id, user_id=user_id, last_read_message_id=message_id)
+        for (job_id, user_id), message_id in batch.items()
+    ]
+    dropped = set()
+    try:
+        with transaction.atomic():
+            ReadReceipt.objects.bulk_create(rows, ignore_conflicts=True)
+    except PERMANENT_ERRORS:
+        # Store the rest one at a time.
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    ReadReceipt.objects.bulk_create([row], ignore_conflicts=True)
+            except PERMANENT_ERRORS as e:
+                print(f"Dropping read receipt for job {row.job_id}: {e}")
+                dropped.add((row.job_id, row.user_id))
+    for (job_id, user_id), message_id in batch.items():
+        if (job_id, user_id) in dropped:
+            continue
+        try:
+            with transaction.atomic():
+                ReadReceipt.objects.filter(
+                    job_id=job_id, user_id=user_id, last_read_message_id__lt=message_id
+                ).update(last_read_message_id=message_id, updated_at=now)
+        except PERMANENT_ERRORS as e:
+            print(f"Dropping read receipt for job {job_id}: {e}")
+
+
+def get_receipt_buffer():
+    """
+    Returns the buffer for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    for other in [other for other, buffer in _buffers.items() if other.is_closed() and not buffer.pending]:
+        del _buffers[other]
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = _buffers[loop] = ReadReceiptBuffer()
+    return buffer
+
+
+@atexit.register
+def flush_all_receipts():
+    """
+    Persists read receipts still buffered when the process exits.
+    """
+    for buffer in list(_buffers.values()):
+        try:
+            buffer.flush_sync()
+        except Exception as e:
+            print(f"Error writing read receipts at shutdown: {e}")
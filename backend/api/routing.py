@@ -4,4 +4,6 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'^ws/chat/(?P<job_id>\d+)/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'^ws/jobs/$', consumers.JobFeedConsumer.as_asgi()),
+    re_path(r'^ws/bids/$', consumers.BidNotificationConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,162 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_CONFIG = 'english'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+JOB_SEARCH_FIELDS = ('title', 'description')
+SQLITE_RANK_WEIGHTS = (1.0, 0.4, 0.2, 0.1)
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def install_sql(model, fields, vendor):
+    """
+    Returns the statements that create a maintained full-text index over
+    `fields` of `model` for the given database vendor. Statements are
+    idempotent so they can be re-run after SQLite table rebuilds, which
+    drop triggers.
+
+    PostgreSQL: a stored generated tsvector column (weights A, B, ... in
+    field order) with a GIN index.
+    SQLite: an external-content FTS5 table kept in sync by triggers.
+    """
+    table = model._meta.db_table
+    if vendor == 'postgresql':
+        weights = 'ABCD'
+        vector = ' || '.join(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({field}, '')), '{weights[min(i, 3)]}')"
+            for i, field in enumerate(fields)
+        )
+        return [
+            f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector '
+            f'GENERATED ALWAYS AS ({vector}) STORED',
+            f'CREATE INDEX IF NOT EXISTS {table}_search_vector_idx ON {table} USING GIN ({SEARCH_VECTOR_COLUMN})',
+        ]
+    if vendor == 'sqlite':
+        fts = fts_table(model)
+        columns = ', '.join(fields)
+        new_values = ', '.join(f'new.{field}' for field in fields)
+        old_values = ', '.join(f'old.{field}' for field in fields)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+            f"content='{table}', content_rowid='id', tokenize='porter unicode61')",
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END',
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END',
+        ]
+    return []
+
+
+def uninstall_sql(model, vendor):
+    table = model._meta.db_table
+    if vendor == 'postgresql':
+        return [
+            f'DROP INDEX IF EXISTS {table}_search_vector_idx',
+            f'ALTER TABLE {table} DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}',
+        ]
+    if vendor == 'sqlite':
+        fts = fts_table(model)
+        return [
+            f'DROP TRIGGER IF EXISTS {fts}_ai',
+            f'DROP TRIGGER IF EXISTS {fts}_ad',
+            f'DROP TRIGGER IF EXISTS {fts}_au',
+            f'DROP TABLE IF EXISTS {fts}',
+        ]
+    return []
+
+
+def repair_search_index(model, fields, using_connection=None):
+    """
+    Restores the SQLite FTS triggers for `model` after a migration rebuilt
+    its table (SQLite's ALTER emulation drops triggers), then rebuilds the
+    FTS table so rows written in between are indexed. No-op elsewhere or
+    when the FTS table has not been created.
+    """
+    conn = using_connection or connection
+    if conn.vendor != 'sqlite':
+        return
+    fts = fts_table(model)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = %s", [fts])
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            [f'{fts}_ai', f'{fts}_ad', f'{fts}_au']
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+        for statement in install_sql(model, fields, 'sqlite'):
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for SearchFilter backed by the database's
+    full-text index (see `install_sql`). Every search term must match,
+    with prefix matching on each term, and results are annotated with a
+    `search_rank` (higher is better) that views can expose through
+    OrderingFilter. Falls back to SearchFilter's icontains lookups on
+    databases without a full-text index.
+
+    Unsearched and fallback querysets get a constant rank so ordering by
+    it is always valid.
+    """
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        tokens = [token for term in search_terms for token in TOKEN_RE.findall(term)]
+        vendor = connection.vendor
+        if not tokens or vendor not in ('postgresql', 'sqlite'):
+            queryset = super().filter_queryset(request, queryset, view)
+            return queryset.annotate(**{self.rank_annotation: Value(0.0, output_field=FloatField())})
+
+        if vendor == 'postgresql':
+            return self.filter_postgresql(queryset, tokens)
+        return self.filter_sqlite(queryset, tokens, len(self.get_search_fields(view, request)))
+
+    def filter_postgresql(self, queryset, tokens):
+        table = queryset.model._meta.db_table
+        query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens), config=SEARCH_CONFIG, search_type='raw'
+        )
+        return queryset.alias(
+            _search_vector=RawSQL(f'{table}.{SEARCH_VECTOR_COLUMN}', [], output_field=SearchVectorField()),
+        ).filter(
+            _search_vector=query
+        ).annotate(**{
+            # ts_rank is a float4; as double precision it survives the
+            # round trip through a keyset cursor and compares equal again.
+            self.rank_annotation: Cast(SearchRank(F('_search_vector'), query), FloatField()),
+        })
+
+    def filter_sqlite(self, queryset, tokens, field_count):
+        table = queryset.model._meta.db_table
+        fts = fts_table(queryset.model)
+        match = ' AND '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+        # Same per-column weights as PostgreSQL's default A/B/C/D ranking.
+        weights = ', '.join(str(weight) for weight in SQLITE_RANK_WEIGHTS[:field_count])
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [match])
+        ).annotate(**{
+            self.rank_annotation: RawSQL(
+                f'SELECT -bm25({fts}, {weights}) FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {table}.id',
+                [match], output_field=FloatField()
+            ),
+        })
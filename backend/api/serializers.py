@@ -1,4 +1,3 @@
-from django.db.models import Avg
 from rest_framework import serializers
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from .models import User, Job, Bid, Message, ProProfile, Review
@@ -107,10 +106,11 @@ class JobSerializer(serializers.ModelSerializer):
     bids = BidSerializer(many=True, read_only=True)
     accepted_bid = BidSerializer(read_only=True)
     reviews = ReviewSerializer(many=True, read_only=True)
+    distance = serializers.FloatField(read_only=True)  # Only present on proximity searches.
 
     class Meta:
         model = Job
-        fields = ['id', 'title', 'description', 'customer', 'street_address', 'city', 'state', 'zip_code', 'created_at', 'is_completed', 'bids', 'accepted_bid', 'reviews']
+        fields = ['id', 'title', 'description', 'customer', 'street_address', 'city', 'state', 'zip_code', 'created_at', 'is_completed', 'bids', 'accepted_bid', 'reviews', 'distance']
         read_only_fields = ['customer']  
 
 
@@ -118,9 +118,12 @@ class ProProfileSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     first_name = serializers.CharField(source='user.first_name', read_only=True)
     last_name = serializers.CharField(source='user.last_name', read_only=True)
-    reviews_received = ReviewSerializer(source='user.reviews_received', many=True, read_only=True)
+    latest_reviews = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
 
+    # The full review history is served, paginated, by ProReviewListView.
+    latest_reviews_limit = 3
+
     class Meta:
         model = ProProfile
         fields = [
@@ -139,13 +142,31 @@ class ProProfileSerializer(serializers.ModelSerializer):
             'services_offered',
             'availability',
             'faq',
-            'reviews_received', 
+            'latest_reviews',
             'average_rating',
+            'rating_count',
         ]
-        read_only_fields = ['user', 'first_name', 'last_name']
+        read_only_fields = ['user', 'first_name', 'last_name', 'rating_count']
+
+    def get_latest_reviews(self, obj):
+        reviews = (
+            Review.objects.filter(pro_id=obj.user_id)
+            .select_related('customer', 'job')
+            .order_by('-created_at', '-id')[:self.latest_reviews_limit]
+        )
+        return ReviewSerializer(reviews, many=True, context=self.context).data
 
     def get_average_rating(self, obj):
-        avg = obj.user.reviews_received.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg is not None else None
+        return round(obj.average_rating, 1) if obj.average_rating is not None else None
+
+    def update(self, instance, validated_data):
+        """
+        Saves only the submitted fields, so a profile edit can't overwrite
+        rating aggregates updated by a review in the meantime.
+        """
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
 
           
\ No newline at end of file
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import bump_profile_version
+from .models import User, ProProfile, Job, Bid, Review
+
+
+def invalidate_profile_on_commit(user_id):
+    transaction.on_commit(lambda: bump_profile_version(user_id))
+
+
+@receiver(post_save, sender=ProProfile)
+def invalidate_profile_on_profile_save(sender, instance, **kwargs):
+    invalidate_profile_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=Review)
+def invalidate_profile_on_review(sender, instance, created, **kwargs):
+    if created:
+        invalidate_profile_on_commit(instance.pro_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_on_user_save(sender, instance, created, update_fields, **kwargs):
+    # The profile shows the pro's name; last_login-only saves happen on every login.
+    if created or not instance.is_pro:
+        return
+    if update_fields is None or {'first_name', 'last_name'} & set(update_fields):
+        invalidate_profile_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    # Dropped now and again on commit, so a request racing the
+    # transaction cannot re-cache the old row.
+    token_cache.invalidate_key(instance.key)
+    transaction.on_commit(lambda: token_cache.invalidate_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_tokens_for_user(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    transaction.on_commit(lambda: token_cache.invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def touch_job(sender, instance, **kwargs):
+    """
+    Bids and reviews are serialized inside their job, so changing one
+    bumps the job's updated_at and with it the job's conditional-GET
+    validators.
+    """
+    Job.objects.filter(pk=instance.job_id).update(updated_at=timezone.now())
@@ -1,12 +1,59 @@
 import os
-from unittest.mock import patch, ANY
+from io import StringIO
+from unittest.mock import AsyncMock, MagicMock, patch, ANY
 from google.oauth2 import id_token as google_id_token
 from google.auth.transport import requests as google_requests
-from rest_framework.test import APITestCase
+from google.auth import crypt as google_crypt, jwt as google_jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels_redis.pubsub import RedisPubSubChannelLayer
+from channels.testing import WebsocketCommunicator
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from django.urls import reverse
-from .models import User, ProProfile, Job, Bid, Message
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.db.models import base as django_model_base
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from .models import User, ProProfile, Job, Bid, Message, ReadReceipt, Review, ServiceArea, parse_zip_codes
 from .permissions import IsProfessionalUser
+from .geo import haversine_miles
+from .search import FullTextSearchFilter
+from . import consumers as chat_consumers
+from .consumers import HISTORY_PAGE_SIZE, message_history
+from .management.commands.benchmark_chat_memory import measure_connection_memory
+from .writebehind import flush_all_queues, get_write_queue
+from .authentication import TokenUserCache, token_cache
+from .google_auth import CachedCertsRequest, cache_lifetime
+from .feeds import ReplayBuffer
+from .miniredis import MiniRedis
+from .receipts import write_receipts
+from .assistant import SYSTEM_INSTRUCTION, StubAssistant, load_assistant
+from .assistant_cache import ResponseCache, normalize_message, response_cache
+from .conversation import SUMMARY_PREFIX, turn_tokens, window_history
+from .middleware import get_user_from_token
+from .middleware import TokenAuthMiddleware
+from .routing import websocket_urlpatterns
 
 
 class UserRegistrationAPITest(APITestCase):
@@ -89,6 +136,194 @@ class ProProfileAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class ProRatingAggregateTest(APITestCase):
+    def setUp(self):
+        """Set up a pro with two completed jobs for different customers."""
+        cache.clear()
+        self.pro = User.objects.create_user(username='pro_rating', password='p', email='pr@test.com', is_pro=True)
+        self.customers = []
+        self.jobs = []
+        for i in range(2):
+            customer = User.objects.create_user(username=f'cust_rating{i}', password='p', email=f'cr{i}@test.com', is_pro=False)
+            job = Job.objects.create(customer=customer, title=f'Rated job {i}', description='...')
+            job.accepted_bid = Bid.objects.create(job=job, pro=self.pro, amount=100)
+            job.is_completed = True
+            job.save()
+            self.customers.append(customer)
+            self.jobs.append(job)
+        self.public_profile_url = reverse('public-pro-profile', kwargs={'user_id': self.pro.id})
+
+    def post_review(self, index, rating):
+        self.client.force_authenticate(user=self.customers[index])
+        url = reverse('review-create', kwargs={'job_id': self.jobs[index].id})
+        return self.client.post(url, {'rating': rating, 'comment': 'ok'}, format='json')
+
+    def test_review_updates_stored_aggregates(self):
+        """Creating reviews keeps count, sum and average on the profile in step."""
+        self.assertEqual(self.post_review(0, 5).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_review(1, 2).status_code, status.HTTP_201_CREATED)
+        profile = ProProfile.objects.get(user=self.pro)
+        self.assertEqual(profile.rating_count, 2)
+        self.assertEqual(profile.rating_sum, 7)
+        self.assertAlmostEqual(profile.average_rating, 3.5)
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.public_profile_url)
+        self.assertEqual(response.data['average_rating'], 3.5)
+        self.assertEqual(response.data['rating_count'], 2)
+
+    def test_profile_edit_does_not_clobber_aggregates(self):
+        """Saving profile fields leaves rating aggregates alone."""
+        self.post_review(0, 4)
+        self.client.force_authenticate(user=self.pro)
+        response = self.client.patch(reverse('my-pro-profile'), {'bio': 'Updated', 'rating_count': 99}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = ProProfile.objects.get(user=self.pro)
+        self.assertEqual(profile.bio, 'Updated')
+        self.assertEqual(profile.rating_count, 1)
+
+    def test_recompute_ratings_repairs_drift(self):
+        """The recompute_ratings command restores aggregates from the Review table."""
+        self.post_review(0, 5)
+        Review.objects.create(job=self.jobs[1], pro=self.pro, customer=self.customers[1], rating=1)
+        ProProfile.objects.filter(user=self.pro).update(rating_count=10, rating_sum=3)
+
+        out = StringIO()
+        call_command('recompute_ratings', '--dry-run', stdout=out)
+        self.assertIn('1 drifted profiles would be repaired', out.getvalue())
+        self.assertEqual(ProProfile.objects.get(user=self.pro).rating_count, 10)
+
+        public_url = reverse('public-pro-profile', kwargs={'user_id': self.pro.id})
+        self.assertEqual(self.client.get(public_url).data['rating_count'], 10)
+        call_command('recompute_ratings', stdout=StringIO())
+        profile = ProProfile.objects.get(user=self.pro)
+        self.assertEqual((profile.rating_count, profile.rating_sum), (2, 6))
+        self.assertAlmostEqual(profile.average_rating, 3.0)
+        self.assertEqual(self.client.get(public_url).data['rating_count'], 2)
+
+
+class ProReviewsAPITest(APITestCase):
+    def setUp(self):
+        """Set up a pro profile and a helper to add reviews from different customers."""
+        cache.clear()
+        self.pro = User.objects.create_user(username='pro_reviews', password='p', email='prv@test.com', is_pro=True)
+        ProProfile.objects.create(user=self.pro, bio='Reviewed pro')
+        self.profile_url = reverse('public-pro-profile', kwargs={'user_id': self.pro.id})
+        self.reviews_url = reverse('pro-review-list', kwargs={'user_id': self.pro.id})
+        self.review_count = 0
+
+    def add_reviews(self, count):
+        for _ in range(count):
+            i = self.review_count
+            customer = User.objects.create_user(username=f'cust_rv{i}', password='p', email=f'crv{i}@test.com', first_name='Cust', last_name=str(i))
+            job = Job.objects.create(customer=customer, title=f'Reviewed job {i}', description='...')
+            Review.objects.create(job=job, pro=self.pro, customer=customer, rating=4, comment=f'Review {i}')
+            self.review_count += 1
+
+    def get_with_query_count(self, url, params=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_profile_embeds_bounded_review_preview(self):
+        """The public profile carries only the newest few reviews, in a fixed number of queries."""
+        self.add_reviews(2)
+        _, small = self.get_with_query_count(self.profile_url)
+        self.add_reviews(8)
+        response, large = self.get_with_query_count(self.profile_url)
+        self.assertEqual(small, large)
+        self.assertNotIn('reviews_received', response.data)
+        self.assertEqual([review['comment'] for review in response.data['latest_reviews']], ['Review 9', 'Review 8', 'Review 7'])
+        self.assertEqual(response.data['latest_reviews'][0]['customer_name'], 'Cust 9')
+
+    def test_reviews_endpoint_is_paginated_and_public(self):
+        """Anyone can page through all reviews, newest first, at a constant query cost."""
+        self.add_reviews(3)
+        _, small = self.get_with_query_count(self.reviews_url)
+        self.add_reviews(9)
+        response, large = self.get_with_query_count(self.reviews_url, {'page_size': 5})
+        self.assertEqual(small, large)
+        comments = [review['comment'] for review in response.data['results']]
+        self.assertEqual(comments, [f'Review {i}' for i in range(11, 6, -1)])
+        self.assertEqual(response.data['results'][0]['job_title'], 'Reviewed job 11')
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            comments.extend(review['comment'] for review in response.data['results'])
+        self.assertEqual(len(comments), 12)
+
+
+class PublicProProfileCacheTest(APITestCase):
+    def setUp(self):
+        """Set up a pro profile and a customer with a completed job for that pro."""
+        cache.clear()
+        self.pro = User.objects.create_user(username='pro_cache', password='p', email='pc@test.com', is_pro=True, first_name='Cached')
+        ProProfile.objects.create(user=self.pro, bio='Original bio')
+        self.customer = User.objects.create_user(username='cust_cache', password='p', email='cc@test.com', is_pro=False)
+        self.job = Job.objects.create(customer=self.customer, title='Cached job', description='...')
+        self.job.accepted_bid = Bid.objects.create(job=self.job, pro=self.pro, amount=100)
+        self.job.is_completed = True
+        self.job.save()
+        self.profile_url = reverse('public-pro-profile', kwargs={'user_id': self.pro.id})
+
+    def test_repeat_requests_are_served_from_cache(self):
+        """A second anonymous hit returns the same body without touching the database."""
+        first = self.client.get(self.profile_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', first)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.profile_url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        """Clients presenting the current ETag get an empty 304."""
+        etag = self.client.get(self.profile_url)['ETag']
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH='"stale", W/' + etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile_update_invalidates_cache(self):
+        """Saving the profile through MyProProfileView serves fresh data and a new ETag."""
+        etag = self.client.get(self.profile_url)['ETag']
+        self.client.force_authenticate(user=self.pro)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('my-pro-profile'), {'bio': 'New bio'}, format='json')
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['bio'], 'New bio')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_review_invalidates_cache(self):
+        """A new review shows up in the cached profile straight away."""
+        self.assertEqual(self.client.get(self.profile_url).data['rating_count'], 0)
+        self.client.force_authenticate(user=self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('review-create', kwargs={'job_id': self.job.id}), {'rating': 5}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.data['rating_count'], 1)
+        self.assertEqual(len(response.data['latest_reviews']), 1)
+
+    def test_login_does_not_invalidate_cache(self):
+        """last_login updates leave the cached profile alone."""
+        self.client.get(self.profile_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pro.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(self.profile_url)
+
+
 class JobAPITest(APITestCase):
     def setUp(self):
         """Set up initial users and jobs for testing."""
@@ -114,7 +349,68 @@ class JobAPITest(APITestCase):
         self.client.force_authenticate(user=self.pro_user)
         response = self.client.get(self.list_url)  
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        """Authenticate with a real token against the customer's job list."""
+        token_cache.clear()
+        self.customer = User.objects.create_user(username='tok_cust', password='p', email='tc@test.com')
+        self.token = Token.objects.create(user=self.customer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('my-jobs-list')
+
+    def get_token_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [q['sql'] for q in queries if 'authtoken_token' in q['sql']]
+
+    def test_steady_state_makes_no_auth_queries(self):
+        """Only the first request looks the token up."""
+        response, auth_queries = self.get_token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(auth_queries), 1)
+        response, auth_queries = self.get_token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(auth_queries, [])
+
+    def test_deleted_token_is_rejected(self):
+        """Logging out (deleting the token) takes effect immediately."""
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_changes_are_not_served_stale(self):
+        """Saving the user drops its cached tokens."""
+        self.client.get(self.url)
+        self.customer.is_active = False
+        self.customer.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_websocket_middleware_shares_the_cache(self):
+        """A token seen over HTTP authenticates a socket without queries."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            user = async_to_sync(get_user_from_token)(self.token.key)
+        self.assertEqual(user, self.customer)
+        self.assertTrue(async_to_sync(get_user_from_token)('missing').is_anonymous)
+
+    def test_lru_bound_and_ttl(self):
+        """The least recently used entry is evicted and entries expire."""
+        now = [0]
+        cache_ = TokenUserCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        users = [User(pk=i, username=f'u{i}') for i in range(3)]
+        tokens = [Token(key=f'k{i}', user=user) for i, user in enumerate(users)]
+        cache_.set(tokens[0], users[0])
+        cache_.set(tokens[1], users[1])
+        cache_.get('k0')
+        cache_.set(tokens[2], users[2])
+        self.assertIsNone(cache_.get('k1'))
+        self.assertEqual(cache_.get('k0')[1].username, 'u0')
+        now[0] = 10
+        self.assertIsNone(cache_.get('k0'))
+        self.assertIsNone(cache_.get('k2'))
 
 
 class MyJobsAPITest(APITestCase):
@@ -133,8 +429,8 @@ class MyJobsAPITest(APITestCase):
         self.client.force_authenticate(user=self.customer1)
         response = self.client.get(self.my_jobs_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        job_titles = [job['title'] for job in response.data]
+        self.assertEqual(len(response.data['results']), 2)
+        job_titles = [job['title'] for job in response.data['results']]
         self.assertIn('Job 1 by Cust1', job_titles)
         self.assertIn('Job 2 by Cust1', job_titles)
         self.assertNotIn('Job 1 by Cust2', job_titles)
@@ -144,15 +440,15 @@ class MyJobsAPITest(APITestCase):
         self.client.force_authenticate(user=self.customer2)
         response = self.client.get(self.my_jobs_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Job 1 by Cust2')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Job 1 by Cust2')
 
     def test_pro_sees_no_jobs_on_my_jobs_endpoint(self):
         """Ensure a professional sees an empty list on the customer 'my-jobs' endpoint."""
         self.client.force_authenticate(user=self.pro_user)
         response = self.client.get(self.my_jobs_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
 
     def test_unauthenticated_cannot_list_my_jobs(self):
         """Ensure unauthenticated users get 401 Unauthorized."""
@@ -190,39 +486,113 @@ class JobListFilteringSearchAPITest(APITestCase):
         response = self.client.get(self.jobs_url, {'search': 'Faucet'})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Leaky Faucet Repair')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Leaky Faucet Repair')
 
     def test_search_by_description_keyword(self):
         """Test searching jobs by a keyword in the description."""
         self.client.force_authenticate(user=self.pro_user)
         response = self.client.get(self.jobs_url, {'search': 'plumber'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Leaky Faucet Repair')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Leaky Faucet Repair')
 
     def test_filter_by_zip_code(self):
         """Test filtering jobs by an exact zip code."""
         self.client.force_authenticate(user=self.pro_user)
         response = self.client.get(self.jobs_url, {'zip_code': '75206'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Install Ceiling Fan')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Install Ceiling Fan')
 
     def test_search_and_filter_combined(self):
         """Test combining search and zip code filter."""
         self.client.force_authenticate(user=self.pro_user)
         response = self.client.get(self.jobs_url, {'search': 'Repair', 'zip_code': '75201'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Leaky Faucet Repair')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Leaky Faucet Repair')
 
     def test_search_no_results(self):
         """Test a search query that yields no results."""
         self.client.force_authenticate(user=self.pro_user)
         response = self.client.get(self.jobs_url, {'search': 'nonexistentkeyword'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_search_matches_word_stems_and_prefixes(self):
+        """Full-text search matches other word forms and partial words."""
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.get(self.jobs_url, {'search': 'plumbers'})
+        self.assertEqual([job['title'] for job in response.data['results']], ['Leaky Faucet Repair'])
+        response = self.client.get(self.jobs_url, {'search': 'Electric'})
+        self.assertEqual([job['title'] for job in response.data['results']], ['Install Ceiling Fan'])
+
+    def test_search_requires_every_term(self):
+        """All search terms must match somewhere in the job."""
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.get(self.jobs_url, {'search': 'faucet bedroom'})
+        self.assertEqual(len(response.data['results']), 0)
+        response = self.client.get(self.jobs_url, {'search': 'fan bedroom'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_search_index_follows_updates(self):
+        """Edited and new jobs are searchable straight away."""
+        Job.objects.filter(title='Paint Living Room').update(title='Paint Garage Door')
+        Job.objects.create(
+            customer=self.customer, title="Garage opener", description="Motor is stuck.",
+            street_address="1 Elm St", city="Dallas", state="TX", zip_code="75201"
+        )
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.get(self.jobs_url, {'search': 'garage', 'ordering': 'created_at'})
+        self.assertEqual([job['title'] for job in response.data['results']], ['Paint Garage Door', 'Garage opener'])
+        response = self.client.get(self.jobs_url, {'search': 'living'})
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_order_by_search_rank(self):
+        """Title matches outrank description-only matches when ordering by rank."""
+        Job.objects.create(
+            customer=self.customer, title="Dryer vent cleaning", description="Lint buildup.",
+            street_address="2 Elm St", city="Dallas", state="TX", zip_code="75201"
+        )
+        Job.objects.create(
+            customer=self.customer, title="Washer hookup", description="New washer, also look at the dryer.",
+            street_address="3 Elm St", city="Dallas", state="TX", zip_code="75201"
+        )
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.get(self.jobs_url, {'search': 'dryer', 'ordering': '-search_rank'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([job['title'] for job in response.data['results']], ['Dryer vent cleaning', 'Washer hookup'])
+        response = self.client.get(self.jobs_url, {'ordering': '-search_rank'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_search_rank_pages_walk_every_match(self):
+        """Following next links ordered by rank visits each match once, ties included."""
+        for i, description in enumerate(['Dryer.', 'Dryer.', 'Dryer dryer.', 'Loud dryer drum.', 'Dryer dryer.']):
+            Job.objects.create(
+                customer=self.customer, title=f"Appliance {i}", description=description,
+                street_address="2 Elm St", city="Dallas", state="TX", zip_code="75201"
+            )
+        self.client.force_authenticate(user=self.pro_user)
+        params = {'search': 'dryer', 'ordering': '-search_rank'}
+        expected = [job['id'] for job in self.client.get(self.jobs_url, params).data['results']]
+        self.assertEqual(len(expected), 5)
+        walked = []
+        response = self.client.get(self.jobs_url, {**params, 'page_size': 2})
+        while True:
+            walked += [job['id'] for job in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(walked, expected)
+
+    def test_postgresql_rank_is_double_precision(self):
+        """The PostgreSQL rank is compiled as float8, matching how cursors compare it."""
+        postgresql = PostgreSQLDatabaseWrapper({**connection.settings_dict, 'NAME': 'unused'}, alias='postgresql')
+        queryset = FullTextSearchFilter().filter_postgresql(Job.objects.all(), ['dryer'])
+        sql, _ = queryset.query.get_compiler(connection=postgresql).as_sql()
+        self.assertIn('::double precision AS "search_rank"', sql)
 
     def test_non_pro_cannot_access_job_list(self):
         """Ensure non-professionals are blocked by IsProfessionalUser permission."""
@@ -231,6 +601,295 @@ class JobListFilteringSearchAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class JobListQueryCountTest(APITestCase):
+    def setUp(self):
+        """Set up a customer, a pro, and a helper to seed jobs with nested data."""
+        self.customer = User.objects.create_user(username='cust_qc', password='p', email='cqc@test.com', is_pro=False)
+        self.pro = User.objects.create_user(username='pro_qc', password='p', email='pqc@test.com', is_pro=True)
+
+    def seed_jobs(self, count):
+        for i in range(count):
+            open_job = Job.objects.create(customer=self.customer, title=f'Open {i}', description='...')
+            Bid.objects.create(job=open_job, pro=self.pro, amount=10, details='...')
+            done_job = Job.objects.create(customer=self.customer, title=f'Done {i}', description='...')
+            bid = Bid.objects.create(job=done_job, pro=self.pro, amount=20, details='...')
+            done_job.accepted_bid = bid
+            done_job.is_completed = True
+            done_job.save()
+            Review.objects.create(job=done_job, pro=self.pro, customer=self.customer, rating=5)
+
+    def count_queries(self, url, user):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def assert_constant_queries(self, url, user):
+        self.seed_jobs(2)
+        small = self.count_queries(url, user)
+        self.seed_jobs(10)
+        large = self.count_queries(url, user)
+        self.assertEqual(small, large)
+
+    def test_job_list_query_count_is_constant(self):
+        """Ensure the job board does not issue queries per job."""
+        self.assert_constant_queries(reverse('job-list'), self.pro)
+
+    def test_my_jobs_query_count_is_constant(self):
+        """Ensure 'my-jobs' with bids, accepted bids and reviews runs a fixed number of queries."""
+        self.assert_constant_queries(reverse('my-jobs-list'), self.customer)
+
+    def test_my_work_query_count_is_constant(self):
+        """Ensure 'my-work' runs a fixed number of queries."""
+        self.assert_constant_queries(reverse('my-work-list'), self.pro)
+
+
+class JobListPaginationTest(APITestCase):
+    def setUp(self):
+        """Set up 25 open jobs, half of them sharing a created_at timestamp and city."""
+        self.customer = User.objects.create_user(username='cust_page', password='p', email='cpg@test.com', is_pro=False)
+        self.pro = User.objects.create_user(username='pro_page', password='p', email='ppg@test.com', is_pro=True)
+        for i in range(25):
+            Job.objects.create(
+                customer=self.customer, title=f'Job {i}', description='...',
+                city='Dallas' if i % 2 else 'Austin', state='TX', zip_code='75201'
+            )
+        tied = Job.objects.order_by('id')[:12].values_list('id', flat=True)
+        Job.objects.filter(id__in=list(tied)).update(created_at=Job.objects.earliest('created_at').created_at)
+        self.jobs_url = reverse('job-list')
+        self.client.force_authenticate(user=self.pro)
+
+    def walk(self, params):
+        ids = []
+        response = self.client.get(self.jobs_url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(job['id'] for job in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_walk_returns_every_job_once(self):
+        """Following next links visits all jobs exactly once in (-created_at, -id) order."""
+        ids, _ = self.walk({'page_size': 10})
+        expected = list(Job.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_walk_with_ordering_filter(self):
+        """Ordering by a heavily duplicated column still pages without gaps or repeats."""
+        ids, _ = self.walk({'page_size': 7, 'ordering': 'city'})
+        expected = list(Job.objects.order_by('city', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        """The previous link of the second page returns the first page again."""
+        first = self.client.get(self.jobs_url, {'page_size': 10})
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [job['id'] for job in back.data['results']],
+            [job['id'] for job in first.data['results']]
+        )
+
+    def test_invalid_cursor_returns_404(self):
+        """A tampered cursor is rejected."""
+        response = self.client.get(self.jobs_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NearbyJobsAPITest(APITestCase):
+    def setUp(self):
+        """Set up a pro serving two zip codes and open/closed jobs around them."""
+        self.customer = User.objects.create_user(username='cust_near', password='p', email='cn@test.com', is_pro=False)
+        self.pro = User.objects.create_user(username='pro_near', password='p', email='pn@test.com', is_pro=True)
+        ProProfile.objects.create(user=self.pro, service_area_zip_codes='75201, 75206,75201')
+        for title, zip_code, is_completed in [
+            ('In area', '75201', False),
+            ('Also in area', '75206', False),
+            ('Out of area', '75024', False),
+            ('Closed in area', '75201', True),
+        ]:
+            Job.objects.create(
+                customer=self.customer, title=title, description='...',
+                city='Dallas', state='TX', zip_code=zip_code, is_completed=is_completed
+            )
+        self.nearby_url = reverse('job-nearby')
+
+    def test_parse_zip_codes(self):
+        """Zip code strings are split on commas and whitespace and de-duplicated."""
+        self.assertEqual(parse_zip_codes(' 75201,75205  75201,,'), ['75201', '75205'])
+        self.assertEqual(parse_zip_codes(''), [])
+
+    def test_profile_zip_codes_are_normalized(self):
+        """Saving a profile mirrors its zip codes into ServiceArea rows."""
+        zips = set(ServiceArea.objects.filter(pro=self.pro).values_list('zip_code', flat=True))
+        self.assertEqual(zips, {'75201', '75206'})
+
+    def test_pro_sees_open_jobs_in_service_area(self):
+        """Only open jobs in the pro's zip codes are listed."""
+        self.client.force_authenticate(user=self.pro)
+        response = self.client.get(self.nearby_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({job['title'] for job in response.data['results']}, {'In area', 'Also in area'})
+
+    def test_editing_service_area_updates_matches(self):
+        """Changing service_area_zip_codes through the profile endpoint changes the nearby feed."""
+        self.client.force_authenticate(user=self.pro)
+        response = self.client.patch(reverse('my-pro-profile'), {'service_area_zip_codes': '75024'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.nearby_url)
+        self.assertEqual([job['title'] for job in response.data['results']], ['Out of area'])
+        self.assertEqual(list(ServiceArea.objects.filter(pro=self.pro).values_list('zip_code', flat=True)), ['75024'])
+
+    def test_customer_cannot_list_nearby_jobs(self):
+        """Ensure non-professionals get 403 Forbidden."""
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(self.nearby_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class JobProximityAPITest(APITestCase):
+    def setUp(self):
+        """Set up a Dallas-based pro and open jobs at increasing distances."""
+        self.customer = User.objects.create_user(username='cust_geo', password='p', email='cg@test.com', is_pro=False)
+        self.pro = User.objects.create_user(username='pro_geo', password='p', email='pg@test.com', is_pro=True)
+        ProProfile.objects.create(user=self.pro, service_area_zip_codes='75201')
+        for title, city, zip_code in [
+            ('Downtown', 'Dallas', '75201'),
+            ('Lakewood', 'Dallas', '75206'),
+            ('Plano', 'Plano', '75024'),
+            ('Houston', 'Houston', '77002'),
+        ]:
+            Job.objects.create(customer=self.customer, title=title, description='...', city=city, state='TX', zip_code=zip_code)
+        self.jobs_url = reverse('job-list')
+        self.client.force_authenticate(user=self.pro)
+
+    def test_haversine_distance(self):
+        """Dallas to Houston is roughly 225 miles."""
+        self.assertAlmostEqual(haversine_miles(32.7877, -96.7999, 29.7523, -95.3657), 225, delta=5)
+
+    def test_within_miles_filters_and_sorts_by_distance(self):
+        """Only nearby jobs are returned, nearest first, with their distance."""
+        response = self.client.get(self.jobs_url, {'within_miles': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([job['title'] for job in results], ['Downtown', 'Lakewood'])
+        self.assertEqual(results[0]['distance'], 0)
+        self.assertGreater(results[1]['distance'], 2)
+
+        response = self.client.get(self.jobs_url, {'within_miles': 30})
+        self.assertEqual([job['title'] for job in response.data['results']], ['Downtown', 'Lakewood', 'Plano'])
+
+    def test_within_miles_pages_by_distance(self):
+        """Cursor pagination follows the distance ordering."""
+        response = self.client.get(self.jobs_url, {'within_miles': 30, 'page_size': 2})
+        titles = [job['title'] for job in response.data['results']]
+        response = self.client.get(response.data['next'])
+        titles.extend(job['title'] for job in response.data['results'])
+        self.assertEqual(titles, ['Downtown', 'Lakewood', 'Plano'])
+
+    def test_explicit_ordering_overrides_distance(self):
+        """An ordering parameter still wins over the nearest-first default."""
+        response = self.client.get(self.jobs_url, {'within_miles': 30, 'ordering': 'city'})
+        self.assertEqual([job['city'] for job in response.data['results']], ['Dallas', 'Dallas', 'Plano'])
+
+    def test_without_within_miles_distance_is_ignored(self):
+        """Regular listings have no distance and ignore distance ordering."""
+        response = self.client.get(self.jobs_url, {'ordering': 'distance'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertNotIn('distance', response.data['results'][0])
+
+    def test_invalid_within_miles(self):
+        """Non-numeric or out-of-range radii are rejected."""
+        for value in ['far', '-5', '5000']:
+            response = self.client.get(self.jobs_url, {'within_miles': value})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pro_without_service_area_gets_no_jobs(self):
+        """A pro with no known service-area zip has nothing within range."""
+        ServiceArea.objects.filter(pro=self.pro).delete()
+        response = self.client.get(self.jobs_url, {'within_miles': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+class ConditionalGetAPITest(APITestCase):
+    def setUp(self):
+        """Set up a hired job with messages plus an open job on the board."""
+        self.customer = User.objects.create_user(username='cust_etag', password='p', email='ce@test.com', is_pro=False)
+        self.pro = User.objects.create_user(username='pro_etag', password='p', email='pe@test.com', is_pro=True)
+        self.open_job = Job.objects.create(customer=self.customer, title='Open etag job', description='...')
+        self.hired_job = Job.objects.create(customer=self.customer, title='Hired etag job', description='...')
+        self.hired_job.accepted_bid = Bid.objects.create(job=self.hired_job, pro=self.pro, amount=100)
+        self.hired_job.is_completed = True
+        self.hired_job.save()
+        Message.objects.create(job=self.hired_job, sender=self.customer, receiver=self.pro, body='Hi')
+
+    def assert_revalidates(self, url, user, max_queries):
+        """Fetches url, then checks the ETag yields a 304 within max_queries queries."""
+        self.client.force_authenticate(user=user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        with self.assertNumQueries(max_queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(response.content)
+        return etag
+
+    def test_read_endpoints_answer_304(self):
+        """Job board, job detail, my-jobs and messages all revalidate with one or two queries."""
+        self.assert_revalidates(reverse('job-list'), self.pro, 1)
+        self.assert_revalidates(reverse('job-detail', kwargs={'pk': self.open_job.id}), self.customer, 1)
+        self.assert_revalidates(reverse('my-jobs-list'), self.customer, 1)
+        self.assert_revalidates(reverse('message-list', kwargs={'job_id': self.hired_job.id}), self.pro, 2)
+
+    def test_new_bid_changes_job_validators(self):
+        """A new bid is nested in the job, so detail and list ETags change."""
+        detail_url = reverse('job-detail', kwargs={'pk': self.open_job.id})
+        detail_etag = self.assert_revalidates(detail_url, self.customer, 1)
+        list_etag = self.assert_revalidates(reverse('my-jobs-list'), self.customer, 1)
+        Bid.objects.create(job=self.open_job, pro=self.pro, amount=50)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['bids']), 1)
+        response = self.client.get(reverse('my-jobs-list'), HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_new_message_changes_message_list_etag(self):
+        """Posting a message invalidates the conversation's ETag."""
+        url = reverse('message-list', kwargs={'job_id': self.hired_job.id})
+        etag = self.assert_revalidates(url, self.customer, 2)
+        Message.objects.create(job=self.hired_job, sender=self.pro, receiver=self.customer, body='Hello')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_list_validator_comes_from_the_page(self):
+        """List ETags never scan the whole filtered queryset, and change when the page does."""
+        self.client.force_authenticate(user=self.pro)
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.client.get(reverse('job-list'))['ETag']
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql'] or 'MAX(' in q['sql']])
+        Job.objects.create(customer=self.customer, title='Newer job', description='...')
+        response = self.client.get(reverse('job-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['title'], 'Newer job')
+
+    def test_etag_depends_on_query_and_user(self):
+        """Different pages, filters and users never share an ETag."""
+        self.client.force_authenticate(user=self.pro)
+        first = self.client.get(reverse('job-list'))['ETag']
+        filtered = self.client.get(reverse('job-list'), {'page_size': 1})['ETag']
+        self.assertNotEqual(first, filtered)
+        other_pro = User.objects.create_user(username='pro_etag2', password='p', email='pe2@test.com', is_pro=True)
+        self.client.force_authenticate(user=other_pro)
+        self.assertNotEqual(self.client.get(reverse('job-list'))['ETag'], first)
+
+
 class MyWorkAPITest(APITestCase):
     def setUp(self):
         """Set up users, jobs, bids, and accept one."""
@@ -254,16 +913,16 @@ class MyWorkAPITest(APITestCase):
         self.client.force_authenticate(user=self.pro1)
         response = self.client.get(self.my_work_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Job 1 for Pro1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Job 1 for Pro1')
 
     def test_another_hired_pro_sees_their_jobs(self):
         """Ensure a different hired pro sees only their accepted jobs."""
         self.client.force_authenticate(user=self.pro2)
         response = self.client.get(self.my_work_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Job 2 for Pro2')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Job 2 for Pro2')
 
     def test_customer_cannot_access_my_work(self):
         """Ensure a customer gets 403 Forbidden on the 'my-work' endpoint."""
@@ -392,21 +1051,21 @@ class MessageAPITest(APITestCase):
         self.client.force_authenticate(user=self.customer)
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_hired_pro_can_list_messages(self):
         """Ensure the hired professional can list messages for the job."""
         self.client.force_authenticate(user=self.pro)
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_other_user_cannot_list_messages(self):
         """Ensure an unrelated user cannot list messages."""
         self.client.force_authenticate(user=self.other_pro)
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
 
     def test_unauthenticated_cannot_list_messages(self):
         """Ensure unauthenticated users cannot list messages."""
@@ -454,6 +1113,1060 @@ class MessageAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def chat_communicator(job, token):
+    """Builds a communicator for a job chat authenticated with a token."""
+    application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+    return WebsocketCommunicator(application, f'/ws/chat/{job.id}/?token={token.key}')
+
+
+async def receive_history(communicator):
+    """Receives the frames of one history page, up to the one marked last."""
+    frames = [await communicator.receive_json_from()]
+    while not frames[-1]['last']:
+        frames.append(await communicator.receive_json_from())
+    return frames
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatConsumerTest(TransactionTestCase):
+    def setUp(self):
+        """Set up a hired job with more than a page of history."""
+        self.customer = User.objects.create_user(username='chat_cust', password='p', email='cc@test.com', first_name='Cathy')
+        self.pro = User.objects.create_user(username='chat_pro', password='p', email='cp@test.com', is_pro=True)
+        self.customer_token = Token.objects.create(user=self.customer)
+        self.job = Job.objects.create(customer=self.customer, title='Chat job', description='...')
+        self.job.accepted_bid = Bid.objects.create(job=self.job, pro=self.pro, amount=100)
+        self.job.save()
+        self.messages = [
+            Message.objects.create(
+                job=self.job,
+                sender=self.customer if i % 2 else self.pro,
+                receiver=self.pro if i % 2 else self.customer,
+                body=f'Message {i}'
+            )
+            for i in range(HISTORY_PAGE_SIZE + 10)
+        ]
+
+    def test_history_is_a_single_query(self):
+        """Sender names come from the same query, whatever the page."""
+        with self.assertNumQueries(1):
+            history = message_history(self.job.id)
+        self.assertEqual([m['id'] for m in history], [m.id for m in self.messages[-HISTORY_PAGE_SIZE:]])
+        self.assertEqual(history[-1]['sender_name'], 'Cathy')
+        self.assertEqual(history[-2]['sender_name'], 'chat_pro')
+        with self.assertNumQueries(1):
+            older = message_history(self.job.id, before=history[0]['id'])
+        self.assertEqual([m['id'] for m in older], [m.id for m in self.messages[:10]])
+
+    @override_settings(CHAT_HISTORY_CHUNK_SIZE=20)
+    def test_scroll_back_over_socket(self):
+        """The socket streams the latest page on connect, newest chunk first, and older pages on request."""
+        async_to_sync(self.scroll_back)()
+
+    async def scroll_back(self):
+        communicator = chat_communicator(self.job, self.customer_token)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        frames = await receive_history(communicator)
+        self.assertEqual([f['type'] for f in frames], ['message_history'] * 3)
+        self.assertEqual([f['chunk'] for f in frames], [0, 1, 2])
+        self.assertEqual([len(f['messages']) for f in frames], [20, 20, 10])
+        self.assertIn('peer', frames[0])
+        self.assertNotIn('peer', frames[1])
+        self.assertTrue(frames[-1]['has_more'])
+        # Each chunk goes before the ones already received.
+        latest = [m for f in reversed(frames) for m in f['messages']]
+        self.assertEqual([m['id'] for m in latest], [m.id for m in self.messages[-HISTORY_PAGE_SIZE:]])
+
+        await communicator.send_json_to({'type': 'load_history', 'before': latest[0]['id']})
+        older, = await receive_history(communicator)
+        self.assertEqual([m['body'] for m in older['messages']], [f'Message {i}' for i in range(10)])
+        self.assertFalse(older['has_more'])
+        await communicator.disconnect()
+
+
+    def test_each_message_is_one_insert(self):
+        """Participants and names are resolved at connect, not per message."""
+        with CaptureQueriesContext(connection) as queries:
+            responses = async_to_sync(self.send_messages)(3)
+        # Token, participants and history on connect, then one insert per message.
+        self.assertEqual(len(queries), 3 + 3, [q['sql'] for q in queries])
+        self.assertTrue(all(q['sql'].startswith('INSERT') for q in queries[3:]))
+        self.assertEqual([r['message']['sender_name'] for r in responses], ['Cathy'] * 3)
+        self.assertEqual([r['message']['receiver'] for r in responses], [self.pro.id] * 3)
+
+    async def send_messages(self, count):
+        communicator = chat_communicator(self.job, self.customer_token)
+        await communicator.connect()
+        await receive_history(communicator)
+        responses = []
+        for i in range(count):
+            await communicator.send_json_to({'message': f'Burst {i}'})
+            responses.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        return responses
+
+
+@override_settings(
+    CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS,
+    CHAT_WRITE_BEHIND=True,
+    CHAT_WRITE_BEHIND_BATCH_SIZE=100,
+    CHAT_WRITE_BEHIND_FLUSH_INTERVAL=60,
+)
+class ChatWriteBehindTest(TransactionTestCase):
+    def setUp(self):
+        """Set up a hired job with both participants holding tokens."""
+        self.customer = User.objects.create_user(username='wb_cust', password='p', email='wc@test.com')
+        self.pro = User.objects.create_user(username='wb_pro', password='p', email='wp@test.com', is_pro=True)
+        self.customer_token = Token.objects.create(user=self.customer)
+        self.pro_token = Token.objects.create(user=self.pro)
+        self.job = Job.objects.create(customer=self.customer, title='Write-behind job', description='...')
+        self.job.accepted_bid = Bid.objects.create(job=self.job, pro=self.pro, amount=100)
+        self.job.save()
+
+    def listed_bodies(self):
+        client = APIClient()
+        client.force_authenticate(user=self.customer)
+        response = client.get(reverse('message-list', kwargs={'job_id': self.job.id}))
+        return [message['body'] for message in response.json()['results']]
+
+    async def connect(self, token):
+        communicator = chat_communicator(self.job, token)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        return communicator
+
+    def test_broadcasts_before_insert_and_flushes_on_disconnect(self):
+        """Messages are delivered with a client id first and stored on disconnect."""
+        async_to_sync(self.burst_then_disconnect)()
+        self.assertEqual(self.listed_bodies(), [f'Burst {i}' for i in range(5)])
+
+    async def burst_then_disconnect(self):
+        communicator = await self.connect(self.customer_token)
+        for i in range(5):
+            await communicator.send_json_to({'message': f'Burst {i}', 'client_id': f'c{i}'})
+            frame = await communicator.receive_json_from()
+            self.assertIsNone(frame['message']['id'])
+            self.assertEqual(frame['message']['client_id'], f'c{i}')
+        self.assertEqual(await database_sync_to_async(Message.objects.count)(), 0)
+        await communicator.disconnect()
+
+    @override_settings(CHAT_WRITE_BEHIND_BATCH_SIZE=4)
+    def test_batches_keep_send_order_across_participants(self):
+        """Interleaved senders are stored, and listed, in the order they spoke."""
+        sent = async_to_sync(self.interleaved_chat)(8)
+        self.assertEqual(self.listed_bodies(), sent)
+        ids = list(Message.objects.order_by('timestamp', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, sorted(ids))
+
+    async def interleaved_chat(self, count):
+        customer = await self.connect(self.customer_token)
+        pro = await self.connect(self.pro_token)
+        sent, saved = [], {}
+
+        async def next_frame(communicator):
+            frame = await communicator.receive_json_from()
+            if frame.get('type') == 'message_saved':
+                saved[frame['client_id']] = frame['id']
+            return frame
+
+        for i in range(count):
+            speaker = customer if i % 2 == 0 else pro
+            sent.append(f'Turn {i}')
+            await speaker.send_json_to({'message': sent[-1], 'client_id': str(i)})
+            # Wait for our own echo so the next speaker really speaks later.
+            while (await next_frame(speaker)).get('message', {}).get('client_id') != str(i):
+                pass
+        while len(saved) < count:
+            await next_frame(pro)
+        self.assertEqual([saved[str(i)] for i in range(count)], sorted(saved.values()))
+        await customer.disconnect()
+        await pro.disconnect()
+        return sent
+
+    @override_settings(CHAT_WRITE_BEHIND_FLUSH_INTERVAL=0.01)
+    def test_flushes_after_interval(self):
+        """A lone message is stored once the flush interval passes."""
+        async_to_sync(self.lone_message)()
+
+    async def lone_message(self):
+        communicator = await self.connect(self.customer_token)
+        await communicator.send_json_to({'message': 'Anyone there?'})
+        echo = await communicator.receive_json_from()
+        saved = await communicator.receive_json_from()
+        self.assertEqual(saved['type'], 'message_saved')
+        self.assertEqual(saved['client_id'], echo['message']['client_id'])
+        stored = await database_sync_to_async(Message.objects.get)(id=saved['id'])
+        self.assertEqual(stored.body, 'Anyone there?')
+        await communicator.disconnect()
+
+    def test_shutdown_flush(self):
+        """Messages still queued when the loop is gone are written at exit."""
+        async_to_sync(self.queue_without_flushing)()
+        self.assertFalse(Message.objects.exists())
+        flush_all_queues()
+        self.assertEqual(self.listed_bodies(), ['Left behind'])
+
+    async def queue_without_flushing(self):
+        queue = get_write_queue()
+        queue.put(Message(job_id=self.job.id, sender_id=self.customer.id, receiver_id=self.pro.id, body='Left behind'))
+        queue.timer.cancel()
+        queue.timer = None
+
+    def test_unstorable_message_is_dropped_not_retried(self):
+        """A body the database cannot encode is dropped and the rest of the batch is stored."""
+        async_to_sync(self.flush_with_bad_row)()
+        self.assertEqual(self.listed_bodies(), ['Before', 'After'])
+
+    async def flush_with_bad_row(self):
+        queue = get_write_queue()
+        for body in ('Before', 'Broken \ud800', 'After'):
+            queue.put(Message(job_id=self.job.id, sender_id=self.customer.id, receiver_id=self.pro.id, body=body))
+        await queue.flush()
+        self.assertEqual(queue.pending, [])
+        queue.timer.cancel()
+        queue.timer = None
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, READ_RECEIPT_FLUSH_INTERVAL=60)
+class ChatPresenceTest(TransactionTestCase):
+    def setUp(self):
+        """Set up a hired job with a few messages to the pro."""
+        cache.clear()
+        self.customer = User.objects.create_user(username='pr_cust', password='p', email='prc@test.com')
+        self.pro = User.objects.create_user(username='pr_pro', password='p', email='prp@test.com', is_pro=True)
+        self.customer_token = Token.objects.create(user=self.customer)
+        self.pro_token = Token.objects.create(user=self.pro)
+        self.job = Job.objects.create(customer=self.customer, title='Presence job', description='...')
+        self.job.accepted_bid = Bid.objects.create(job=self.job, pro=self.pro, amount=100)
+        self.job.save()
+        self.messages = [
+            Message.objects.create(job=self.job, sender=self.customer, receiver=self.pro, body=f'Hi {i}')
+            for i in range(5)
+        ]
+
+    async def connect(self, token):
+        communicator = chat_communicator(self.job, token)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        history = await communicator.receive_json_from()
+        return communicator, history['peer']
+
+    def test_presence_and_typing(self):
+        """Joining, typing and leaving reach the other participant only; typing is not stored."""
+        async def run():
+            customer, peer = await self.connect(self.customer_token)
+            self.assertEqual(peer, {'user': self.pro.id, 'online': False, 'last_read_message_id': 0})
+            pro, peer = await self.connect(self.pro_token)
+            self.assertTrue(peer['online'])
+            self.assertEqual(await customer.receive_json_from(), {'type': 'presence', 'user': self.pro.id, 'online': True})
+
+            await pro.send_json_to({'type': 'typing', 'typing': True})
+            self.assertEqual(await customer.receive_json_from(), {'type': 'typing', 'user': self.pro.id, 'typing': True})
+            self.assertTrue(await pro.receive_nothing())
+
+            await customer.send_json_to({'type': 'heartbeat'})
+            self.assertEqual(await customer.receive_json_from(), {'type': 'presence', 'user': self.pro.id, 'online': True})
+
+            await pro.disconnect()
+            self.assertEqual(await customer.receive_json_from(), {'type': 'presence', 'user': self.pro.id, 'online': False})
+            await customer.disconnect()
+
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(run)()
+        self.assertFalse([q['sql'] for q in queries if not q['sql'].startswith('SELECT')])
+
+    def test_closing_one_of_two_tabs_stays_online(self):
+        """Only the user's last socket on the job takes them offline."""
+        async def run():
+            customer, _ = await self.connect(self.customer_token)
+            first_tab, _ = await self.connect(self.pro_token)
+            self.assertEqual(await customer.receive_json_from(), {'type': 'presence', 'user': self.pro.id, 'online': True})
+            second_tab, _ = await self.connect(self.pro_token)
+            await first_tab.disconnect()
+            self.assertTrue(await customer.receive_nothing())
+            await customer.send_json_to({'type': 'heartbeat'})
+            self.assertEqual(await customer.receive_json_from(), {'type': 'presence', 'user': self.pro.id, 'online': True})
+            await second_tab.disconnect()
+            self.assertEqual(await customer.receive_json_from(), {'type': 'presence', 'user': self.pro.id, 'online': False})
+            await customer.disconnect()
+
+        async_to_sync(run)()
+
+    def test_read_receipts_are_relayed_and_coalesced(self):
+        ids = [message.id for message in self.messages]
+
+        async def run():
+            customer, _ = await self.connect(self.customer_token)
+            pro, _ = await self.connect(self.pro_token)
+            await customer.receive_json_from()  # The pro coming online.
+            for message_id in (ids[1], ids[3], ids[2]):
+                await pro.send_json_to({'type': 'read', 'message_id': message_id})
+            receipts = [await customer.receive_json_from() for _ in range(2)]
+            self.assertEqual([r['message_id'] for r in receipts], [ids[1], ids[3]])
+            self.assertTrue(await customer.receive_nothing())
+            self.assertFalse(await database_sync_to_async(ReadReceipt.objects.exists)())
+            await pro.disconnect()
+            await customer.disconnect()
+
+            customer, peer = await self.connect(self.customer_token)
+            self.assertEqual(peer['last_read_message_id'], ids[3])
+            await customer.disconnect()
+
+        async_to_sync(run)()
+        self.assertEqual(list(ReadReceipt.objects.values_list('user', 'last_read_message_id')), [(self.pro.id, ids[3])])
+
+    def test_receipts_never_move_backwards(self):
+        write_receipts({(self.job.id, self.pro.id): self.messages[3].id})
+        write_receipts({(self.job.id, self.pro.id): self.messages[1].id, (self.job.id, self.customer.id): 7})
+        self.assertEqual(
+            dict(ReadReceipt.objects.values_list('user', 'last_read_message_id')),
+            {self.pro.id: self.messages[3].id, self.customer.id: 7},
+        )
+
+    def test_bad_receipt_does_not_block_the_batch(self):
+        """A permanently failing row is dropped and the others are stored."""
+        write_receipts({(self.job.id, self.customer.id): 5, (self.job.id, self.pro.id): 2 ** 70})
+        self.assertEqual(list(ReadReceipt.objects.values_list('user', 'last_read_message_id')), [(self.customer.id, 5)])
+
+    def test_read_is_clamped_to_messages_sent_to_the_socket(self):
+        """Receipts past the newest message the socket has seen name that message instead."""
+        async def run():
+            customer, _ = await self.connect(self.customer_token)
+            pro, _ = await self.connect(self.pro_token)
+            await customer.receive_json_from()  # The pro coming online.
+            await pro.send_json_to({'type': 'read', 'message_id': 2 ** 70})
+            receipt = await customer.receive_json_from()
+            self.assertEqual(receipt['message_id'], self.messages[-1].id)
+            await customer.send_json_to({'message': 'New'})
+            new_id = (await customer.receive_json_from())['message']['id']
+            await pro.receive_json_from()
+            await pro.send_json_to({'type': 'read', 'message_id': new_id + 1000})
+            self.assertEqual((await customer.receive_json_from())['message_id'], new_id)
+            await pro.disconnect()
+            await customer.disconnect()
+
+        async_to_sync(run)()
+        new_id = Message.objects.get(body='New').id
+        self.assertEqual(ReadReceipt.objects.get(user=self.pro).last_read_message_id, new_id)
+
+    def test_unread_count_is_one_query(self):
+        ReadReceipt.objects.create(job=self.job, user=self.pro, last_read_message_id=self.messages[2].id)
+        other_job = Job.objects.create(customer=self.customer, title='Other', description='...')
+        Message.objects.create(job=other_job, sender=self.customer, receiver=self.pro, body='Unread')
+        client = APIClient()
+        client.force_authenticate(user=self.pro)
+        with self.assertNumQueries(1):
+            response = client.get(reverse('unread-count'))
+        self.assertEqual(response.json(), {'total': 3, 'jobs': {str(self.job.id): 2, str(other_job.id): 1}})
+        response = client.get(reverse('unread-count'), {'job': self.job.id})
+        self.assertEqual(response.json(), {'total': 2, 'jobs': {str(self.job.id): 2}})
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatConnectionMemoryTest(TransactionTestCase):
+    # About 20 KiB per idle connection was measured, most of it the
+    # communicator's and the channel layer's queues, whose size varies
+    # with the Python, Channels and asgiref versions. The budget only
+    # catches gross regressions (say, holding on to history pages); the
+    # per-file checks below are the precise ones.
+    BUDGET = 64 * 1024
+
+    def setUp(self):
+        """Set up a hired job with a full page of history."""
+        cache.clear()
+        customer = User.objects.create_user(username='mem_cust', password='p', email='mc@test.com')
+        pro = User.objects.create_user(username='mem_pro', password='p', email='mp@test.com', is_pro=True)
+        job = Job.objects.create(customer=customer, title='Memory job', description='...')
+        job.accepted_bid = Bid.objects.create(job=job, pro=pro, amount=100)
+        job.save()
+        Message.objects.bulk_create([
+            Message(job=job, sender=customer, receiver=pro, body=f'Message {i} ' + 'x' * 200)
+            for i in range(HISTORY_PAGE_SIZE)
+        ])
+        self.paths = [
+            f'/ws/chat/{job.id}/?token={Token.objects.create(user=user).key}' for user in (customer, pro)
+        ]
+
+    def test_idle_connection_memory_stays_within_budget(self):
+        """Idle chat sockets keep neither the history page nor per-connection model instances."""
+        per_connection, by_file = async_to_sync(measure_connection_memory)(self.paths * 50)
+        self.assertLess(per_connection, self.BUDGET, by_file[:10])
+        retained = {filename: size / 100 for size, filename in by_file}
+        # No model instances (such as a copy of the user) per connection.
+        self.assertLess(retained.get(django_model_base.__file__, 0), 64, by_file[:10])
+        self.assertLess(retained.get(chat_consumers.__file__, 0), 512, by_file[:10])
+
+
+class MiniRedisTest(SimpleTestCase):
+    def test_backs_the_redis_cache(self):
+        """The cache operations presence and the replay buffers rely on work against the stand-in."""
+        async def run():
+            async with MiniRedis() as broker:
+                redis_cache = RedisCache(broker.url, {})
+                self.assertTrue(await redis_cache.aadd('feed:seq', 0, None))
+                self.assertFalse(await redis_cache.aadd('feed:seq', 5, None))
+                self.assertEqual(await redis_cache.aincr('feed:seq'), 1)
+                await redis_cache.aset_many({'feed:slot:1': (1, {'event': 'created'}), 'other': [2]}, 60)
+                self.assertEqual(
+                    await redis_cache.aget_many(['feed:slot:1', 'other', 'missing']),
+                    {'feed:slot:1': (1, {'event': 'created'}), 'other': [2]},
+                )
+                self.assertTrue(await redis_cache.atouch('other', 60))
+                self.assertFalse(await redis_cache.atouch('missing', 60))
+                await redis_cache.adelete('other')
+                self.assertIsNone(await redis_cache.aget('other'))
+
+                await redis_cache.aset('presence', 1, 1)
+                broker.expires[b':1:presence'] = time.monotonic() - 1
+                self.assertIsNone(await redis_cache.aget('presence'))
+
+        async_to_sync(run)()
+
+    def test_pubsub_layer_delivers_group_messages_between_workers(self):
+        """A group_send on one layer instance reaches a channel added on another."""
+        async def run():
+            async with MiniRedis() as broker:
+                sender = RedisPubSubChannelLayer(hosts=[broker.url])
+                receiver = RedisPubSubChannelLayer(hosts=[broker.url])
+                try:
+                    channel = await receiver.new_channel()
+                    await receiver.group_add('chat_1', channel)
+                    # SUBSCRIBE is acknowledged asynchronously.
+                    for _ in range(50):
+                        if broker.subscribers:
+                            break
+                        await asyncio.sleep(0.01)
+                    await sender.group_send('chat_1', {'type': 'chat_message', 'message': {'body': 'Hi'}})
+                    message = await asyncio.wait_for(receiver.receive(channel), 2)
+                    self.assertEqual(message, {'type': 'chat_message', 'message': {'body': 'Hi'}})
+                finally:
+                    await sender.flush()
+                    await receiver.flush()
+
+        async_to_sync(run)()
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class JobFeedConsumerTest(TransactionTestCase):
+    def setUp(self):
+        """Set up a pro serving 75201 and a customer posting jobs through the API."""
+        cache.clear()
+        self.customer = User.objects.create_user(username='feed_cust', password='p', email='fc@test.com')
+        self.pro = User.objects.create_user(username='feed_pro', password='p', email='fp@test.com', is_pro=True)
+        ServiceArea.objects.create(pro=self.pro, zip_code='75201')
+        self.pro_token = Token.objects.create(user=self.pro)
+        self.customer_token = Token.objects.create(user=self.customer)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.customer)
+
+    def feed(self, token=None, query=''):
+        application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+        return WebsocketCommunicator(application, f'/ws/jobs/?token={(token or self.pro_token).key}{query}')
+
+    def post_job(self, zip_code='75201', state='TX'):
+        response = self.client.post(reverse('job-create'), {
+            'title': f'Job in {zip_code}', 'description': '...', 'street_address': '1 Main St',
+            'city': 'Dallas', 'state': state, 'zip_code': zip_code,
+        }, format='json')
+        return response.data['id']
+
+    def accept_bid(self, job_id):
+        bid = Bid.objects.create(job_id=job_id, pro=self.pro, amount=100)
+        self.client.post(reverse('accept-bid', kwargs={'bid_id': bid.id}))
+
+    def test_live_events_for_served_zip(self):
+        """Pros get created/closed events for their zips and states, once each."""
+        async def run():
+            communicator = self.feed(query='&states=TX')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'job_feed', 'seq': 0, 'resync': True})
+
+            job_id = await database_sync_to_async(self.post_job)()
+            created = await communicator.receive_json_from()
+            self.assertEqual((created['seq'], created['event'], created['job']['id']), (1, 'created', job_id))
+            self.assertEqual(created['job']['title'], 'Job in 75201')
+            await database_sync_to_async(self.post_job)(zip_code='90210', state='CA')
+            self.assertTrue(await communicator.receive_nothing())
+
+            await database_sync_to_async(self.accept_bid)(job_id)
+            closed = await communicator.receive_json_from()
+            self.assertEqual(closed, {
+                'type': 'job_event', 'seq': 3, 'event': 'closed',
+                'job': {'id': job_id, 'zip_code': '75201', 'state': 'TX'},
+            })
+            await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_reconnect_resumes_from_sequence(self):
+        """Events missed while offline are replayed, filtered to the pro's subscriptions."""
+        first = self.post_job()
+        self.post_job(zip_code='90210', state='CA')
+        third = self.post_job()
+
+        async def resume(query):
+            communicator = self.feed(query=query)
+            await communicator.connect()
+            frames = [await communicator.receive_json_from()]
+            while frames[-1]['type'] != 'job_feed':
+                frames.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(resume)('&since=0')
+        self.assertEqual([(f['seq'], f['job']['id']) for f in frames[:-1]], [(1, first), (3, third)])
+        self.assertEqual(frames[-1], {'type': 'job_feed', 'seq': 3, 'resync': False})
+        self.assertEqual(len(async_to_sync(resume)('&since=0&states=CA')), 4)
+        self.assertEqual(async_to_sync(resume)('&since=3'), [{'type': 'job_feed', 'seq': 3, 'resync': False}])
+
+        with override_settings(JOB_FEED_REPLAY_SIZE=2):
+            self.assertEqual(async_to_sync(resume)('&since=0'), [{'type': 'job_feed', 'seq': 3, 'resync': True}])
+
+    def test_customers_are_rejected(self):
+        async def run():
+            connected, _ = await self.feed(token=self.customer_token).connect()
+            self.assertFalse(connected)
+
+        async_to_sync(run)()
+
+    def test_overwritten_slots_force_resync(self):
+        buffer = ReplayBuffer('test_feed', 'TEST_FEED_SIZE', 4)
+        for i in range(6):
+            buffer.append({'n': i})
+        self.assertEqual(buffer.since(3), ([(4, {'n': 3}), (5, {'n': 4}), (6, {'n': 5})], 6))
+        self.assertEqual(buffer.since(1), (None, 6))
+        # A client ahead of the counter (e.g. after a cache flush) resyncs too.
+        self.assertEqual(buffer.since(7), (None, 6))
+
+    @override_settings(TEST_FEED_SIZE=100)
+    def test_lost_slots_force_resync_except_in_flight(self):
+        """Gaps the cache left behind force a resync; only the head may still be in flight."""
+        buffer = ReplayBuffer('test_feed', 'TEST_FEED_SIZE', 100)
+        for i in range(40):
+            buffer.append({'n': i})
+        cache.delete(buffer.slot_key(40))
+        events, latest = buffer.since(30)
+        self.assertEqual([seq for seq, _ in events], list(range(31, 40)))
+        self.assertEqual(latest, 40)
+        cache.delete(buffer.slot_key(10))
+        self.assertEqual(buffer.since(5), (None, 40))
+        self.assertIsNotNone(buffer.since(10)[0])
+        # Evicted inside the window but before stored events: lost, not in flight.
+        cache.delete(buffer.slot_key(35))
+        self.assertEqual(buffer.since(30), (None, 40))
+        self.assertIsNotNone(buffer.since(35)[0])
+
+    def test_expired_slots_force_resync(self):
+        """Once no append is in progress, even a gap at the head means events expired."""
+        buffer = ReplayBuffer('test_feed', 'TEST_FEED_SIZE', 100, default_ttl=60)
+        for i in range(3):
+            buffer.append({'n': i})
+        cache.delete_many([buffer.slot_key(seq) for seq in range(1, 4)])
+        self.assertEqual(buffer.since(0), ([], 3))
+        # What IN_FLIGHT_SECONDS after the last append looks like.
+        cache.delete(buffer.appending_key)
+        self.assertEqual(buffer.since(0), (None, 3))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class BidNotificationConsumerTest(TransactionTestCase):
+    def setUp(self):
+        """Set up a customer's job, another customer and a pro client."""
+        cache.clear()
+        self.customer = User.objects.create_user(username='bn_cust', password='p', email='bc@test.com')
+        self.other = User.objects.create_user(username='bn_other', password='p', email='bo@test.com')
+        self.pro = User.objects.create_user(username='bn_pro', password='p', email='bp@test.com', is_pro=True)
+        self.customer_token = Token.objects.create(user=self.customer)
+        self.other_token = Token.objects.create(user=self.other)
+        self.job = Job.objects.create(customer=self.customer, title='Leaky faucet', description='...')
+        self.pro_client = APIClient()
+        self.pro_client.force_authenticate(user=self.pro)
+        self.customer_client = APIClient()
+        self.customer_client.force_authenticate(user=self.customer)
+
+    def notifications(self, token, query=''):
+        application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+        return WebsocketCommunicator(application, f'/ws/bids/?token={token.key}{query}')
+
+    def place_bid(self, amount='120.00'):
+        response = self.pro_client.post(
+            reverse('bid-create', kwargs={'job_id': self.job.id}), {'amount': amount, 'details': 'New cartridge'}, format='json'
+        )
+        return response.data['id']
+
+    def test_live_new_bid_and_acceptance(self):
+        """The job owner gets the bid as a delta; other customers get nothing."""
+        async def run():
+            owner = self.notifications(self.customer_token)
+            other = self.notifications(self.other_token)
+            for communicator in (owner, other):
+                connected, _ = await communicator.connect()
+                self.assertTrue(connected)
+                self.assertEqual(await communicator.receive_json_from(), {'type': 'bid_feed', 'seq': 0, 'resync': True})
+
+            bid_id = await database_sync_to_async(self.place_bid)()
+            event = await owner.receive_json_from()
+            self.assertEqual((event['type'], event['seq'], event['event'], event['job_id']), ('bid_event', 1, 'new_bid', self.job.id))
+            self.assertEqual(
+                {key: event['bid'][key] for key in ('id', 'pro', 'amount', 'details')},
+                {'id': bid_id, 'pro': self.pro.id, 'amount': '120.00', 'details': 'New cartridge'},
+            )
+
+            await database_sync_to_async(self.customer_client.post)(reverse('accept-bid', kwargs={'bid_id': bid_id}))
+            self.assertEqual(await owner.receive_json_from(), {
+                'type': 'bid_event', 'seq': 2, 'event': 'bid_accepted',
+                'job_id': self.job.id, 'bid_id': bid_id, 'pro': self.pro.id,
+            })
+            self.assertTrue(await other.receive_nothing())
+            for communicator in (owner, other):
+                await communicator.disconnect()
+
+        async_to_sync(run)()
+
+    def test_offline_customer_gets_bounded_replay(self):
+        bid_ids = [self.place_bid(amount) for amount in ('100.00', '110.00', '90.00')]
+
+        async def resume(query):
+            communicator = self.notifications(self.customer_token, query)
+            await communicator.connect()
+            frames = [await communicator.receive_json_from()]
+            while frames[-1]['type'] != 'bid_feed':
+                frames.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(resume)('&since=1')
+        self.assertEqual([f['bid']['id'] for f in frames[:-1]], bid_ids[1:])
+        self.assertEqual(frames[-1], {'type': 'bid_feed', 'seq': 3, 'resync': False})
+        with override_settings(BID_NOTIFICATION_REPLAY_SIZE=2):
+            self.assertEqual(async_to_sync(resume)('&since=0'), [{'type': 'bid_feed', 'seq': 3, 'resync': True}])
+
+
+class EndlessStreamAssistant:
+    """Fake streaming model that never finishes and records being closed."""
+    closed = None
+
+    async def stream(self, history, message):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield 'tick '
+        finally:
+            EndlessStreamAssistant.closed.set()
+
+
+class LoopCheckingAssistant(StubAssistant):
+    """Stub that records whether it was built on a running event loop."""
+    built_on_loop = None
+
+    def __init__(self):
+        super().__init__()
+        try:
+            asyncio.get_running_loop()
+            LoopCheckingAssistant.built_on_loop = True
+        except RuntimeError:
+            LoopCheckingAssistant.built_on_loop = False
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@override_settings(ASSISTANT_BACKEND='api.assistant.StubAssistant')
+class ChatAPITest(APITestCase):
+    def setUp(self):
+        response_cache.clear()
+        load_assistant.cache_clear()
+        self.addCleanup(load_assistant.cache_clear)
+        self.url = reverse('chat')
+
+    def test_reply(self):
+        """The assistant's reply is returned as JSON."""
+        response = self.client.post(self.url, {'message': 'My dryer is loud', 'history': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'reply': StubAssistant.reply_text, 'summary': '', 'summarized_turns': 0})
+
+    @override_settings(ASSISTANT_BACKEND='api.tests.LoopCheckingAssistant')
+    def test_assistant_is_built_off_the_event_loop(self):
+        """Building the assistant (and loading its SDK) does not stall the event loop."""
+        response = self.client.post(self.url, {'message': 'My dryer is loud'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIs(LoopCheckingAssistant.built_on_loop, False)
+
+    def test_bad_requests(self):
+        """A message is required and the body must be JSON."""
+        response = self.client.post(self.url, {'history': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_backend_errors_are_reported(self):
+        with patch.object(StubAssistant, 'reply', AsyncMock(side_effect=RuntimeError('quota'))):
+            response = self.client.post(self.url, {'message': 'Hi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @override_settings(ASSISTANT_BACKEND='api.assistant.VertexAssistant')
+    @patch('vertexai.generative_models.GenerativeModel')
+    def test_vertex_model_is_shared(self, model_class):
+        """One model with the system instruction serves every request; messages are sent as typed."""
+        chat = model_class.return_value.start_chat.return_value
+        chat.send_message_async = AsyncMock(return_value=MagicMock(text='Check the drain hose.'))
+        history = [{'sender': 'user', 'text': 'Dishwasher'}, {'sender': 'ai', 'text': 'What is wrong?'}]
+
+        for message in ('Not draining', 'Still not draining'):
+            response = self.client.post(self.url, {'message': message, 'history': history}, format='json')
+            self.assertEqual(response.json()['reply'], 'Check the drain hose.')
+
+        model_class.assert_called_once_with('gemini-2.5-flash', system_instruction=SYSTEM_INSTRUCTION)
+        chat.send_message_async.assert_awaited_with('Still not draining')
+        contents = model_class.return_value.start_chat.call_args.kwargs['history']
+        self.assertEqual([content.role for content in contents], ['user', 'model'])
+
+    def test_vertex_sdk_is_loaded_lazily(self):
+        """Loading the URLconf (and so the chat view) does not import the Vertex AI SDK."""
+        script = (
+            'import sys, django; django.setup(); '
+            'from django.urls import get_resolver; get_resolver().url_patterns; '
+            'print("vertexai" in sys.modules)'
+        )
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+@override_settings(ASSISTANT_BACKEND='api.assistant.StubAssistant')
+class ChatStreamingAPITest(APITestCase):
+    def setUp(self):
+        response_cache.clear()
+        load_assistant.cache_clear()
+        self.addCleanup(load_assistant.cache_clear)
+        self.url = reverse('chat')
+
+    async def stream_events(self):
+        response = await self.async_client.post(
+            self.url, {'message': 'Fridge is warm'}, content_type='application/json',
+            headers={'Accept': 'text/event-stream'},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        return parse_sse(body.decode())
+
+    async def test_streams_chunks_then_done(self):
+        """Each chunk is relayed as it arrives and the full reply closes the stream."""
+        events = await self.stream_events()
+        chunks = [data['text'] for event, data in events if event == 'chunk']
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(events[-1], ('done', {'reply': StubAssistant.reply_text, 'summary': '', 'summarized_turns': 0}))
+        self.assertEqual(''.join(chunks), StubAssistant.reply_text)
+
+    async def test_stream_errors_become_events(self):
+        async def broken(self, history, message):
+            yield 'partial'
+            raise RuntimeError('quota')
+
+        with patch.object(StubAssistant, 'stream', broken):
+            events = await self.stream_events()
+        self.assertEqual([event for event, _ in events], ['chunk', 'error'])
+
+    @override_settings(ASSISTANT_BACKEND='api.tests.EndlessStreamAssistant')
+    async def test_client_disconnect_cancels_generation(self):
+        """Dropping the connection closes the model's stream."""
+        EndlessStreamAssistant.closed = asyncio.Event()
+        communicator = ApplicationCommunicator(get_asgi_application(), {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'POST', 'scheme': 'http', 'path': self.url, 'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'accept', b'text/event-stream'),
+                        (b'content-type', b'application/json')],
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b'{"message": "Hi"}'})
+        start = await communicator.receive_output(timeout=5)
+        self.assertEqual(start['status'], 200)
+        first = await communicator.receive_output(timeout=5)
+        self.assertIn(b'event: chunk', first['body'])
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        await asyncio.wait_for(EndlessStreamAssistant.closed.wait(), timeout=5)
+        await communicator.wait(timeout=5)
+
+
+@override_settings(
+    ASSISTANT_BACKEND='api.assistant.StubAssistant',
+    ASSISTANT_HISTORY_TOKEN_BUDGET=60,
+    ASSISTANT_HISTORY_MAX_TURNS=4,
+)
+class ChatHistoryBudgetTest(APITestCase):
+    def setUp(self):
+        response_cache.clear()
+        load_assistant.cache_clear()
+        self.addCleanup(load_assistant.cache_clear)
+        self.url = reverse('chat')
+        self.backend = AsyncMock(return_value='Check the door switch.')
+        patcher = patch.object(StubAssistant, 'reply', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def conversation(self, turns):
+        return [
+            {'sender': 'user' if i % 2 == 0 else 'ai', 'text': f'turn {i} ' + 'word ' * 5}
+            for i in range(turns)
+        ]
+
+    def test_window_fits_budget_and_starts_on_user_turn(self):
+        history = self.conversation(9)
+        older, recent = window_history(history)
+        self.assertEqual(older + recent, history)
+        self.assertLessEqual(len(recent), 4)
+        self.assertLessEqual(sum(turn_tokens(turn) for turn in recent), 60)
+        self.assertEqual(recent[0]['sender'], 'user')
+
+        older, recent = window_history(history, reserved_tokens=45)
+        self.assertEqual(len(recent), 1)
+
+    def test_older_turns_are_summarized(self):
+        """Only the recent window reaches the model, behind the rolling summary."""
+        history = self.conversation(10)
+        response = self.client.post(self.url, {'message': 'Still nothing', 'history': history}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['summarized_turns'], 6)
+        self.assertIn('turn 5', data['summary'])
+        self.assertNotIn('turn 6', data['summary'])
+
+        sent_history, message = self.backend.await_args.args
+        self.assertEqual(message, 'Still nothing')
+        self.assertEqual(sent_history[0]['text'], SUMMARY_PREFIX + data['summary'])
+        self.assertEqual(sent_history[2:], history[6:])
+
+        # The client sends the summary back with only the unsummarized
+        # turns; it counts against the budget and is carried forward.
+        response = self.client.post(
+            self.url, {'message': 'Ok', 'history': history[6:], 'summary': data['summary']}, format='json'
+        )
+        self.assertTrue(response.json()['summary'].startswith(data['summary']))
+        self.assertIn('turn 9', response.json()['summary'])
+
+    def test_summarizer_failure_falls_back_to_extractive(self):
+        with patch.object(StubAssistant, 'summarize', AsyncMock(side_effect=RuntimeError('quota'))):
+            response = self.client.post(self.url, {'message': 'Hi', 'history': self.conversation(10)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['summary'].startswith('User: turn 0'))
+
+    @override_settings(ASSISTANT_MAX_BODY_BYTES=1024)
+    def test_oversized_body_is_rejected(self):
+        response = self.client.post(self.url, {'message': 'x' * 2000}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.backend.assert_not_awaited()
+
+    def test_malformed_history_is_dropped(self):
+        history = ['text', {'sender': 'user'}, {'sender': 'user', 'text': 5}, None, {'sender': 'user', 'text': 'Dryer'}]
+        response = self.client.post(self.url, {'message': 'Hi', 'history': history}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.backend.await_args.args[0], [{'sender': 'user', 'text': 'Dryer'}])
+
+
+@override_settings(ASSISTANT_BACKEND='api.assistant.StubAssistant')
+class ChatResponseCacheTest(APITestCase):
+    def setUp(self):
+        response_cache.clear()
+        load_assistant.cache_clear()
+        self.addCleanup(load_assistant.cache_clear)
+        self.url = reverse('chat')
+        self.backend = AsyncMock(return_value='Check the drain filter.')
+        patcher = patch.object(StubAssistant, 'reply', self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, message, history=None, **headers):
+        return self.client.post(self.url, {'message': message, 'history': history or []}, format='json', headers=headers)
+
+    def test_first_turn_exact_hit(self):
+        """Rephrasings that normalize to the same text reuse the reply."""
+        self.assertEqual(self.ask('Dishwasher not draining')['X-ARA-Cache'], 'miss')
+        response = self.ask('  my dishwasher is NOT draining!! ')
+        self.assertEqual(response['X-ARA-Cache'], 'exact')
+        self.assertEqual(response.json()['reply'], 'Check the drain filter.')
+        self.assertEqual(self.backend.await_count, 1)
+
+    def test_follow_up_turns_are_not_cached(self):
+        history = [{'sender': 'user', 'text': 'Hi'}, {'sender': 'ai', 'text': 'Hello!'}]
+        self.ask('Dishwasher not draining', history)
+        response = self.ask('Dishwasher not draining', history)
+        self.assertNotIn('X-ARA-Cache', response)
+        self.assertEqual(self.backend.await_count, 2)
+
+    def test_bypass_header(self):
+        """Cache-Control: no-cache skips the lookup and refreshes the entry."""
+        self.ask('Dryer squeaks')
+        self.assertEqual(self.ask('Dryer squeaks', **{'Cache-Control': 'no-cache'})['X-ARA-Cache'], 'bypass')
+        self.assertEqual(self.backend.await_count, 2)
+
+    @override_settings(ASSISTANT_CACHE_SEMANTIC=True, ASSISTANT_CACHE_SIMILARITY=0.86)
+    def test_semantic_hit_and_near_miss(self):
+        """Typos hit; a different appliance or symptom does not."""
+        self.ask('dishwasher not draining')
+        self.assertEqual(self.ask('dishwaser not draining')['X-ARA-Cache'], 'semantic')
+        self.assertEqual(self.ask('washer not draining')['X-ARA-Cache'], 'miss')
+        self.assertEqual(self.ask('dishwasher not drying')['X-ARA-Cache'], 'miss')
+
+    async def test_streaming_hit(self):
+        await self.async_client.post(self.url, {'message': 'Oven will not heat'}, content_type='application/json')
+        response = await self.async_client.post(
+            self.url, {'message': 'oven will not heat'}, content_type='application/json',
+            headers={'Accept': 'text/event-stream'},
+        )
+        self.assertEqual(response['X-ARA-Cache'], 'exact')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(parse_sse(body)[-1][1]['reply'], 'Check the drain filter.')
+
+    def test_stats_endpoint(self):
+        """Admins can read the hit rate."""
+        self.ask('Fridge is warm')
+        self.ask('fridge is warm')
+        admin = User.objects.create_superuser(username='admin', password='p', email='admin@test.com')
+        self.client.force_authenticate(user=admin)
+        stats = self.client.get(reverse('chat-cache-stats')).data
+        self.assertEqual((stats['exact_hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    @override_settings(ASSISTANT_CACHE_SIZE=2, ASSISTANT_CACHE_TTL=10)
+    def test_lru_and_ttl(self):
+        now = [0]
+        cache_ = ResponseCache(clock=lambda: now[0])
+        for message in ('one', 'two'):
+            cache_.set(message, message.upper())
+        cache_.get('one')
+        cache_.set('three', 'THREE')
+        self.assertEqual(cache_.get('two'), (None, 'miss'))
+        self.assertEqual(cache_.get('one'), ('ONE', 'exact'))
+        now[0] = 10
+        self.assertEqual(cache_.get('three'), (None, 'miss'))
+        self.assertEqual(cache_.get_stats()['evictions'], 1)
+        self.assertEqual(normalize_message("Hi, my oven isn't heating."), "oven isn't heating")
+
+
+class FakeGoogleCertsHandler(BaseHTTPRequestHandler):
+    """
+    Serves `certs` as Google's certificate endpoint does, counting fetches.
+    """
+    certs = {}
+    cache_control = 'public, max-age=300'
+    fetches = 0
+
+    def do_GET(self):
+        type(self).fetches += 1
+        body = json.dumps(self.certs).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', self.cache_control)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GoogleIdTokenVerificationTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'fake-google')])
+        now = datetime.now(timezone.utc)
+        cert = (
+            x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        cls.signer = google_crypt.RSASigner.from_string(
+            key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            ),
+            key_id='fake-kid',
+        )
+        FakeGoogleCertsHandler.certs = {'fake-kid': cert.public_bytes(serialization.Encoding.PEM).decode()}
+        cls.server = HTTPServer(('127.0.0.1', 0), FakeGoogleCertsHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.certs_url = f'http://127.0.0.1:{cls.server.server_port}/oauth2/v1/certs'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FakeGoogleCertsHandler.fetches = 0
+        FakeGoogleCertsHandler.cache_control = 'public, max-age=300'
+        self.now = 0
+        self.transport = CachedCertsRequest(clock=lambda: self.now)
+        for target, value in (
+            ('api.views.google_request', self.transport),
+            ('google.oauth2.id_token._GOOGLE_OAUTH2_CERTS_URL', self.certs_url),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.url = reverse('google-login')
+
+    def login(self, email='g@gmail.com', signer=None):
+        issued = int(time.time())
+        id_token = google_jwt.encode(signer or self.signer, {
+            'iss': 'https://accounts.google.com', 'aud': os.environ.get('GOOGLE_OAUTH_CLIENT_ID'),
+            'sub': email, 'email': email, 'iat': issued, 'exp': issued + 3600,
+        })
+        return self.client.post(self.url, {'id_token': id_token.decode()}, format='json')
+
+    def test_certs_are_fetched_once_per_max_age(self):
+        for email in ('a@gmail.com', 'b@gmail.com', 'a@gmail.com'):
+            response = self.login(email)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['user']['email'], email)
+        self.assertEqual(FakeGoogleCertsHandler.fetches, 1)
+
+        self.now = 300
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertEqual(FakeGoogleCertsHandler.fetches, 2)
+
+    def test_uncacheable_certs_are_refetched(self):
+        FakeGoogleCertsHandler.cache_control = 'no-store'
+        self.login()
+        self.login()
+        self.assertEqual(FakeGoogleCertsHandler.fetches, 2)
+
+    def test_wrong_signature_is_rejected(self):
+        other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        signer = google_crypt.RSASigner.from_string(
+            other.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            ),
+            key_id='fake-kid',
+        )
+        response = self.login(signer=signer)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.filter(email='g@gmail.com').exists())
+
+    def test_cert_fetch_keeps_a_timeout(self):
+        """google-auth fetches certs without a timeout; the transport default still applies."""
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200, headers={}, content=b'{}')
+        CachedCertsRequest(session=session)(self.certs_url)
+        self.assertEqual(session.request.call_args.kwargs['timeout'], 120)
+
+    def test_cache_lifetime(self):
+        self.assertEqual(cache_lifetime({'Cache-Control': 'public, max-age=20000', 'Age': '500'}), 19500)
+        self.assertEqual(cache_lifetime({'Cache-Control': 'no-cache, max-age=60'}), 0)
+        self.assertEqual(cache_lifetime({}), 0)
+
+
 class GoogleLoginAPITest(APITestCase):
     def setUp(self):
         """Set up URL for Google login endpoint."""
@@ -1,11 +1,11 @@
 from django.urls import path
 from .views import (
-    JobCreateView, JobListView, 
+    JobCreateView, JobListView, NearbyJobListView,
     BidCreateView, JobDetailView, 
     AcceptBidView, MyJobsListView, GoogleLoginView, 
-    MessageCreateView, MessageListView, MyAcceptedJobsListView,
-    ChatView, MyProProfileView, PublicProProfileView,
-    ReviewCreateView
+    MessageCreateView, MessageListView, UnreadMessageCountView, MyAcceptedJobsListView,
+    ChatView, ChatCacheStatsView, MyProProfileView, PublicProProfileView,
+    ProReviewListView, ReviewCreateView
     )
 from dj_rest_auth.registration.views import RegisterView
 from dj_rest_auth.views import LoginView
@@ -19,18 +19,22 @@ urlpatterns = [
     
     path('jobs/', JobListView.as_view(), name='job-list'),
     path('jobs/create/', JobCreateView.as_view(), name='job-create'),
+    path('jobs/nearby/', NearbyJobListView.as_view(), name='job-nearby'),
     path('jobs/<int:pk>/', JobDetailView.as_view(), name='job-detail'),
     path('jobs/<int:job_id>/reviews/', ReviewCreateView.as_view(), name='review-create'),
     path('jobs/<int:job_id>/bid/', BidCreateView.as_view(), name='bid-create'),
     path('bids/<int:bid_id>/accept/', AcceptBidView.as_view(), name='accept-bid'),
     path('jobs/<int:job_id>/messages/', MessageListView.as_view(), name='message-list'),
     path('jobs/<int:job_id>/messages/create/', MessageCreateView.as_view(), name='message-create'),
+    path('messages/unread/', UnreadMessageCountView.as_view(), name='unread-count'),
     path('my-jobs/', MyJobsListView.as_view(), name='my-jobs-list'),
     path('my-work/', MyAcceptedJobsListView.as_view(), name='my-work-list'),
 
     path('chat/', ChatView.as_view(), name='chat'),
+    path('chat/cache-stats/', ChatCacheStatsView.as_view(), name='chat-cache-stats'),
 
     path('profile/pro/', MyProProfileView.as_view(), name='my-pro-profile'),    
     path('profiles/pro/<int:user_id>/', PublicProProfileView.as_view(), name='public-pro-profile'),
+    path('profiles/pro/<int:user_id>/reviews/', ProReviewListView.as_view(), name='pro-review-list'),
     
 ]
\ No newline at end of file
@@ -1,21 +1,40 @@
+import json
 import os
-from .models import User, ProProfile, Job, Bid, Message, Review
+from contextlib import aclosing
+from .models import User, ProProfile, Job, Bid, Message, ReadReceipt, Review, ServiceArea
 from .serializers import ProProfileSerializer, JobSerializer, BidSerializer, MessageSerializer, ReviewSerializer
 from .permissions import IsProfessionalUser
+from .mixins import ConditionalGetMixin, QueryPlanMixin
+from .pagination import KeysetCursorPagination, MessageCursorPagination
+from .search import FullTextSearchFilter
+from .geo import ProximityFilter, ProximityOrderingFilter
+from .google_auth import google_request
+from .feeds import publish_bid_event, publish_job_event
+from .cache import PRO_PROFILE_CACHE_TIMEOUT, compute_etag, conditional_response, profile_cache_key
+from .assistant import get_assistant, roll_summary
+from .assistant_cache import is_cacheable, response_cache, wants_bypass
+from .conversation import (
+    DEFAULT_MAX_BODY_BYTES, DEFAULT_SUMMARY_MAX_CHARS, DEFAULT_TURN_MAX_CHARS, clean_history, estimate_tokens, window_history, with_summary,
+)
 
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part, Content
 from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as google_requests
 
 from rest_framework import status, generics, serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from dotenv import load_dotenv
@@ -23,14 +42,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-try:
-    PROJECT_ID = os.environ.get('PROJECT_ID')
-    LOCATION = os.environ.get('LOCATION')
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-except Exception as e:
-    print(f'Error initializing Vertex AI: {e}')
-    
-
 class MyProProfileView(generics.RetrieveUpdateAPIView):
     """
     Allows a professional user to retrieve and update their own profile.
@@ -56,12 +67,36 @@ class PublicProProfileView(generics.RetrieveAPIView):
     """
     Allows anyone to view a specific professional's profile.
     get: Retrieve profile by user ID.
+    Responses are cached per profile version (bumped by signals on profile,
+    user and review saves) and answer If-None-Match with 304.
     """
     serializer_class = ProProfileSerializer
     permission_classes = [AllowAny]
-    queryset = ProProfile.objects.all()
+    queryset = ProProfile.objects.select_related('user')
     lookup_field = 'user_id'
 
+    def retrieve(self, request, *args, **kwargs):
+        key = profile_cache_key(self.kwargs['user_id'])
+        cached = cache.get(key)
+        if cached is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            cached = {'etag': compute_etag(data), 'data': data}
+            cache.set(key, cached, PRO_PROFILE_CACHE_TIMEOUT)
+        return conditional_response(request, cached['etag'], cached['data'])
+
+
+class ProReviewListView(QueryPlanMixin, generics.ListAPIView):
+    """
+    Allows anyone to page through the reviews a professional has received,
+    newest first.
+    """
+    serializer_class = ReviewSerializer
+    permission_classes = [AllowAny]
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        return Review.objects.filter(pro_id=self.kwargs['user_id'])
+
 
 class JobCreateView(generics.CreateAPIView):
     """
@@ -72,21 +107,26 @@ class JobCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(customer=self.request.user)
+        job = serializer.save(customer=self.request.user)
+        transaction.on_commit(lambda: publish_job_event('created', job), robust=True)
 
 
-class JobListView(generics.ListAPIView):
+class JobListView(ConditionalGetMixin, QueryPlanMixin, generics.ListAPIView):
     """
     A view for professionals to list all available (incomplete) jobs,
     with search, filtering, and ordering capabilities.
+    New and closed jobs are pushed live over ws/jobs/ (JobFeedConsumer).
+    `?within_miles=` limits results to jobs near the pro's service area,
+    nearest first.
     """
     serializer_class = JobSerializer
     permission_classes = [IsProfessionalUser]
+    pagination_class = KeysetCursorPagination
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, ProximityFilter, ProximityOrderingFilter]
     filterset_fields = ['zip_code', 'state']
     search_fields = ['title', 'description'] 
-    ordering_fields = ['created_at', 'city']
+    ordering_fields = ['created_at', 'city', 'search_rank', 'distance']
 
 
     def get_queryset(self):
@@ -95,10 +135,34 @@ class JobListView(generics.ListAPIView):
         """
         return Job.objects.filter(is_completed=False)
 
+    def get_etag_extra(self):
+        # Proximity results also depend on the pro's service areas.
+        if self.request.query_params.get(ProximityFilter.within_param):
+            return ','.join(sorted(self.request.user.service_areas.values_list('zip_code', flat=True)))
+        return ''
+
+
+class NearbyJobListView(QueryPlanMixin, generics.ListAPIView):
+    """
+    A view for professionals to list open jobs in the zip codes they serve.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsProfessionalUser]
+    pagination_class = KeysetCursorPagination
+
+    def get_queryset(self):
+        """
+        Open jobs whose zip code is one of the pro's service areas, as a
+        single semi-join over the ServiceArea and open-job indexes.
+        """
+        served = ServiceArea.objects.filter(pro=self.request.user).values('zip_code')
+        return Job.objects.filter(is_completed=False, zip_code__in=served)
+
 
 class BidCreateView(generics.CreateAPIView):
     """
     A view for professionals to create a bid on a specific job.
+    The job's owner is notified over ws/bids/ (BidNotificationConsumer).
     """
     serializer_class = BidSerializer
     permission_classes = [IsProfessionalUser]
@@ -109,10 +173,11 @@ class BidCreateView(generics.CreateAPIView):
         """
         job_id = self.kwargs['job_id']
         job = get_object_or_404(Job, id=job_id)
-        serializer.save(job=job, pro=self.request.user)
+        bid = serializer.save(job=job, pro=self.request.user)
+        transaction.on_commit(lambda: publish_bid_event('new_bid', bid, job.customer_id), robust=True)
 
 
-class JobDetailView(generics.RetrieveAPIView):
+class JobDetailView(ConditionalGetMixin, QueryPlanMixin, generics.RetrieveAPIView):
     """
     A view to retrieve a single job instance.
     """
@@ -140,6 +205,8 @@ class AcceptBidView(APIView):
         job.accepted_bid = bid
         job.is_completed = True
         job.save()
+        transaction.on_commit(lambda: publish_job_event('closed', job), robust=True)
+        transaction.on_commit(lambda: publish_bid_event('bid_accepted', bid, job.customer_id), robust=True)
 
         return Response(
             {"success": f"Bid {bid.id} has been accepted for job '{job.title}'."},
@@ -147,12 +214,13 @@ class AcceptBidView(APIView):
         )
 
 
-class MyJobsListView(generics.ListAPIView):
+class MyJobsListView(ConditionalGetMixin, QueryPlanMixin, generics.ListAPIView):
     """
     A view for a customer to list only the jobs they have created.
     """
     serializer_class = JobSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         """
@@ -166,7 +234,8 @@ class MyJobsListView(generics.ListAPIView):
 class GoogleLoginView(APIView):
     """
     Custom view for Google OAuth login.
-    Receives an ID token from the frontend, verifies it with Google,
+    Receives an ID token from the frontend, verifies it against Google's
+    signing certificates (cached per Cache-Control, see api/google_auth.py),
     and then creates or logs in the user, returning a DRF token.
     """
     permission_classes = [AllowAny]
@@ -181,11 +250,9 @@ class GoogleLoginView(APIView):
         try:
             idinfo = google_id_token.verify_oauth2_token(
                 token, 
-                google_requests.Request(), 
+                google_request, 
                 os.environ.get('GOOGLE_OAUTH_CLIENT_ID')
             )
-
-            print(os.environ.get('GOOGLE_OAUTH_CLIENT_ID'))
             
             email = idinfo['email']
             first_name = idinfo.get('given_name', '')
@@ -224,20 +291,21 @@ class GoogleLoginView(APIView):
             return Response({'error': 'An unexpected error occurred', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class MessageListView(generics.ListAPIView):
+class MessageListView(ConditionalGetMixin, generics.ListAPIView):
     """
     Lists messages for a specific job.
     Access is restricted to the job's customer and the accepted professional.
     """
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MessageCursorPagination
 
     def get_queryset(self):
         job_id = self.kwargs['job_id']
-        job = get_object_or_404(Job, id=job_id)
+        job = get_object_or_404(Job.objects.select_related('accepted_bid'), id=job_id)
         user = self.request.user
 
-        if job.accepted_bid and (user == job.customer or user == job.accepted_bid.pro):
+        if job.accepted_bid and user.id in (job.customer_id, job.accepted_bid.pro_id):
             return Message.objects.filter(job=job).order_by('timestamp')
 
         return Message.objects.none()
@@ -265,12 +333,39 @@ class MessageCreateView(generics.CreateAPIView):
         serializer.save(job=job, sender=user, receiver=receiver)
 
 
-class MyAcceptedJobsListView(generics.ListAPIView):
+class UnreadMessageCountView(APIView):
+    """
+    Counts the current user's unread messages, per job and in total:
+    messages to them with an id past their read receipt for that job.
+    `?job=<id>` limits the count to one conversation. One query, over the
+    (receiver, job, id) index.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        last_read = ReadReceipt.objects.filter(
+            job=OuterRef('job'), user=request.user
+        ).values('last_read_message_id')[:1]
+        messages = Message.objects.filter(receiver=request.user)
+        job_id = request.query_params.get('job')
+        if job_id is not None:
+            if not job_id.isdigit():
+                return Response({'error': 'job must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            messages = messages.filter(job_id=job_id)
+        counts = dict(
+            messages.filter(id__gt=Coalesce(Subquery(last_read), 0))
+            .order_by().values('job').annotate(unread=Count('id')).values_list('job', 'unread')
+        )
+        return Response({'total': sum(counts.values()), 'jobs': counts})
+
+
+class MyAcceptedJobsListView(QueryPlanMixin, generics.ListAPIView):
     """
     A view for a professional to list the jobs they have been hired for.
     """
     serializer_class = JobSerializer
     permission_classes = [IsProfessionalUser]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         """
@@ -281,57 +376,130 @@ class MyAcceptedJobsListView(generics.ListAPIView):
         return Job.objects.filter(accepted_bid__pro=user).order_by('-created_at')
     
 
-class ChatView(APIView):
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatView(View):
     """
-    Handles chat requests by sending prompts to the Vertex AI Gemini API.
+    Handles chat requests by sending prompts to the ARA assistant
+    (Vertex AI Gemini by default, see api/assistant.py).
+    Async so a worker is not held for the whole model round-trip.
+
+    Clients sending `Accept: text/event-stream` get the reply as
+    Server-Sent Events: `chunk` events with {"text"} as it is generated,
+    then one `done` event with the full {"reply"} (or an `error` event).
+
+    Only the most recent history that fits the token budget is sent to the
+    model (see api/conversation.py). Older turns are folded into a rolling
+    `summary`, which is returned with the reply alongside
+    `summarized_turns`, the number of leading history turns it now covers;
+    clients send the summary back and drop those turns on the next request.
+    Bodies over ASSISTANT_MAX_BODY_BYTES are rejected with 413.
+
+    First-turn replies (empty history) are served from `response_cache`
+    when possible; `X-ARA-Cache` reports exact/semantic/miss/bypass.
     """
-    permission_classes = [AllowAny]
-
-    def post(self, request, *args, **kwargs):
-        user_message = request.data.get('message')
-
-        history_raw = request.data.get('history', [])
-        if not user_message:
-            return Response({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
-
+    async def post(self, request, *args, **kwargs):
+        max_body = getattr(settings, 'ASSISTANT_MAX_BODY_BYTES', DEFAULT_MAX_BODY_BYTES)
         try:
-            model = GenerativeModel("gemini-2.5-flash")
-
-            gemini_history = []
-            for msg in history_raw:
-                role = "user" if msg.get("sender") == "user" else "model"
-                part = Part.from_text(msg.get("text", ""))
-                content = Content(parts=[part], role=role)
-                gemini_history.append(content)
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > max_body or len(request.body) > max_body:
+            return JsonResponse({'error': 'Request body too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
 
-            system_instruction = f"""
-            You are "ARA", ARA stands for Appliance Repair Assistant, a helpful AI assistant for 4kara.com, specializing in appliance repair and maintenance advice. Be friendly, empathetic, and knowledgeable.
-
-            Help the user understand their appliance issue. Provide potential causes, simple DIY steps (if safe and appropriate), or suggest the type of professional they should hire through 4kara.com. 
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_message = data.get('message')
+        if not user_message or not isinstance(user_message, str):
+            return JsonResponse({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
+        user_message = user_message[:getattr(settings, 'ASSISTANT_TURN_MAX_CHARS', DEFAULT_TURN_MAX_CHARS)]
+
+        summary = data.get('summary') if isinstance(data.get('summary'), str) else ''
+        summary = summary[:getattr(settings, 'ASSISTANT_SUMMARY_MAX_CHARS', DEFAULT_SUMMARY_MAX_CHARS)]
+        older, recent = window_history(
+            clean_history(data.get('history')),
+            reserved_tokens=estimate_tokens(summary) + estimate_tokens(user_message)
+        )
+        if older:
+            summary = await roll_summary(summary, older)
+        history = with_summary(summary, recent)
+        context = {'summary': summary, 'summarized_turns': len(older)}
+
+        cached, cache_status = None, None
+        if is_cacheable(history):
+            if wants_bypass(request):
+                response_cache.record_bypass()
+                cache_status = 'bypass'
+            else:
+                cached, cache_status = response_cache.get(user_message)
+
+        if 'text/event-stream' in request.headers.get('Accept', ''):
+            response = StreamingHttpResponse(
+                self.event_stream(history, user_message, context, cached, store=cache_status is not None),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+        elif cached is not None:
+            response = JsonResponse({'reply': cached, **context})
+        else:
+            try:
+                assistant = await get_assistant()
+                ai_response = await assistant.reply(history, user_message)
+            except Exception as e:
+                print(f"Error calling Vertex AI: {e}")
+                return JsonResponse({'error': 'Sorry, I encountered an error. Please try again.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if cache_status is not None:
+                response_cache.set(user_message, ai_response)
+            response = JsonResponse({'reply': ai_response, **context})
+
+        if cache_status is not None:
+            response['X-ARA-Cache'] = cache_status
+        return response
 
-            - DO NOT engage in conversations outside of Appliance Repair scope
-            - DO NOT provide price estimates or quotes.
-            - DO NOT recommend specific brands or companies.
-            - DO NOT give advice that requires specialized tools or licenses (e.g., major electrical work, gas line repairs). Emphasize safety.
-            - If asked for quotes or specific pros, politely explain you cannot provide that and suggest they "post a job on 4kara.com to get bids from qualified local professionals."
-            - KEEP RESPONSES LESS THAN 30 WORDS
-            """
+    async def event_stream(self, history, message, context, cached=None, store=False):
+        """
+        Relays assistant chunks as SSE. If the client disconnects, the
+        server cancels this generator and the upstream stream is closed.
+        A cached reply is sent as a single chunk.
+        """
+        if cached is not None:
+            yield sse_event('chunk', {'text': cached})
+            yield sse_event('done', {'reply': cached, **context})
+            return
+        chunks = []
+        try:
+            assistant = await get_assistant()
+            async with aclosing(assistant.stream(history, message)) as stream:
+                async for text in stream:
+                    chunks.append(text)
+                    yield sse_event('chunk', {'text': text})
+        except Exception as e:
+            print(f"Error calling Vertex AI: {e}")
+            yield sse_event('error', {'error': 'Sorry, I encountered an error. Please try again.'})
+            return
+        reply = ''.join(chunks)
+        if store:
+            response_cache.set(message, reply)
+        yield sse_event('done', {'reply': reply, **context})
 
-            chat = model.start_chat(history=gemini_history)
 
-            effective_message = user_message
-            if not gemini_history:
-                 effective_message = "\n\nUser message: \"" + user_message + "\"\nAssistant response: \n" + system_instruction
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-            response = chat.send_message(effective_message)
 
-            ai_response = response.text
-            return Response({'reply': ai_response})
+class ChatCacheStatsView(APIView):
+    """
+    Reports this process's assistant reply cache hit rate and counters.
+    """
+    permission_classes = [IsAdminUser]
 
-        except Exception as e:
-            print(f"Error calling Vertex AI: {e}")
-            return Response({'error': 'Sorry, I encountered an error. Please try again.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+    def get(self, request, *args, **kwargs):
+        return Response(response_cache.get_stats())
 
 
 class ReviewCreateView(generics.CreateAPIView):
@@ -354,4 +522,7 @@ class ReviewCreateView(generics.CreateAPIView):
         pro = job.accepted_bid.pro
         if Review.objects.filter(job=job, customer=customer, pro=pro).exists():
             raise serializers.ValidationError("You have already submitted a review for this job.")
-        serializer.save(job=job, customer=customer, pro=pro)
\ No newline at end of file
+        with transaction.atomic():
+            review = serializer.save(job=job, customer=customer, pro=pro)
+            ProProfile.objects.get_or_create(user=pro)
+            ProProfile.objects.filter(user=pro).record_rating(review.rating)
\ No newline at end of file
@@ -0,0 +1,146 @@
+import asyncio
+import atexit
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+
+from .models import Message
+from .receipts import PERMANENT_ERRORS
+
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+_queues = {}
+
+
+def write_behind_enabled():
+    return getattr(settings, 'CHAT_WRITE_BEHIND', False)
+
+
+class MessageWriteQueue:
+    """
+    Buffers chat messages for one event loop and persists them with
+    bulk_create once `batch_size` are pending or `flush_interval` seconds
+    after the first one was queued, whichever comes first.
+
+    Flushes are serialized, so rows are inserted (and get ids) in the
+    order they were queued. Each message carries the timestamp taken when
+    it was received, which keeps history ordered by send time even when
+    participants are connected to different workers. Rows that can never
+    be stored (a job deleted meanwhile, text the database rejects) are
+    logged and dropped; a flush that fails for a transient reason (e.g.
+    the database is unreachable) puts its rows back at the front of the
+    queue for the next attempt.
+    """
+    def __init__(self, batch_size=None, flush_interval=None):
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self.pending = []
+        self.lock = asyncio.Lock()
+        self.timer = None
+        self.flushing = set()
+
+    @property
+    def batch_size(self):
+        return self._batch_size or getattr(settings, 'CHAT_WRITE_BEHIND_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, 'CHAT_WRITE_BEHIND_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    def put(self, message, on_saved=None):
+        """
+        Queues an unsaved Message. `on_saved(message)` is awaited after the
+        batch containing it has been written and the message has its id.
+        Never blocks, so callers can queue before they broadcast and the
+        queue order matches the order clients saw.
+        """
+        self.pending.append((message, on_saved))
+        if len(self.pending) >= self.batch_size:
+            self.flushing.add(asyncio.ensure_future(self.flush()))
+            self.flushing = {task for task in self.flushing if not task.done()}
+        elif self.timer is None:
+            self.timer = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.timer = None
+        await self.flush()
+
+    async def flush(self):
+        """
+        Writes everything queued so far, after any flush already in
+        progress. Safe to call at any time.
+        """
+        async with self.lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                await database_sync_to_async(write_batch)(batch)
+            except (OperationalError, InterfaceError) as e:
+                print(f"Error flushing chat messages, will retry: {e}")
+                self.pending[:0] = batch
+                if self.timer is None:
+                    self.timer = asyncio.ensure_future(self.flush_later())
+                return
+            except Exception as e:
+                print(f"Error flushing chat messages, dropping {len(batch)}: {e}")
+        for message, on_saved in batch:
+            if on_saved is not None and message.pk is not None:
+                await on_saved(message)
+
+    def flush_sync(self):
+        """
+        Writes anything still queued from synchronous code, for shutdown
+        when the event loop is no longer running.
+        """
+        batch, self.pending = self.pending, []
+        if batch:
+            write_batch(batch)
+
+
+def write_batch(batch):
+    messages = [message for message, _ in batch]
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+    except PERMANENT_ERRORS:
+        # One bad row (e.g. its job was deleted meanwhile, or a body the
+        # database cannot encode) must not hold back the rest, so store
+        # them one at a time.
+        for message in messages:
+            try:
+                with transaction.atomic():
+                    message.save()
+            except PERMANENT_ERRORS as e:
+                print(f"Dropping chat message for job {message.job_id}: {e}")
+
+
+def get_write_queue():
+    """
+    Returns the queue for the running event loop, creating it on first use.
+    Queues of closed loops are kept until they are empty so that
+    `flush_all_queues` can still write their rows.
+    """
+    loop = asyncio.get_running_loop()
+    for other in [other for other, queue in _queues.items() if other.is_closed() and not queue.pending]:
+        del _queues[other]
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = MessageWriteQueue()
+    return queue
+
+
+@atexit.register
+def flush_all_queues():
+    """
+    Persists messages still buffered when the process exits.
+    """
+    for queue in list(_queues.values()):
+        try:
+            queue.flush_sync()
+        except Exception as e:
+            print(f"Error flushing chat messages at shutdown: {e}")
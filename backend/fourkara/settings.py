@@ -1,4 +1,5 @@
 import os
+import sys
 import dj_database_url
 from pathlib import Path
 from dotenv import load_dotenv
@@ -8,6 +9,7 @@ load_dotenv(os.path.join(BASE_DIR, '.env'))
 
 SECRET_KEY = os.environ.get('SECRET_KEY')
 DEBUG = os.environ.get('DEBUG') == 'True'
+TESTING = sys.argv[1:2] == ['test']
 
 ALLOWED_HOSTS = []
 DEV_HOST = os.environ.get('DEV_ALLOWED_HOST')
@@ -121,15 +123,58 @@ WSGI_APPLICATION = 'fourkara.wsgi.application'
 ASGI_APPLICATION = 'fourkara.asgi.application'
 
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+# channels_redis.pubsub.RedisPubSubChannelLayer fans a group message out
+# with one PUBLISH; see `manage.py benchmark_scaling` to compare.
+CHANNEL_LAYER_BACKEND = os.environ.get('CHANNEL_LAYER_BACKEND', 'channels_redis.core.RedisChannelLayer')
 
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'BACKEND': CHANNEL_LAYER_BACKEND,
         'CONFIG': {
             "hosts": [REDIS_URL],
         },
     },
 }
+# Broadcast chat messages before they are stored and persist them in
+# batches (see api/writebehind.py).
+CHAT_WRITE_BEHIND = os.environ.get('CHAT_WRITE_BEHIND') == 'True'
+CHAT_WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('CHAT_WRITE_BEHIND_BATCH_SIZE', 50))
+CHAT_WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('CHAT_WRITE_BEHIND_FLUSH_INTERVAL', 0.05))
+# Chat presence expires unless heartbeated (see api/presence.py); read
+# receipts are written in coalesced batches (see api/receipts.py).
+CHAT_PRESENCE_TTL = int(os.environ.get('CHAT_PRESENCE_TTL', 60))
+READ_RECEIPT_FLUSH_INTERVAL = float(os.environ.get('READ_RECEIPT_FLUSH_INTERVAL', 2.0))
+# Messages per history frame sent to chat sockets.
+CHAT_HISTORY_CHUNK_SIZE = int(os.environ.get('CHAT_HISTORY_CHUNK_SIZE', 10))
+# Job feed events kept in the cache for reconnecting clients to replay
+# (see api/feeds.py).
+JOB_FEED_REPLAY_SIZE = int(os.environ.get('JOB_FEED_REPLAY_SIZE', 1000))
+# Bid notifications kept per customer for offline users.
+BID_NOTIFICATION_REPLAY_SIZE = int(os.environ.get('BID_NOTIFICATION_REPLAY_SIZE', 50))
+BID_NOTIFICATION_REPLAY_TTL = int(os.environ.get('BID_NOTIFICATION_REPLAY_TTL', 60 * 60 * 24 * 7))
+# Presence, the feeds' replay rings and profile cache versions must be
+# shared by every worker, so the cache defaults to the Redis the channel
+# layer already uses. A per-process LocMemCache is only used for local
+# development (DEBUG) and the test runner.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', REDIS_URL)
+
+if os.environ.get('CACHE_REDIS_URL') or not (DEBUG or TESTING):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        },
+    }
+else:
+    # Large enough for the job feed's replay ring (see api/feeds.py); the
+    # default of 300 entries would evict events clients still need.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
 DATABASES = {
     'default': dj_database_url.config(
         conn_max_age=600
@@ -171,9 +216,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ARA assistant backend (see api/assistant.py). api.assistant.StubAssistant
+# answers offline after ASSISTANT_STUB_LATENCY seconds.
+ASSISTANT_BACKEND = os.environ.get('ASSISTANT_BACKEND', 'api.assistant.VertexAssistant')
+ASSISTANT_MODEL = os.environ.get('ASSISTANT_MODEL', 'gemini-2.5-flash')
+ASSISTANT_STUB_LATENCY = float(os.environ.get('ASSISTANT_STUB_LATENCY', 0))
+# First-turn reply cache (see api/assistant_cache.py).
+ASSISTANT_CACHE_TTL = int(os.environ.get('ASSISTANT_CACHE_TTL', 3600))
+ASSISTANT_CACHE_SIZE = int(os.environ.get('ASSISTANT_CACHE_SIZE', 1000))
+ASSISTANT_CACHE_SEMANTIC = os.environ.get('ASSISTANT_CACHE_SEMANTIC') == 'True'
+ASSISTANT_CACHE_SIMILARITY = float(os.environ.get('ASSISTANT_CACHE_SIMILARITY', 0.9))
+# Chat history sent to the model (see api/conversation.py): older turns
+# are folded into a rolling summary. Token counts are estimates.
+ASSISTANT_HISTORY_TOKEN_BUDGET = int(os.environ.get('ASSISTANT_HISTORY_TOKEN_BUDGET', 2000))
+ASSISTANT_HISTORY_MAX_TURNS = int(os.environ.get('ASSISTANT_HISTORY_MAX_TURNS', 20))
+ASSISTANT_TURN_MAX_CHARS = int(os.environ.get('ASSISTANT_TURN_MAX_CHARS', 2000))
+ASSISTANT_SUMMARY_MAX_CHARS = int(os.environ.get('ASSISTANT_SUMMARY_MAX_CHARS', 1200))
+ASSISTANT_MAX_BODY_BYTES = int(os.environ.get('ASSISTANT_MAX_BODY_BYTES', 64 * 1024))
+
+# Per-process token -> user cache shared by DRF and the WebSocket
+# middleware (see api/authentication.py).
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
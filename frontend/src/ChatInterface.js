@@ -1,14 +1,17 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Box, TextField, IconButton, Paper, List, ListItem, ListItemText, CircularProgress, Alert, Typography } from '@mui/material';
 import ReactMarkdown from 'react-markdown';
 import SendIcon from '@mui/icons-material/Send';
-import api from './api';
 
 function ChatInterface() {
     const [message, setMessage] = useState('');
     const [conversation, setConversation] = useState([]);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
+    const abortRef = useRef(null);
+    // Rolling summary from the server and how many leading turns it covers;
+    // those turns are no longer sent with each request.
+    const contextRef = useRef({ summary: '', summarizedTurns: 0 });
 
     const handleKeyDown = (event) => {
         if (event.key === 'Enter' && !event.shiftKey) {
@@ -21,30 +24,81 @@ function ChatInterface() {
         e.preventDefault();
         const userMessage = message.trim();
         if (!userMessage) return;
-        const currentConversationHistory = [...conversation];
+        const { summary, summarizedTurns } = contextRef.current;
+        const currentConversationHistory = conversation.slice(summarizedTurns);
         setConversation(prev => [...prev, { sender: 'user', text: userMessage }]);
         setMessage('');
         setLoading(true);
         setError('');
 
+        const controller = new AbortController();
+        abortRef.current = controller;
         try {
-            const response = await api.post('/api/chat/', { 
-                message: userMessage,
-                history: currentConversationHistory
-             });
+            const response = await fetch(`${process.env.REACT_APP_API_URL || ''}/api/chat/`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+                body: JSON.stringify({ message: userMessage, history: currentConversationHistory, summary }),
+                signal: controller.signal,
+            });
+            if (!response.ok || !response.body) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || 'Failed to get response from AI.');
+            }
 
-            const aiReply = response.data.reply;
-            setConversation(prev => [...prev, { sender: 'ai', text: aiReply }]);
+            // Stream the reply into a new AI message as chunks arrive.
+            setConversation(prev => [...prev, { sender: 'ai', text: '' }]);
+            setLoading(false);
+            const appendToReply = (text) => setConversation(prev => {
+                const last = prev[prev.length - 1];
+                return [...prev.slice(0, -1), { ...last, text: last.text + text }];
+            });
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                for (const block of events) {
+                    const eventName = block.match(/^event: (.*)$/m)?.[1];
+                    const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] || '{}');
+                    if (eventName === 'chunk') {
+                        appendToReply(data.text);
+                    } else if (eventName === 'done') {
+                        contextRef.current = {
+                            summary: data.summary || '',
+                            summarizedTurns: summarizedTurns + (data.summarized_turns || 0),
+                        };
+                    } else if (eventName === 'error') {
+                        throw new Error(data.error);
+                    }
+                }
+            }
 
         } catch (err) {
-            console.error("Chat API error:", err.response);
-            setError(err.response?.data?.error || 'Failed to get response from AI.');
-            setConversation(prev => [...prev, { sender: 'ai', text: 'Sorry, I encountered an error.' }]);
+            if (err.name === 'AbortError') return;
+            console.error("Chat API error:", err);
+            setError(err.message || 'Failed to get response from AI.');
+            // Replace an empty streaming placeholder rather than leaving it:
+            // the server drops empty turns, so it would throw summarizedTurns
+            // off against this list.
+            setConversation(prev => {
+                const last = prev[prev.length - 1];
+                const kept = last?.sender === 'ai' && !last.text ? prev.slice(0, -1) : prev;
+                return [...kept, { sender: 'ai', text: 'Sorry, I encountered an error.' }];
+            });
         } finally {
             setLoading(false);
+            abortRef.current = null;
         }
     };
 
+    // Stop generating if the user leaves the page mid-reply.
+    useEffect(() => () => abortRef.current?.abort(), []);
+
     return (
         <Box
             sx={{
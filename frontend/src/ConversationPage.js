@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import useWebSocket, { ReadyState } from 'react-use-websocket';
 import { Box, Paper, Typography, List, ListItem, ListItemText, TextField, Button, CircularProgress, Alert } from '@mui/material';
@@ -8,14 +8,56 @@ function ConversationPage() {
     const [messages, setMessages] = useState([]);
     const [newMessage, setNewMessage] = useState('');
     const [error, setError] = useState('');
+    const [hasMore, setHasMore] = useState(false);
+    const [peer, setPeer] = useState({ online: false, typing: false, lastRead: 0 });
+    const lastReadSent = useRef(0);
+    const typingSent = useRef(0);
     const user = JSON.parse(localStorage.getItem('user'));
     const token = localStorage.getItem('authToken');
     const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
     const host = window.location.host;
     const socketUrl = `${protocol}://${host}/ws/chat/${jobId}/?token=${token}`;
+    // Handles every frame as it arrives; history comes as several frames
+    // in a row, which a lastMessage effect could see only the last of.
+    const handleFrame = (event) => {
+        try {
+            const data = JSON.parse(event.data);
+            if (data.type === 'message_history' && Array.isArray(data.messages)) {
+                // Chunks arrive newest first; only the first chunk of the
+                // page sent on connect replaces what is shown.
+                if (data.before || data.chunk) {
+                    setMessages((prev) => [...data.messages, ...prev]);
+                } else {
+                    setMessages(data.messages);
+                }
+                if (data.peer) {
+                    setPeer({ online: data.peer.online, typing: false, lastRead: data.peer.last_read_message_id });
+                }
+                setHasMore(Boolean(data.has_more));
+            } else if (data.type === 'presence') {
+                setPeer((prev) => ({ ...prev, online: data.online, typing: data.online && prev.typing }));
+            } else if (data.type === 'typing') {
+                setPeer((prev) => ({ ...prev, typing: data.typing }));
+            } else if (data.type === 'read_receipt') {
+                setPeer((prev) => ({ ...prev, lastRead: Math.max(prev.lastRead, data.message_id) }));
+            } else if (data.type === 'message_saved') {
+                setMessages((prev) => prev.map((msg) => (
+                    msg.client_id === data.client_id ? { ...msg, id: data.id } : msg
+                )));
+            } else if (data.message && typeof data.message === 'object') {
+                setMessages((prev) => [...prev, data.message]);
+                if (data.message.sender !== user?.id) {
+                    setPeer((prev) => ({ ...prev, typing: false }));
+                }
+            } else {
+                console.warn("Received unexpected WebSocket message format:", data);
+            }
+        } catch (e) {
+            console.error("Failed to parse incoming WebSocket message:", event.data, e);
+        }
+    };
     const {
         sendMessage,
-        lastMessage,
         readyState,
     } = useWebSocket(socketUrl, {
         onOpen: () => console.log('WebSocket connection opened.'),
@@ -24,31 +66,49 @@ function ConversationPage() {
             console.error('WebSocket error:', event);
             setError('WebSocket connection error. Please refresh.');
         },
+        onMessage: handleFrame,
         shouldReconnect: (closeEvent) => true,
     });
+
+    // Keep our presence alive while the page is open.
     useEffect(() => {
-        if (lastMessage !== null) {
-            try {
-                const data = JSON.parse(lastMessage.data);
-                if (data.type === 'message_history' && Array.isArray(data.messages)) {
-                    setMessages(data.messages);
-                } else if (data.message && typeof data.message === 'object') {
-                    setMessages((prev) => [...prev, data.message]);
-                } else {
-                    console.warn("Received unexpected WebSocket message format:", data);
-                }
-            } catch (e) {
-                console.error("Failed to parse incoming WebSocket message:", lastMessage.data, e);
-            }
+        if (readyState !== ReadyState.OPEN) return undefined;
+        const interval = setInterval(() => sendMessage(JSON.stringify({ type: 'heartbeat' })), 25000);
+        return () => clearInterval(interval);
+    }, [readyState, sendMessage]);
+
+    // Mark the newest message from the other participant as read.
+    useEffect(() => {
+        const received = messages.filter((msg) => msg.id && msg.sender !== user?.id);
+        const newest = received.length ? received[received.length - 1].id : 0;
+        if (readyState === ReadyState.OPEN && newest > lastReadSent.current) {
+            lastReadSent.current = newest;
+            sendMessage(JSON.stringify({ type: 'read', message_id: newest }));
+        }
+    }, [messages, readyState, sendMessage, user?.id]);
+
+    const handleTyping = (e) => {
+        setNewMessage(e.target.value);
+        // At most one typing event every few seconds.
+        if (Date.now() - typingSent.current > 3000) {
+            typingSent.current = Date.now();
+            sendMessage(JSON.stringify({ type: 'typing', typing: true }));
         }
-    }, [lastMessage, setMessages]);
+    };
+
     const handleSendMessage = useCallback((e) => {
         e.preventDefault();
         const messageToSend = newMessage.trim();
         if (!messageToSend) return;
         sendMessage(JSON.stringify({ message: messageToSend }));
+        sendMessage(JSON.stringify({ type: 'typing', typing: false }));
+        typingSent.current = 0;
         setNewMessage('');
     }, [newMessage, sendMessage]);
+    const handleLoadEarlier = useCallback(() => {
+        if (messages.length === 0) return;
+        sendMessage(JSON.stringify({ type: 'load_history', before: messages[0].id }));
+    }, [messages, sendMessage]);
 
     const connectionStatus = {
         [ReadyState.CONNECTING]: 'Connecting',
@@ -65,6 +125,9 @@ function ConversationPage() {
             <Typography variant="h4" gutterBottom>
                 Conversation (Status: {connectionStatus})
             </Typography>
+            <Typography variant="body2" color="text.secondary" gutterBottom>
+                {peer.typing ? 'Typing…' : peer.online ? 'Online' : 'Offline'}
+            </Typography>
             {error && <Alert severity="error" sx={{ mb: 2 }}>{error}</Alert>}
 
             <List sx={{ mb: 2, maxHeight: '500px', overflow: 'auto', border: '1px solid #eee', borderRadius: '4px' }}>
@@ -73,8 +136,15 @@ function ConversationPage() {
                         <CircularProgress />
                     </ListItem>
                 )}
+                {hasMore && (
+                    <ListItem sx={{ justifyContent: 'center' }}>
+                        <Button size="small" onClick={handleLoadEarlier} disabled={readyState !== ReadyState.OPEN}>
+                            Load earlier messages
+                        </Button>
+                    </ListItem>
+                )}
                 {messages.map((msg, index) => (
-                    <ListItem key={msg.id || index} sx={{
+                    <ListItem key={msg.client_id || msg.id || index} sx={{
                         flexDirection: 'column',
                         alignItems: msg.sender === user?.id ? 'flex-end' : 'flex-start'
                     }}>
@@ -86,7 +156,9 @@ function ConversationPage() {
                         }}>
                             <ListItemText
                                 primary={msg.body} 
-                                secondary={`${msg.sender_name} - ${new Date(msg.timestamp).toLocaleString()}`}
+                                secondary={`${msg.sender_name} - ${new Date(msg.timestamp).toLocaleString()}${
+                                    msg.sender === user?.id && msg.id && msg.id <= peer.lastRead ? ' - Seen' : ''
+                                }`}
                             />
                         </Paper>
                     </ListItem>
@@ -100,7 +172,7 @@ function ConversationPage() {
                     multiline
                     rows={3}
                     value={newMessage}
-                    onChange={(e) => setNewMessage(e.target.value)}
+                    onChange={handleTyping}
                     variant="outlined"
                     disabled={readyState !== ReadyState.OPEN}
                 />
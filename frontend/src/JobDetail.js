@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link as RouterLink } from 'react-router-dom';
 import api from './api';
+import useBidNotifications from './useBidNotifications';
 import { Paper, Typography, Box, Divider, TextField, Button, List, ListItem, ListItemText, Alert, CircularProgress, Rating } from '@mui/material';
 
 function JobDetail() {
@@ -20,7 +21,19 @@ function JobDetail() {
     const token = localStorage.getItem('authToken');
     const user = JSON.parse(localStorage.getItem('user'));
 
-    
+    // Bids on this job arrive live instead of on reload.
+    useBidNotifications((event) => {
+        if (String(event.job_id) !== String(jobId)) return;
+        setJob(prev => {
+            if (!prev) return prev;
+            if (event.event === 'new_bid') {
+                return prev.bids.some(bid => bid.id === event.bid.id) ? prev : { ...prev, bids: [...prev.bids, event.bid] };
+            }
+            const accepted = prev.bids.find(bid => bid.id === event.bid_id);
+            return { ...prev, is_completed: true, accepted_bid: accepted || prev.accepted_bid };
+        });
+    }, () => window.location.reload());
+
 
     const handleAcceptBid = async (bidId) => {
         if (!window.confirm("Are you sure you want to accept this bid? This will close the job to further bidding.")) {
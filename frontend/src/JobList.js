@@ -1,15 +1,61 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { Link as RouterLink } from 'react-router-dom';
+import useWebSocket from 'react-use-websocket';
 import api from './api';
-import { Grid, Card, CardActionArea, CardContent, Typography, Alert, CircularProgress, Box, TextField } from '@mui/material';
+import { Grid, Card, CardActionArea, CardContent, Typography, Alert, CircularProgress, Box, TextField, Button } from '@mui/material';
 
 function JobList() {
     const [jobs, setJobs] = useState([]);
+    // Cursor URL of the next page, or null once every job is listed.
+    const [nextPage, setNextPage] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const [searchQuery, setSearchQuery] = useState('');
     const [zipFilter, setZipFilter] = useState('');
+    const [reloadKey, setReloadKey] = useState(0);
     const authToken = localStorage.getItem('authToken');
+    const user = JSON.parse(localStorage.getItem('user'));
+    // Last job feed sequence number seen, so reconnects resume from it.
+    const lastSeq = useRef(null);
+
+    // The feed only carries the pro's service area plus the states asked
+    // for, so it subscribes to every state in the list; otherwise jobs
+    // closed elsewhere would stay listed as open. A new state reconnects
+    // with `since`, replaying anything missed meanwhile.
+    const listedStates = useMemo(
+        () => [...new Set(jobs.map(job => job.state).filter(Boolean))].sort().join(','),
+        [jobs]
+    );
+    const getSocketUrl = useCallback(() => {
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const since = lastSeq.current === null ? '' : `&since=${lastSeq.current}`;
+        const states = listedStates ? `&states=${encodeURIComponent(listedStates)}` : '';
+        return `${protocol}://${window.location.host}/ws/jobs/?token=${authToken}${states}${since}`;
+    }, [authToken, listedStates]);
+    // Handles every frame as it arrives: a replay is a burst of frames,
+    // which a lastJsonMessage effect could see only the last of.
+    const handleFrame = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'job_feed') {
+            // A fresh connection always asks for a resync; the list is loading anyway.
+            if (data.resync && lastSeq.current !== null) setReloadKey(key => key + 1);
+            lastSeq.current = data.seq;
+        } else if (data.type === 'job_event') {
+            lastSeq.current = Math.max(lastSeq.current || 0, data.seq);
+            const job = data.job;
+            if (data.event === 'closed') {
+                setJobs(prev => prev.filter(j => j.id !== job.id));
+            } else if (!searchQuery && (!zipFilter || job.zip_code === zipFilter)) {
+                setJobs(prev => (prev.some(j => j.id === job.id) ? prev : [job, ...prev]));
+            }
+        }
+    };
+    useWebSocket(authToken && user?.is_pro ? getSocketUrl : null, {
+        onMessage: handleFrame,
+        shouldReconnect: () => true,
+    });
+
     useEffect(() => {
         const fetchJobs = async () => {
             if (!authToken) {
@@ -34,7 +80,8 @@ function JobList() {
                     params: params 
                 });
                 
-                setJobs(response.data);
+                setJobs(response.data.results);
+                setNextPage(response.data.next);
                 setError('');
             } catch (err) {
                 setError('Failed to fetch jobs.');
@@ -49,7 +96,23 @@ function JobList() {
 
         return () => clearTimeout(searchTimeout);
 
-    }, [authToken, searchQuery, zipFilter]);
+    }, [authToken, searchQuery, zipFilter, reloadKey]);
+
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await api.get(nextPage, {
+                headers: { 'Authorization': `Token ${authToken}` }
+            });
+            // Live events may already have added some of these jobs.
+            setJobs(prev => [...prev, ...response.data.results.filter(job => !prev.some(j => j.id === job.id))]);
+            setNextPage(response.data.next);
+        } catch (err) {
+            setError('Failed to fetch jobs.');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     return (
         <div>
@@ -99,6 +162,13 @@ function JobList() {
                             <Typography>No jobs match your criteria.</Typography>
                         </Grid>
                     )}
+                    {nextPage && (
+                        <Grid item xs={12} sx={{ display: 'flex', justifyContent: 'center' }}>
+                            <Button onClick={handleLoadMore} disabled={loadingMore}>
+                                {loadingMore ? <CircularProgress size={24} /> : 'Load more jobs'}
+                            </Button>
+                        </Grid>
+                    )}
                 </Grid>
             )}
         </div>
@@ -1,15 +1,28 @@
 import React, { useState, useEffect } from 'react';
 import { Link as RouterLink } from 'react-router-dom';
-import { Grid, Card, CardActionArea, CardContent, Typography, Alert, CircularProgress, Box } from '@mui/material';
+import { Grid, Card, CardActionArea, CardContent, Typography, Alert, CircularProgress, Box, Button } from '@mui/material';
 import api from './api';
+import useBidNotifications from './useBidNotifications';
 
 
 function MyJobs() {
     const [jobs, setJobs] = useState([]);
+    // Cursor URL of the next page, or null once every job is listed.
+    const [nextPage, setNextPage] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    const [newBids, setNewBids] = useState({});
     const authToken = localStorage.getItem('authToken');
 
+    useBidNotifications((event) => {
+        if (event.event === 'new_bid') {
+            setNewBids(prev => ({ ...prev, [event.job_id]: (prev[event.job_id] || 0) + 1 }));
+        } else {
+            setJobs(prev => prev.map(job => (job.id === event.job_id ? { ...job, is_completed: true } : job)));
+        }
+    });
+
     useEffect(() => {
         const fetchMyJobs = async () => {
             if (!authToken) {
@@ -21,7 +34,8 @@ function MyJobs() {
                 const response = await api.get('/api/my-jobs/', {
                     headers: { 'Authorization': `Token ${authToken}` }
                 });
-                setJobs(response.data);
+                setJobs(response.data.results);
+                setNextPage(response.data.next);
             } catch (err) {
                 setError('Failed to fetch your jobs.');
             } finally {
@@ -31,6 +45,21 @@ function MyJobs() {
         fetchMyJobs();
     }, [authToken]);
 
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await api.get(nextPage, {
+                headers: { 'Authorization': `Token ${authToken}` }
+            });
+            setJobs(prev => [...prev, ...response.data.results]);
+            setNextPage(response.data.next);
+        } catch (err) {
+            setError('Failed to fetch your jobs.');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return <Box sx={{ display: 'flex', justifyContent: 'center', mt: 4 }}><CircularProgress /></Box>;
     }
@@ -57,6 +86,11 @@ function MyJobs() {
                                         <Typography variant="body2" color="text.secondary">
                                             Status: {job.is_completed ? "Closed" : "Open"}
                                         </Typography>
+                                        {newBids[job.id] > 0 && (
+                                            <Typography variant="body2" color="primary">
+                                                {newBids[job.id]} new bid{newBids[job.id] > 1 ? 's' : ''}
+                                            </Typography>
+                                        )}
                                     </CardContent>
                                 </CardActionArea>
                             </Card>
@@ -67,6 +101,13 @@ function MyJobs() {
                         <Typography>You have not posted any jobs yet.</Typography>
                     </Grid>
                 )}
+                {nextPage && (
+                    <Grid item xs={12} sx={{ display: 'flex', justifyContent: 'center' }}>
+                        <Button onClick={handleLoadMore} disabled={loadingMore}>
+                            {loadingMore ? <CircularProgress size={24} /> : 'Load more jobs'}
+                        </Button>
+                    </Grid>
+                )}
             </Grid>
         </div>
     );
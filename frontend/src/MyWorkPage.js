@@ -1,10 +1,13 @@
 import React, { useState, useEffect } from 'react';
 import { Link as RouterLink } from 'react-router-dom';
 import api from './api';
-import { Grid, Card, CardActionArea, CardContent, Typography, Alert, CircularProgress } from '@mui/material';
+import { Grid, Card, CardActionArea, CardContent, Typography, Alert, CircularProgress, Button } from '@mui/material';
 
 function MyWorkPage() {
     const [jobs, setJobs] = useState([]);
+    // Cursor URL of the next page, or null once every job is listed.
+    const [nextPage, setNextPage] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const authToken = localStorage.getItem('authToken');
@@ -20,7 +23,8 @@ function MyWorkPage() {
                 const response = await api.get('/api/my-work/', {
                     headers: { 'Authorization': `Token ${authToken}` }
                 });
-                setJobs(response.data);
+                setJobs(response.data.results);
+                setNextPage(response.data.next);
             } catch (err) {
                 setError('Failed to fetch your accepted jobs.');
             } finally {
@@ -30,6 +34,21 @@ function MyWorkPage() {
         fetchMyWork();
     }, [authToken]);
 
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await api.get(nextPage, {
+                headers: { 'Authorization': `Token ${authToken}` }
+            });
+            setJobs(prev => [...prev, ...response.data.results]);
+            setNextPage(response.data.next);
+        } catch (err) {
+            setError('Failed to fetch your accepted jobs.');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) return <CircularProgress />;
     if (error) return <Alert severity="error">{error}</Alert>;
 
@@ -61,6 +80,13 @@ function MyWorkPage() {
                         <Typography>You have not been hired for any jobs yet.</Typography>
                     </Grid>
                 )}
+                {nextPage && (
+                    <Grid item xs={12} sx={{ display: 'flex', justifyContent: 'center' }}>
+                        <Button onClick={handleLoadMore} disabled={loadingMore}>
+                            {loadingMore ? <CircularProgress size={24} /> : 'Load more jobs'}
+                        </Button>
+                    </Grid>
+                )}
             </Grid>
         </div>
     );
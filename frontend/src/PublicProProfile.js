@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import api from './api';
-import { Container, Box, Typography, Paper, Avatar, CircularProgress, Alert, Grid, Link, Divider, Rating , List, ListItem, ListItemText} from '@mui/material';
+import { Container, Box, Typography, Paper, Avatar, CircularProgress, Alert, Grid, Link, Divider, Rating , List, ListItem, ListItemText, Button} from '@mui/material';
 import BusinessIcon from '@mui/icons-material/Business';
 import LocationOnIcon from '@mui/icons-material/LocationOn';
 import LinkIcon from '@mui/icons-material/Link';
@@ -14,9 +14,16 @@ function PublicProProfile() {
     const [profile, setProfile] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    // Reviews paged from the reviews endpoint; null while the profile's
+    // latest few are all that is shown.
+    const [reviews, setReviews] = useState(null);
+    const [nextReviews, setNextReviews] = useState(null);
+    const [loadingReviews, setLoadingReviews] = useState(false);
 
     useEffect(() => {
          const fetchProfile = async () => {
+            setReviews(null);
+            setNextReviews(null);
             try {
                 const response = await api.get(`/api/profiles/pro/${userId}/`);
                 setProfile(response.data);
@@ -30,10 +37,27 @@ function PublicProProfile() {
         fetchProfile();
     }, [userId]);
 
+    const handleMoreReviews = async () => {
+        setLoadingReviews(true);
+        try {
+            // The first page repeats the latest reviews, so it replaces them.
+            const response = await api.get(reviews === null ? `/api/profiles/pro/${userId}/reviews/` : nextReviews);
+            setReviews(prev => [...(prev || []), ...response.data.results]);
+            setNextReviews(response.data.next);
+        } catch (err) {
+            console.error("Fetch reviews error:", err.response);
+        } finally {
+            setLoadingReviews(false);
+        }
+    };
+
     if (loading) return <Box sx={{ display: 'flex', justifyContent: 'center', mt: 4 }}><CircularProgress /></Box>;
     if (error) return <Alert severity="error">{error}</Alert>;
     if (!profile) return <Typography>Profile not found.</Typography>;
 
+    const shownReviews = reviews || profile.latest_reviews || [];
+    const hasMoreReviews = reviews === null ? (profile.rating_count || 0) > shownReviews.length : Boolean(nextReviews);
+
     // Helper to display optional links
     const renderLink = (url, IconComponent, text) => (
         url && (
@@ -106,7 +130,7 @@ function PublicProProfile() {
                         <Rating value={profile.average_rating} precision={0.1} readOnly />
                         <Typography sx={{ ml: 1 }}>({profile.average_rating} / 5)</Typography>
                         <Typography sx={{ ml: 1, color: 'text.secondary' }}>
-                            ({profile.reviews_received?.length || 0} reviews)
+                            ({profile.rating_count || 0} reviews)
                         </Typography>
                     </Box>
                 ) : (
@@ -115,9 +139,9 @@ function PublicProProfile() {
 
                 <Divider sx={{ my: 2 }} />
                 <Typography variant="h6" gutterBottom>Reviews</Typography>
-                {profile.reviews_received && profile.reviews_received.length > 0 ? (
+                {shownReviews.length > 0 ? (
                     <List sx={{ width: '100%', bgcolor: 'background.paper' }}>
-                        {profile.reviews_received.map((review) => (
+                        {shownReviews.map((review) => (
                             <ListItem key={review.id} alignItems="flex-start" divider>
                                 <ListItemText
                                     primary={
@@ -149,6 +173,13 @@ function PublicProProfile() {
                                 />
                             </ListItem>
                         ))}
+                        {hasMoreReviews && (
+                            <ListItem sx={{ justifyContent: 'center' }}>
+                                <Button size="small" onClick={handleMoreReviews} disabled={loadingReviews}>
+                                    {loadingReviews ? <CircularProgress size={20} /> : 'Show more reviews'}
+                                </Button>
+                            </ListItem>
+                        )}
                     </List>
                 ) : (
                     <Typography>This professional has not received any reviews yet.</Typography>
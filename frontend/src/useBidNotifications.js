@@ -0,0 +1,43 @@
+import { useCallback, useRef } from 'react';
+import useWebSocket from 'react-use-websocket';
+
+// Subscribes to bid notifications for the logged-in user's jobs and calls
+// onEvent for each new_bid / bid_accepted event. The last sequence number
+// is kept in localStorage, so bids placed while the user was away are
+// replayed on their next visit. onResync is called when the server can no
+// longer replay what was missed and the page should reload its data.
+function useBidNotifications(onEvent, onResync) {
+    const token = localStorage.getItem('authToken');
+    const user = JSON.parse(localStorage.getItem('user'));
+    const seqKey = user ? `bidFeedSeq:${user.id}` : null;
+    const handlers = useRef({ onEvent, onResync });
+    handlers.current = { onEvent, onResync };
+
+    const getSocketUrl = useCallback(() => {
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const lastSeq = localStorage.getItem(seqKey);
+        const since = lastSeq === null ? '' : `&since=${lastSeq}`;
+        return `${protocol}://${window.location.host}/ws/bids/?token=${token}${since}`;
+    }, [token, seqKey]);
+    // Handles every frame as it arrives: a replay is a burst of frames,
+    // which a lastJsonMessage effect could see only the last of.
+    const handleFrame = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'bid_feed') {
+            if (data.resync && localStorage.getItem(seqKey) !== null) {
+                handlers.current.onResync?.();
+            }
+            localStorage.setItem(seqKey, data.seq);
+        } else if (data.type === 'bid_event') {
+            const lastSeq = Number(localStorage.getItem(seqKey) || 0);
+            localStorage.setItem(seqKey, Math.max(lastSeq, data.seq));
+            handlers.current.onEvent?.(data);
+        }
+    };
+    useWebSocket(token && seqKey ? getSocketUrl : null, {
+        onMessage: handleFrame,
+        shouldReconnect: () => true,
+    });
+}
+
+export default useBidNotifications;